@@ -0,0 +1,83 @@
+"""
+Benchmark of the panel alignment in m_series_tuple_to_df against the previous column by column assignment
+
+Run from the repository root:
+python -m benchmarks.bench_align
+"""
+import time
+import tracemalloc
+import datetime as dt
+import numpy as np
+import pandas as pd
+from macrobond import ingest
+from macrobond import align
+
+
+class ComSeries:
+	"""
+	Minimal stand-in for a COM series object
+	"""
+
+	def __init__(self, dates: tuple, values: tuple):
+		self.DatesAtEndOfPeriod = dates
+		self.Values = values
+
+
+def f_make_series(n_tickers: int, n_obs: int) -> list:
+	start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+	rng = np.random.default_rng(0)
+	series = list()
+	for i in range(n_tickers):
+		# Different start dates so that the union is larger than any single series
+		offset = int(rng.integers(0, n_obs))
+		dates = tuple(start + dt.timedelta(days=30 * (offset + j)) for j in range(n_obs))
+		series.append(ComSeries(dates, tuple(rng.standard_normal(n_obs))))
+	return series
+
+
+def f_old_path(ticker_list: list, series: list) -> pd.DataFrame:
+	date_list = list()
+	for i, ticker in enumerate(ticker_list):
+		date_list.extend([dt.datetime.toordinal(date) for date in series[i].DatesAtEndOfPeriod])
+	date_list_unique = list(set(date_list))
+	date_list_unique.sort(reverse=False)
+	p_dates = pd.to_datetime([dt.date.fromordinal(date) for date in date_list_unique])
+	df = pd.DataFrame(index=p_dates, columns=ticker_list)
+	for i, ticker in enumerate(ticker_list):
+		p_end_dates = pd.to_datetime([date.strftime('%Y-%m-%d') for date in series[i].DatesAtEndOfPeriod])
+		df[ticker] = pd.Series(series[i].Values, index=p_end_dates)
+	return df
+
+
+def f_new_path(ticker_list: list, series: list) -> pd.DataFrame:
+	unpacked = [ingest.f_unpack_arrays(s) for s in series]
+	return align.f_align_panel(ticker_list, [u[0] for u in unpacked], [u[1] for u in unpacked])
+
+
+def f_measure(func, *args):
+	tracemalloc.start()
+	t0 = time.perf_counter()
+	result = func(*args)
+	elapsed = time.perf_counter() - t0
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return result, elapsed, peak
+
+
+def main():
+	n_obs = 600
+	for n_tickers in [100, 1_000, 5_000]:
+		ticker_list = [f'ticker{i}' for i in range(n_tickers)]
+		series = f_make_series(n_tickers, n_obs)
+
+		df_old, t_old, m_old = f_measure(f_old_path, ticker_list, series)
+		df_new, t_new, m_new = f_measure(f_new_path, ticker_list, series)
+
+		np.testing.assert_allclose(df_old.to_numpy(dtype=np.float64), df_new.to_numpy())
+
+		print(f'{n_tickers:>6} tickers. old: {t_old:7.2f} s {m_old / 1e6:8.1f} MB, '
+			  f'new: {t_new:7.2f} s {m_new / 1e6:8.1f} MB')
+
+
+if __name__ == '__main__':
+	main()
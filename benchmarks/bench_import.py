@@ -0,0 +1,54 @@
+"""
+Benchmark of the cold start time of the package, every statement is timed in a fresh interpreter
+
+Run from the repository root:
+python -m benchmarks.bench_import
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = {
+	'import macrobond': 'import macrobond',
+	'Macrobond()': 'import macrobond; macrobond.Macrobond()',
+	'f_create_bbg_ticker': "import macrobond; macrobond.Macrobond.f_create_bbg_ticker(['SPX Index'])",
+	'first FetchSeries': "import macrobond; from tests.fake_database import FakeDatabase; "
+						 "macrobond.Macrobond(connection_factory=FakeDatabase).FetchSeries(['us1'])",
+	'import pandas, numpy (reference)': 'import pandas, numpy',
+}
+
+CODE = """
+import sys, time
+t0 = time.perf_counter()
+{statement}
+print(time.perf_counter() - t0, 'pandas' in sys.modules)
+"""
+
+
+def f_time_statement(statement: str) -> tuple:
+	"""
+	Seconds and whether pandas was loaded, in a fresh interpreter
+	"""
+	output = subprocess.check_output([sys.executable, '-c', CODE.format(statement=statement)], cwd=ROOT)
+	seconds, pandas_loaded = output.decode().split()[-2:]
+	return float(seconds), pandas_loaded == 'True'
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Cold start time of macrobond')
+	parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per statement, the median is kept')
+	args = parser.parse_args()
+
+	print(f"{'Statement':<34}{'Median ms':>12}{'pandas loaded':>16}")
+	for name, statement in STATEMENTS.items():
+		results = [f_time_statement(statement) for _ in range(args.repeat)]
+		seconds = statistics.median([r[0] for r in results])
+		print(f'{name:<34}{seconds * 1e3:12.1f}{str(results[-1][1]):>16}')
+
+
+if __name__ == '__main__':
+	main()
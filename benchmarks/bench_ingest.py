@@ -0,0 +1,48 @@
+"""
+Benchmark of the COM-to-NumPy ingestion layer against the previous strftime round-trip
+
+Run from the repository root:
+python -m benchmarks.bench_ingest
+"""
+import timeit
+import datetime as dt
+import pandas as pd
+from macrobond import ingest
+
+
+def f_make_com_dates(n: int) -> tuple:
+	"""
+	Dates as they come from the COM interface: timezone aware datetimes
+	"""
+	start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+	return tuple(start + dt.timedelta(days=i) for i in range(n))
+
+
+def f_old_path(dates: tuple, values: tuple) -> pd.Series:
+	p_end_dates = pd.to_datetime([date.strftime('%Y-%m-%d') for date in dates])
+	return pd.Series(values, index=p_end_dates)
+
+
+def f_new_path(dates: tuple, values: tuple) -> pd.Series:
+	return ingest.f_arrays_to_series(ingest.f_dates_to_datetime64(dates), ingest.f_values_to_float64(values))
+
+
+def main():
+	for n in [1_000, 20_000]:
+		dates = f_make_com_dates(n)
+		values = tuple(float(i) for i in range(n))
+
+		# Make sure both paths give the same result before timing them
+		pd.testing.assert_series_equal(f_old_path(dates, values), f_new_path(dates, values), check_index_type=False,
+									   check_freq=False)
+
+		number = 20
+		t_old = timeit.timeit(lambda: f_old_path(dates, values), number=number) / number
+		t_new = timeit.timeit(lambda: f_new_path(dates, values), number=number) / number
+
+		print(f'{n:>7} obs. strftime: {t_old * 1e3:8.2f} ms, ingest: {t_new * 1e3:8.2f} ms, '
+			  f'speedup: {t_old / t_new:6.1f}x')
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,182 @@
+"""
+Benchmark suite of the hot paths of Macrobond, run against the in-process stand-in database
+
+Run from the repository root:
+python -m benchmarks.run_benchmarks
+python -m benchmarks.run_benchmarks --sizes 10 1000 --frequency daily --n-obs 2500 --latency 0.01
+
+Every run is appended to a history file (one json object per line). Timings are compared with the previous run
+with the same settings and slowdowns above --threshold are reported as regressions.
+The default history file, benchmarks/history.jsonl, is local to every checkout and ignored by git.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import platform
+import functools
+import subprocess
+import datetime as dt
+from macrobond import c_macrobond
+from tests.fake_database import FakeDatabase
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+
+
+def f_time(func, repeat: int) -> float:
+	"""
+	Best of repeat runs in seconds
+	"""
+	best = float('inf')
+	for _ in range(repeat):
+		t0 = time.perf_counter()
+		func()
+		best = min(best, time.perf_counter() - t0)
+	return best
+
+
+def f_git_commit() -> str:
+	try:
+		return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+									   cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return ''
+
+
+def f_run_size(n_tickers: int, args) -> dict:
+	"""
+	Time every benchmark for one number of tickers
+	"""
+	connection_factory = functools.partial(FakeDatabase, n_obs=args.n_obs, frequency=args.frequency,
+										   n_vintages=args.n_vintages, latency=args.latency,
+										   latency_per_series=args.latency_per_series, search_size=n_tickers)
+
+	# No in-memory caching, every call goes to the database
+	mb = c_macrobond.Macrobond(object_cache_size=0, search_cache_size=0, connection_factory=connection_factory)
+
+	ticker_list = [f'us{i}' for i in range(n_tickers)]
+
+	# Revisions are fetched one ticker at a time, so only a sample is timed and scaled up
+	revision_list = ticker_list[:min(n_tickers, args.revision_sample)]
+
+	# Generate the data once so that it is not part of the timings
+	series = mb.mbdb.FetchSeries(ticker_list)
+	for ticker in revision_list:
+		mb.mbdb.FetchOneSeriesWithRevisions(ticker)
+
+	benchmarks = {
+		'FetchSeries': lambda: mb.FetchSeries(ticker_list=ticker_list),
+		'FetchSeries_parallel': lambda: mb.FetchSeries(ticker_list=ticker_list, chunk_size=args.chunk_size,
+													   max_workers=args.max_workers),
+		'm_series_tuple_to_df': lambda: mb.m_series_tuple_to_df(ticker_list=ticker_list, series=series),
+		'f_unpack_series': lambda: [mb.f_unpack_series(s) for s in series],
+		'FetchOneSeriesWithRevisions': lambda: [mb.FetchOneSeriesWithRevisions(ticker=ticker)
+												for ticker in revision_list],
+		'm_get_full_info': lambda: mb.m_get_full_info(ticker_list=ticker_list),
+		'CreateSearchQuery': lambda: mb.CreateSearchQuery(concept_filter='gdp_total', RegionList=['us']),
+	}
+
+	result = dict()
+	for name, func in benchmarks.items():
+		if args.only and name not in args.only:
+			continue
+
+		# Some methods print information for every ticker
+		with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+			seconds = f_time(func, repeat=args.repeat)
+
+		if name == 'FetchOneSeriesWithRevisions':
+			seconds *= n_tickers / len(revision_list)
+
+		result[name] = seconds
+		print(f'{n_tickers:>7} {name:<30} {seconds * 1e3:12.2f} ms')
+
+	return result
+
+
+def f_settings(args) -> dict:
+	"""
+	Settings that have to be equal for two runs to be compared
+	"""
+	return {'n_obs': args.n_obs, 'frequency': args.frequency, 'n_vintages': args.n_vintages,
+			'latency': args.latency, 'latency_per_series': args.latency_per_series, 'chunk_size': args.chunk_size,
+			'max_workers': args.max_workers}
+
+
+def f_load_history(path: str) -> list:
+	if not os.path.exists(path):
+		return []
+	with open(path, 'r') as f:
+		return [json.loads(line) for line in f if line.strip()]
+
+
+def f_compare(run: dict, history: list, threshold: float) -> list:
+	"""
+	Compare a run with the latest previous run with the same settings, return a list of regressions
+	"""
+	previous = [h for h in history if h['settings'] == run['settings']]
+	if not previous:
+		print('No previous run with the same settings to compare with')
+		return []
+
+	previous = previous[-1]
+	print(f"\nCompared with {previous['time']} (commit {previous['commit'] or 'unknown'}):")
+
+	regressions = list()
+	for size, timings in run['results'].items():
+		for name, seconds in timings.items():
+			old = previous['results'].get(size, {}).get(name)
+			if old is None or old == 0:
+				continue
+
+			ratio = seconds / old
+			flag = ''
+			if ratio > 1 + threshold:
+				flag = '  <-- REGRESSION'
+				regressions.append((size, name, ratio))
+			print(f'{size:>7} {name:<30} {ratio:8.2f}x{flag}')
+
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Benchmark Macrobond against a stand-in database')
+	parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000], help='Number of tickers')
+	parser.add_argument('--n-obs', type=int, default=240, help='Observations per series')
+	parser.add_argument('--frequency', default='monthly', help='daily, weekly, monthly, quarterly or annual')
+	parser.add_argument('--n-vintages', type=int, default=5, help='Vintages per series with revisions')
+	parser.add_argument('--latency', type=float, default=0.0, help='Simulated seconds per database call')
+	parser.add_argument('--latency-per-series', type=float, default=0.0, help='Simulated seconds per series')
+	parser.add_argument('--chunk-size', type=int, default=500, help='Chunk size of the parallel fetch')
+	parser.add_argument('--max-workers', type=int, default=4, help='Threads of the parallel fetch')
+	parser.add_argument('--revision-sample', type=int, default=100, help='Tickers timed with revisions')
+	parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the best one is kept')
+	parser.add_argument('--only', nargs='+', help='Only run these benchmarks')
+	parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown reported as a regression')
+	parser.add_argument('--history', default=HISTORY_PATH, help='File with the results of previous runs')
+	parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+	args = parser.parse_args()
+
+	run = {'time': dt.datetime.now().isoformat(timespec='seconds'),
+		   'commit': f_git_commit(),
+		   'python': platform.python_version(),
+		   'settings': f_settings(args),
+		   'results': dict()}
+
+	for n_tickers in args.sizes:
+		run['results'][str(n_tickers)] = f_run_size(n_tickers, args)
+
+	regressions = f_compare(run, f_load_history(args.history), args.threshold)
+
+	if not args.no_save:
+		with open(args.history, 'a') as f:
+			f.write(json.dumps(run) + '\n')
+
+	if regressions:
+		sys.exit(1)
+
+
+if __name__ == '__main__':
+	main()
@@ -1,4 +1,30 @@
 __name__ = "macrobond"
 __version__ = "0.5.7"
-from macrobond import c_macrobond
 
+# Submodules and classes are loaded on first access, so that `import macrobond` does not import pandas
+_LAZY_ATTRIBUTES = {'Macrobond': ('macrobond.c_macrobond', 'Macrobond'),
+					'AsyncMacrobond': ('macrobond.c_async_macrobond', 'AsyncMacrobond'),
+					'SearchPipeline': ('macrobond.c_search_pipeline', 'SearchPipeline')}
+
+_SUBMODULES = ['c_macrobond', 'c_async_macrobond', 'c_connection_pool', 'c_instrumentation', 'c_metadata_catalog',
+			   'c_object_cache', 'c_release_scheduler', 'c_search_pipeline', 'c_series_cache', 'c_single_flight',
+			   'c_unified_request', 'c_vintage_history', 'ingest', 'align', 'arrow_io', 'lazy_import']
+
+
+def __getattr__(name: str):
+	import importlib
+
+	if name in _SUBMODULES:
+		return importlib.import_module(f'macrobond.{name}')
+
+	if name in _LAZY_ATTRIBUTES:
+		module_name, attr = _LAZY_ATTRIBUTES[name]
+		value = getattr(importlib.import_module(module_name), attr)
+		globals()[name] = value
+		return value
+
+	raise AttributeError(f"module 'macrobond' has no attribute '{name}'")
+
+
+def __dir__():
+	return sorted(list(globals().keys()) + _SUBMODULES + list(_LAZY_ATTRIBUTES.keys()))
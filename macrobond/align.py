@@ -0,0 +1,435 @@
+"""
+Alignment of unpacked series to one panel
+
+Series are given as lists of (dates, values) arrays from macrobond.ingest. The union of all dates is found
+with one vectorized sort and every value is scattered into a single float64 block.
+
+For universes that mix frequencies most cells of the wide panel are nan. The long format stores only the
+observations: a categorical Ticker, the Date (datetime64 or int32 days since 1970-01-01) and the Value
+(float64 or float32). f_long_to_wide pivots (a subset of) it back to a wide panel.
+
+f_resample_panel converts series of mixed frequencies to one target frequency locally, like a unified series
+request does in the database. Every observation is mapped from its start of period date to an integer target
+period, so the panel is built directly on the target calendar and the union of all dates is never formed.
+"""
+from __future__ import annotations
+import macrobond_api_constants.SeriesFrequency
+import macrobond_api_constants.SeriesMissingValueMethod
+import macrobond_api_constants.SeriesToHigherFrequencyMethod
+import macrobond_api_constants.SeriesToLowerFrequencyMethod
+from macrobond.c_unified_request import UnifiedRequestBuilder, SERIES_OPTIONS
+from macrobond.lazy_import import f_lazy_import
+np = f_lazy_import('numpy')
+pd = f_lazy_import('pandas')
+
+# Frequencies of the resample engine, lowest first: name -> macrobond_api_constants.SeriesFrequency
+RESAMPLE_FREQUENCIES = {'annual': macrobond_api_constants.SeriesFrequency.ANNUAL,
+						'semiannual': macrobond_api_constants.SeriesFrequency.SEMI_ANNUAL,
+						'quadmonthly': macrobond_api_constants.SeriesFrequency.QUAD_MONTHLY,
+						'quarterly': macrobond_api_constants.SeriesFrequency.QUARTERLY,
+						'bimonthly': macrobond_api_constants.SeriesFrequency.BI_MONTHLY,
+						'monthly': macrobond_api_constants.SeriesFrequency.MONTHLY,
+						'weekly': macrobond_api_constants.SeriesFrequency.WEEKLY,
+						'daily': macrobond_api_constants.SeriesFrequency.DAILY}
+
+# Months per period of the frequencies that are based on months
+MONTHS_PER_PERIOD = {'monthly': 1, 'bimonthly': 2, 'quarterly': 3, 'quadmonthly': 4, 'semiannual': 6, 'annual': 12}
+
+# Methods done locally, AUTO is the first one
+RESAMPLE_METHODS = {'ToLowerFrequencyMethod': [macrobond_api_constants.SeriesToLowerFrequencyMethod.LAST,
+											   macrobond_api_constants.SeriesToLowerFrequencyMethod.FIRST,
+											   macrobond_api_constants.SeriesToLowerFrequencyMethod.AVERAGE,
+											   macrobond_api_constants.SeriesToLowerFrequencyMethod.FLOW,
+											   macrobond_api_constants.SeriesToLowerFrequencyMethod.HIGHEST,
+											   macrobond_api_constants.SeriesToLowerFrequencyMethod.LOWEST],
+					'ToHigherFrequencyMethod': [macrobond_api_constants.SeriesToHigherFrequencyMethod.SAME,
+												macrobond_api_constants.SeriesToHigherFrequencyMethod.DISTRIBUTE,
+												macrobond_api_constants.SeriesToHigherFrequencyMethod.PULSE,
+												macrobond_api_constants.SeriesToHigherFrequencyMethod.LINEAR_INTERPOLATION],
+					'MissingValueMethod': [macrobond_api_constants.SeriesMissingValueMethod.NONE,
+										   macrobond_api_constants.SeriesMissingValueMethod.PREVIOUS,
+										   macrobond_api_constants.SeriesMissingValueMethod.ZERO,
+										   macrobond_api_constants.SeriesMissingValueMethod.LINEAR_INTERPOLATION]}
+
+# Business days and weeks are counted from here, a Thursday
+EPOCH_DAY = '1970-01-01'
+
+
+def f_align_panel(ticker_list: list, dates_list: list, values_list: list) -> pd.DataFrame:
+	"""
+	Build a DataFrame indexed on the sorted union of all dates with one float64 column per ticker
+	:param ticker_list: column names
+	:param dates_list: one datetime64 array per ticker
+	:param values_list: one float64 array per ticker
+	"""
+	if len(ticker_list) == 0:
+		return pd.DataFrame(index=pd.DatetimeIndex([]), columns=ticker_list, dtype=np.float64)
+
+	# Sorted union of the dates, the concatenated dates are freed before the block is allocated
+	union_dates = np.unique(np.concatenate(dates_list).astype('datetime64[ns]', copy=False))
+
+	# Fill the block one series at a time, so that temporaries are never longer than one series
+	block = np.full((len(union_dates), len(ticker_list)), np.nan, dtype=np.float64)
+	for j, (dates, values) in enumerate(zip(dates_list, values_list)):
+		if len(dates) > 0:
+			block[np.searchsorted(union_dates, dates.astype('datetime64[ns]', copy=False)), j] = values
+
+	return pd.DataFrame(block, index=pd.DatetimeIndex(union_dates), columns=ticker_list, copy=False)
+
+
+def f_scatter(ticker_list: list, column_index: np.ndarray, dates: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+	"""
+	Scatter observations (column, date, value) into a DataFrame indexed on the sorted union of the dates
+	"""
+	# Sorted union of the dates and the row of every single observation
+	union_dates, row_index = np.unique(dates, return_inverse=True)
+
+	# Scatter everything into one contiguous block
+	block = np.full((len(union_dates), len(ticker_list)), np.nan, dtype=np.float64)
+	block[row_index.ravel(), column_index] = values
+
+	return pd.DataFrame(block, index=pd.DatetimeIndex(union_dates), columns=ticker_list, copy=False)
+
+
+def f_long_panel(ticker_list: list, dates_list: list, values_list: list, date_type: str = 'datetime64',
+				 value_dtype: str = 'float64') -> pd.DataFrame:
+	"""
+	Build a long table with one row per observation: Ticker (categorical), Date and Value
+	:param date_type: 'datetime64' for datetime64[ns] or 'int32' for days since 1970-01-01
+	:param value_dtype: 'float64' or 'float32'
+	"""
+	date_type_list = ['datetime64', 'int32']
+	if date_type not in date_type_list:
+		raise KeyError(f'Invalid date type. Expected: {date_type_list}')
+
+	value_dtype_list = ['float64', 'float32']
+	if value_dtype not in value_dtype_list:
+		raise KeyError(f'Invalid value dtype. Expected: {value_dtype_list}')
+
+	lengths = np.fromiter(map(len, dates_list), dtype=np.int64, count=len(dates_list))
+
+	# A ticker given twice is one category
+	category_pos = dict()
+	ticker_codes = [category_pos.setdefault(ticker, len(category_pos)) for ticker in ticker_list]
+
+	# Smallest integer type for the ticker codes
+	code_dtype = np.int16 if len(category_pos) < 2 ** 15 else np.int32
+	codes = np.repeat(np.array(ticker_codes, dtype=code_dtype), lengths)
+
+	if len(ticker_list) > 0 and lengths.sum() > 0:
+		dates = np.concatenate(dates_list).astype('datetime64[ns]', copy=False)
+		values = np.concatenate(values_list).astype(value_dtype, copy=False)
+	else:
+		dates = np.empty(0, dtype='datetime64[ns]')
+		values = np.empty(0, dtype=value_dtype)
+
+	if date_type == 'int32':
+		dates = dates.astype('datetime64[D]').astype(np.int32)
+
+	return pd.DataFrame({'Ticker': pd.Categorical.from_codes(codes, categories=pd.Index(list(category_pos),
+																						 dtype=object)),
+						 'Date': dates,
+						 'Value': values})
+
+
+def f_long_to_wide(df_long: pd.DataFrame, ticker_list: list = None) -> pd.DataFrame:
+	"""
+	Pivot a long table of f_long_panel to a wide float64 panel, optionally only some tickers
+	Columns follow ticker_list, or the categories of Ticker if not given
+	"""
+	categories = list(df_long['Ticker'].cat.categories)
+	codes = df_long['Ticker'].cat.codes.to_numpy()
+	dates = df_long['Date'].to_numpy()
+	values = df_long['Value'].to_numpy(dtype=np.float64)
+
+	if ticker_list is None:
+		ticker_list = categories
+		column_index = codes
+	else:
+		# Map category code -> column, -1 for tickers that are not wanted
+		position = {ticker: i for i, ticker in enumerate(categories)}
+		missing = [ticker for ticker in ticker_list if ticker not in position]
+		if missing:
+			raise KeyError(f'Tickers not in the table: {missing}')
+
+		code_to_column = np.full(len(categories), -1, dtype=np.int64)
+		code_to_column[[position[ticker] for ticker in ticker_list]] = np.arange(len(ticker_list))
+
+		column_index = code_to_column[codes]
+		keep = column_index >= 0
+		column_index = column_index[keep]
+		dates = dates[keep]
+		values = values[keep]
+
+	# Day ordinals back to dates
+	if np.issubdtype(dates.dtype, np.integer):
+		dates = dates.astype('datetime64[D]')
+
+	return f_scatter(list(ticker_list), column_index, dates.astype('datetime64[ns]', copy=False), values)
+
+
+def f_format_panel(ticker_list: list, dates_list: list, values_list: list, output_format: str = 'wide',
+				   date_type: str = 'datetime64', value_dtype: str = 'float64') -> pd.DataFrame:
+	"""
+	Wide panel (f_align_panel) or long table (f_long_panel) of unpacked series
+	"""
+	output_format_list = ['wide', 'long']
+	if output_format.lower() not in output_format_list:
+		raise KeyError(f'Invalid output format. Expected: {output_format_list}')
+
+	if output_format.lower() == 'long':
+		return f_long_panel(ticker_list=ticker_list, dates_list=dates_list, values_list=values_list,
+							date_type=date_type, value_dtype=value_dtype)
+
+	return f_align_panel(ticker_list=ticker_list, dates_list=dates_list, values_list=values_list)
+
+
+def f_resample_panel(ticker_list: list, dates_list: list, values_list: list, frequency_list: list,
+					 frequency='monthly', ticker_options: dict = None, **kwargs) -> pd.DataFrame:
+	"""
+	Convert series of mixed frequencies to one frequency and align them in one pass
+	Returns a DataFrame indexed on the end of period dates of the target frequency, one column per ticker
+	:param dates_list: one datetime64 array of start of period dates per ticker
+	:param values_list: one float64 array per ticker
+	:param frequency_list: frequency of every series, a name or macrobond_api_constants.SeriesFrequency
+	:param frequency: target frequency, a name or a constant (daily means Monday to Friday)
+	:param ticker_options: ticker -> kwargs for that ticker only
+	kwargs keys (not case sensitive) are those of the unified series request, by name or constant:
+	ToLowerFrequencyMethod: last (auto), first, average, flow (sum), highest or lowest
+	ToHigherFrequencyMethod: same (auto), distribute, pulse or linear_interpolation
+	MissingValueMethod: none (auto), previous, zero or linear_interpolation, fills gaps within every series
+	"""
+	target = f_frequency_name(frequency)
+	default_options = f_resample_options(kwargs)
+
+	if ticker_options is None:
+		ticker_options = dict()
+
+	# Tickers that are converted the same way are done together: (direction, source, method) -> positions
+	groups = dict()
+	fill_methods = list()
+	for i, ticker in enumerate(ticker_list):
+		options = f_resample_options(ticker_options.get(ticker, {}), options=default_options)
+		source = f_frequency_name(frequency_list[i])
+
+		# Same frequency is done as a conversion to a lower one, in case there are several values per period
+		if RESAMPLE_FREQUENCIES[source] < RESAMPLE_FREQUENCIES[target]:
+			key = ('higher', source, options['ToHigherFrequencyMethod'])
+		else:
+			key = ('lower', source, options['ToLowerFrequencyMethod'])
+		groups.setdefault(key, list()).append(i)
+
+		# Interpolation to a higher frequency fills between the observations at the end of every period
+		if key[0] == 'higher' and key[2] == macrobond_api_constants.SeriesToHigherFrequencyMethod.LINEAR_INTERPOLATION:
+			fill_methods.append(macrobond_api_constants.SeriesMissingValueMethod.LINEAR_INTERPOLATION)
+		else:
+			fill_methods.append(options['MissingValueMethod'])
+
+	column_changes = [np.empty(0, dtype=np.int64)]
+	period_changes = [np.empty(0, dtype=np.int64)]
+	value_changes = [np.empty(0, dtype=np.float64)]
+
+	for (direction, source, method), position_list in groups.items():
+		lengths = np.array([len(dates_list[i]) for i in position_list], dtype=np.int64)
+		if lengths.sum() == 0:
+			continue
+
+		columns = np.repeat(np.array(position_list, dtype=np.int64), lengths)
+		dates = np.concatenate([dates_list[i] for i in position_list]).astype('datetime64[D]')
+		values = np.concatenate([values_list[i] for i in position_list]).astype(np.float64, copy=False)
+
+		# Missing values are skipped by every conversion
+		keep = ~np.isnan(values)
+		columns, dates, values = columns[keep], dates[keep], values[keep]
+
+		if direction == 'lower':
+			columns, periods, values = f_to_lower(columns, f_period_id(dates, target), values, method)
+		else:
+			columns, periods, values = f_to_higher(columns, dates, values, source, target, method)
+
+		column_changes.append(columns)
+		period_changes.append(periods)
+		value_changes.append(values)
+
+	columns = np.concatenate(column_changes)
+	periods = np.concatenate(period_changes)
+	values = np.concatenate(value_changes)
+
+	if len(periods) == 0:
+		return pd.DataFrame(index=pd.DatetimeIndex([]), columns=ticker_list, dtype=np.float64)
+
+	# One row per target period from the first to the last one
+	first_period = periods.min()
+	block = np.full((periods.max() - first_period + 1, len(ticker_list)), np.nan, dtype=np.float64)
+	block[periods - first_period, columns] = values
+
+	fill_methods = np.array(fill_methods)
+	for method in np.unique(fill_methods):
+		if method != macrobond_api_constants.SeriesMissingValueMethod.NONE:
+			fill_columns = np.flatnonzero(fill_methods == method)
+			block[:, fill_columns] = f_fill_missing(block[:, fill_columns], method)
+
+	index = pd.DatetimeIndex(f_period_end(np.arange(first_period, periods.max() + 1), target))
+
+	return pd.DataFrame(block, index=index, columns=ticker_list, copy=False)
+
+
+def f_to_lower(columns: np.ndarray, periods: np.ndarray, values: np.ndarray, method: int) -> tuple:
+	"""
+	Aggregate observations (in date order per column) to one value per column and target period
+	"""
+	# One int64 key per (column, period), the stable sort keeps the date order within every key
+	first_period = periods.min() if len(periods) else 0
+	key = columns * (periods.max() - first_period + 1 if len(periods) else 1) + (periods - first_period)
+	order = np.argsort(key, kind='stable')
+	columns, periods, values = columns[order], periods[order], values[order]
+
+	start = np.ones(len(values), dtype=bool)
+	start[1:] = (columns[1:] != columns[:-1]) | (periods[1:] != periods[:-1])
+	starts = np.flatnonzero(start)
+	ends = np.append(starts[1:], len(values))
+
+	if method == macrobond_api_constants.SeriesToLowerFrequencyMethod.LAST:
+		result = values[ends - 1]
+	elif method == macrobond_api_constants.SeriesToLowerFrequencyMethod.FIRST:
+		result = values[starts]
+	elif method == macrobond_api_constants.SeriesToLowerFrequencyMethod.AVERAGE:
+		result = np.add.reduceat(values, starts) / (ends - starts)
+	elif method == macrobond_api_constants.SeriesToLowerFrequencyMethod.FLOW:
+		result = np.add.reduceat(values, starts)
+	elif method == macrobond_api_constants.SeriesToLowerFrequencyMethod.HIGHEST:
+		result = np.maximum.reduceat(values, starts)
+	else:
+		result = np.minimum.reduceat(values, starts)
+
+	return columns[starts], periods[starts], result
+
+
+def f_to_higher(columns: np.ndarray, dates: np.ndarray, values: np.ndarray, source: str, target: str,
+				method: int) -> tuple:
+	"""
+	Spread every observation over the target periods of its source period
+	"""
+	# First and last target period of every source period. A target period straddling the end of a source period
+	# belongs to the next one, e.g. a month ending on a Sunday ends on the Friday and its last week is the one
+	# ending on or before its last day
+	first = f_period_id(dates, target)
+	last = f_period_id(f_period_end(f_period_id(dates, source), source), target, roll='backward')
+	counts = last - first + 1
+
+	if method in [macrobond_api_constants.SeriesToHigherFrequencyMethod.PULSE,
+				  macrobond_api_constants.SeriesToHigherFrequencyMethod.LINEAR_INTERPOLATION]:
+		return columns, last, values
+
+	# Every target period of the source period
+	offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+	if method == macrobond_api_constants.SeriesToHigherFrequencyMethod.DISTRIBUTE:
+		values = values / counts
+
+	return np.repeat(columns, counts), np.repeat(first, counts) + offsets, np.repeat(values, counts)
+
+
+def f_fill_missing(block: np.ndarray, method: int) -> np.ndarray:
+	"""
+	Fill nan between the first and last observation of every column
+	"""
+	n = block.shape[0]
+	valid = ~np.isnan(block)
+	rows = np.arange(n)[:, np.newaxis]
+	column_index = np.arange(block.shape[1])[np.newaxis, :]
+
+	# Row of the previous and of the next observation of every cell
+	prev_row = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+	next_row = np.minimum.accumulate(np.where(valid, rows, n)[::-1], axis=0)[::-1]
+	gap = ~valid & (prev_row >= 0) & (next_row < n)
+
+	if method == macrobond_api_constants.SeriesMissingValueMethod.ZERO:
+		filled = np.zeros_like(block)
+	else:
+		prev_value = block[np.maximum(prev_row, 0), column_index]
+
+		if method == macrobond_api_constants.SeriesMissingValueMethod.PREVIOUS:
+			filled = prev_value
+		else:
+			next_value = block[np.minimum(next_row, n - 1), column_index]
+			with np.errstate(invalid='ignore', divide='ignore'):
+				filled = prev_value + (next_value - prev_value) * (rows - prev_row) / (next_row - prev_row)
+
+	return np.where(gap, filled, block)
+
+
+def f_period_id(dates: np.ndarray, frequency: str, roll: str = 'forward') -> np.ndarray:
+	"""
+	Integer number of the target period of every date, consecutive periods have consecutive numbers
+	Days are Monday to Friday and weeks end on Friday
+	:param roll: a date belongs to the period it is in, or for weekends the next Monday (forward), or to the last
+	period ending on or before it (backward)
+	"""
+	days = np.asarray(dates).astype('datetime64[D]')
+
+	if roll == 'backward':
+		return f_period_id(days + np.timedelta64(1, 'D'), frequency) - 1
+
+	if frequency == 'daily':
+		return np.busday_count(np.datetime64(EPOCH_DAY, 'D'), days).astype(np.int64)
+
+	if frequency == 'weekly':
+		return (days.astype(np.int64) + 5) // 7
+
+	return days.astype('datetime64[M]').astype(np.int64) // MONTHS_PER_PERIOD[frequency]
+
+
+def f_period_end(periods: np.ndarray, frequency: str) -> np.ndarray:
+	"""
+	Last day (datetime64[ns]) of every period of f_period_id
+	"""
+	periods = np.asarray(periods, dtype=np.int64)
+
+	if frequency == 'daily':
+		days = np.busday_offset(np.datetime64(EPOCH_DAY, 'D'), periods, roll='forward')
+	elif frequency == 'weekly':
+		days = (periods * 7 + 1).astype('datetime64[D]')
+	else:
+		months = ((periods + 1) * MONTHS_PER_PERIOD[frequency]).astype('datetime64[M]')
+		days = months.astype('datetime64[D]') - np.timedelta64(1, 'D')
+
+	return days.astype('datetime64[ns]')
+
+
+def f_frequency_name(frequency) -> str:
+	"""
+	Frequency name of the resample engine from a name or a macrobond_api_constants.SeriesFrequency constant
+	"""
+	constant = UnifiedRequestBuilder.f_constant(macrobond_api_constants.SeriesFrequency, frequency)
+
+	for name, value in RESAMPLE_FREQUENCIES.items():
+		if value == constant:
+			return name
+
+	raise KeyError(f'Frequency {frequency} can not be resampled locally. Expected: {list(RESAMPLE_FREQUENCIES)}')
+
+
+def f_resample_options(kwargs: dict, options: dict = None) -> dict:
+	"""
+	Conversion methods from kwargs, not case sensitive, AUTO is replaced by the default method
+	:param options: methods that are not in kwargs, default AUTO for all
+	"""
+	if options is None:
+		options = {attribute: method_list[0] for attribute, method_list in RESAMPLE_METHODS.items()}
+	options = dict(options)
+
+	for key, val in kwargs.items():
+		if key.lower() not in SERIES_OPTIONS or SERIES_OPTIONS[key.lower()][0] not in RESAMPLE_METHODS:
+			raise KeyError(f'Kwargs key: {key} not defined. Expected: {list(RESAMPLE_METHODS)}')
+
+		attribute, constants = SERIES_OPTIONS[key.lower()]
+		method = UnifiedRequestBuilder.f_constant(constants, val)
+
+		if method == constants.AUTO:
+			method = RESAMPLE_METHODS[attribute][0]
+		elif method not in RESAMPLE_METHODS[attribute]:
+			raise KeyError(f'{attribute} {val} can not be done locally, use a unified series request')
+
+		options[attribute] = method
+
+	return options
@@ -0,0 +1,208 @@
+"""
+Export of fetched panels to Arrow IPC (Feather v2) files that other processes can memory-map
+
+A panel is stored as a Date column (timestamp[ns]) and one float64 column per ticker, uncompressed, so that a
+reader maps the file and gets the columns without copying them: many processes on one machine share the pages
+of a single file in the OS page cache instead of each holding a deserialized copy. Missing values are stored as
+nan and not as nulls, since columns with a validity bitmap can not be handed to pandas without a copy.
+
+Metadata per ticker (e.g. the columns of m_get_full_info) is stored on the columns and the revision level
+(e.g. 'latest', 'first release' or a vintage time) on the file.
+
+Append mode writes every chunk to its own part file in a directory. Reading a directory of parts with the same
+tickers (chunks of dates) stays zero-copy, parts with different tickers (chunks of tickers) are joined on the
+dates, which copies them.
+"""
+from __future__ import annotations
+import os
+import json
+from macrobond.lazy_import import f_lazy_import
+np = f_lazy_import('numpy')
+pd = f_lazy_import('pandas')
+
+# Key of the metadata stored on the schema and on the fields
+METADATA_KEY = b'macrobond'
+
+# Extension of part files in append mode
+PART_EXTENSION = '.arrow'
+
+
+def f_pyarrow():
+	try:
+		import pyarrow
+		import pyarrow.ipc
+	except ImportError as ie:
+		print(f'Arrow export requires pyarrow: pip install pyarrow')
+		raise ie
+
+	return pyarrow
+
+
+def f_panel_to_table(df: pd.DataFrame, ticker_metadata=None, revision: str = None):
+	"""
+	Convert a panel (DatetimeIndex, one column per ticker) to a pyarrow.Table
+	Columns of a MultiIndex, e.g. (ticker, 'Rev0') of FetchOneSeriesWithRevisions, are stored as 'ticker|Rev0'
+	:param ticker_metadata: ticker -> dict of metadata, or a DataFrame indexed by ticker or with a Ticker column
+	:param revision: revision level of the values in the panel
+	"""
+	pa = f_pyarrow()
+
+	ticker_metadata = f_metadata_dict(ticker_metadata)
+	n_levels = df.columns.nlevels
+
+	fields = [pa.field('Date', pa.timestamp('ns'))]
+	arrays = [pa.array(np.asarray(df.index.values, dtype='datetime64[ns]'))]
+
+	for i, column in enumerate(df.columns):
+		levels = [str(level) for level in column] if n_levels > 1 else [str(column)]
+		metadata = dict(ticker_metadata.get(levels[0], {}))
+		if n_levels > 1:
+			metadata['ColumnLevels'] = levels
+
+		fields.append(pa.field('|'.join(levels), pa.float64(),
+							   metadata={METADATA_KEY: json.dumps(metadata, default=str).encode()}))
+
+		# nan stays nan, no nulls
+		arrays.append(pa.array(df.iloc[:, i].to_numpy(dtype=np.float64)))
+
+	schema_metadata = {'Revision': revision, 'ColumnLevels': n_levels}
+	schema = pa.schema(fields, metadata={METADATA_KEY: json.dumps(schema_metadata, default=str).encode()})
+
+	return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def f_write_panel(path: str, df: pd.DataFrame, ticker_metadata=None, revision: str = None) -> str:
+	"""
+	Write a panel to one uncompressed Arrow IPC file, the file is replaced atomically
+	"""
+	pa = f_pyarrow()
+	table = f_panel_to_table(df, ticker_metadata=ticker_metadata, revision=revision)
+
+	tmp_path = path + '.tmp'
+	with pa.OSFile(tmp_path, 'wb') as sink:
+		with pa.ipc.new_file(sink, table.schema) as writer:
+			writer.write_table(table)
+	os.replace(tmp_path, path)
+
+	return path
+
+
+def f_append_panel(directory: str, df: pd.DataFrame, ticker_metadata=None, revision: str = None) -> str:
+	"""
+	Write a chunk of a panel to the next part file of a directory, e.g. every chunk of m_iter_series
+	"""
+	os.makedirs(directory, exist_ok=True)
+
+	part_list = f_part_list(directory)
+	n = int(os.path.basename(part_list[-1])[5:-len(PART_EXTENSION)]) + 1 if part_list else 0
+
+	return f_write_panel(os.path.join(directory, f'part-{n:05d}{PART_EXTENSION}'), df,
+						 ticker_metadata=ticker_metadata, revision=revision)
+
+
+def f_part_list(directory: str) -> list:
+	return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+				  if name.startswith('part-') and name.endswith(PART_EXTENSION))
+
+
+def f_read_table(path: str, columns: list = None):
+	"""
+	Memory-mapped pyarrow.Table of a file, or of all parts of a directory with the same columns
+	:param columns: tickers to read, default all
+	"""
+	pa = f_pyarrow()
+
+	tables = f_map_tables(path)
+	if len({tuple(t.schema.names) for t in tables}) > 1:
+		raise KeyError(f'Parts of {path} have different columns, use f_read_panel')
+
+	table = pa.concat_tables(tables)
+	if columns is not None:
+		table = table.select(['Date'] + list(columns))
+
+	return table
+
+
+def f_map_tables(path: str) -> list:
+	"""
+	Memory-mapped pyarrow.Table of every part of a directory, or of a single file
+	"""
+	pa = f_pyarrow()
+
+	path_list = f_part_list(path) if os.path.isdir(path) else [path]
+	if not path_list:
+		raise KeyError(f'No panel found in {path}')
+
+	return [pa.ipc.open_file(pa.memory_map(p, 'r')).read_all() for p in path_list]
+
+
+def f_read_panel(path: str, columns: list = None) -> pd.DataFrame:
+	"""
+	Read a panel written by f_write_panel or f_append_panel without copying the values
+	Parts of a directory with different tickers are joined on the dates (this copies)
+	"""
+	tables = f_map_tables(path)
+
+	# Chunks of dates
+	if len({tuple(t.schema.names) for t in tables}) == 1:
+		return f_table_to_panel(f_read_table(path, columns=columns))
+
+	# Chunks of tickers
+	df_list = list()
+	for table in tables:
+		if columns is not None:
+			table = table.select(['Date'] + [c for c in columns if c in table.schema.names])
+		df_list.append(f_table_to_panel(table))
+
+	df = pd.concat(df_list, axis=1, sort=True)
+
+	return df.loc[:, ~df.columns.duplicated(keep='last')]
+
+
+def f_table_to_panel(table) -> pd.DataFrame:
+	"""
+	Convert a table of f_panel_to_table to a panel, columns without nulls in one chunk are not copied
+	"""
+	meta = json.loads(table.schema.metadata[METADATA_KEY]) if table.schema.metadata else {}
+
+	values = table.select([name for name in table.schema.names if name != 'Date'])
+	df = values.to_pandas(split_blocks=True)
+	df.index = pd.DatetimeIndex(table.column('Date').to_numpy())
+
+	if meta.get('ColumnLevels', 1) > 1:
+		df.columns = pd.MultiIndex.from_tuples([tuple(c.split('|')) for c in df.columns])
+
+	return df
+
+
+def f_read_metadata(path: str) -> tuple:
+	"""
+	Metadata of a file or directory: (ticker -> dict of metadata, revision level)
+	"""
+	ticker_metadata = dict()
+	revision = None
+	for table in f_map_tables(path):
+		schema = table.schema
+		revision = json.loads(schema.metadata[METADATA_KEY]).get('Revision')
+
+		for field in schema:
+			if field.name != 'Date' and field.metadata:
+				metadata = json.loads(field.metadata[METADATA_KEY])
+				ticker_metadata[field.name.split('|')[0]] = metadata
+
+	return ticker_metadata, revision
+
+
+def f_metadata_dict(ticker_metadata) -> dict:
+	"""
+	ticker -> dict of metadata from a dict or a DataFrame such as the one of m_get_full_info
+	"""
+	if ticker_metadata is None:
+		return dict()
+
+	if isinstance(ticker_metadata, pd.DataFrame):
+		if 'Ticker' in ticker_metadata.columns:
+			ticker_metadata = ticker_metadata.set_index('Ticker')
+		return ticker_metadata.to_dict('index')
+
+	return ticker_metadata
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import asyncio
+import functools
+import datetime as dt
+from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from macrobond.c_macrobond import Macrobond
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+
+
+class AsyncMacrobond:
+	"""
+	asyncio front-end for Macrobond
+
+	Every call runs on a dedicated thread pool, each thread with its own database connection, so the event loop
+	is never blocked by COM. At most max_concurrency calls are in flight at the same time.
+
+	Example:
+	amb = AsyncMacrobond(max_workers=4)
+	df = await amb.FetchSeries(ticker_list=['usnaac0057', 'senaac0067'])
+	"""
+
+	def __init__(self, mb: Macrobond = None, max_workers: int = 4, max_concurrency: int = None, **kwargs):
+		"""
+		:param mb: Macrobond instance to wrap. If None, one is created with **kwargs
+		:param max_workers: number of threads in the executor
+		:param max_concurrency: max number of calls in flight, the rest wait without taking a thread. Default: max_workers
+		"""
+		if mb is None:
+			mb = Macrobond(**kwargs)
+
+		self.mb = mb
+		self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='macrobond-async')
+		self.max_concurrency = max_concurrency if max_concurrency is not None else max_workers
+
+		# The semaphore is created in the running event loop on first use
+		self.semaphore = None
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_val, exc_tb):
+		self.m_close()
+
+	def m_close(self):
+		"""
+		Shut down the executor, calls that are already running are finished
+		"""
+		self.executor.shutdown(wait=False)
+
+	async def m_run(self, method, *args, **kwargs):
+		"""
+		Run a blocking method on the executor, limited by max_concurrency
+		"""
+		if self.semaphore is None:
+			self.semaphore = asyncio.Semaphore(self.max_concurrency)
+
+		async with self.semaphore:
+			loop = asyncio.get_running_loop()
+			return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+
+	async def m_gather(self, method_name: str, kwargs_list: list, return_exceptions: bool = False) -> list:
+		"""
+		Call one method many times concurrently and return the results in the same order
+		Example: await amb.m_gather('m_get_title', [{'ticker': 'usnaac0057'}, {'ticker': 'senaac0067'}])
+		"""
+		method = getattr(self.mb, method_name)
+
+		return await asyncio.gather(*[self.m_run(method, **kwargs) for kwargs in kwargs_list],
+									return_exceptions=return_exceptions)
+
+	async def FetchOneSeries(self, ticker: str) -> pd.DataFrame:
+		return await self.m_run(self.mb.FetchOneSeries, ticker)
+
+	async def FetchSeries(self, ticker_list: list, chunk_size: int = None, max_workers: int = 1,
+						  output_format: str = 'wide', date_type: str = 'datetime64',
+						  value_dtype: str = 'float64') -> pd.DataFrame:
+		return await self.m_run(self.mb.FetchSeries, ticker_list, chunk_size=chunk_size, max_workers=max_workers,
+								output_format=output_format, date_type=date_type, value_dtype=value_dtype)
+
+	async def FetchOneSeriesWithRevisions(self, ticker: str) -> pd.DataFrame:
+		return await self.m_run(self.mb.FetchOneSeriesWithRevisions, ticker)
+
+	async def CreateUnifiedSeriesRequst(self, ticker_list: list, **kwargs) -> pd.DataFrame:
+		return await self.m_run(self.mb.CreateUnifiedSeriesRequst, ticker_list, **kwargs)
+
+	async def CreateSearchQuery(self, concept_filter: str = 'gdp_total', entity_type_filter: str = 'TimeSeries',
+								**kwargs) -> list:
+		return await self.m_run(self.mb.CreateSearchQuery, concept_filter, entity_type_filter, **kwargs)
+
+	async def m_get_full_info(self, ticker_list: list, metadata_list: list = None) -> pd.DataFrame:
+		return await self.m_run(self.mb.m_get_full_info, ticker_list, metadata_list=metadata_list)
+
+	async def m_series_concept(self, ticker: str) -> Tuple[str, str]:
+		return await self.m_run(self.mb.m_series_concept, ticker)
+
+	async def m_discontinued(self, ticker: str):
+		return await self.m_run(self.mb.m_discontinued, ticker)
+
+	async def m_get_replacement_ticker(self, ticker: str) -> str:
+		return await self.m_run(self.mb.m_get_replacement_ticker, ticker)
+
+	async def m_get_frequency(self, ticker: str) -> str:
+		return await self.m_run(self.mb.m_get_frequency, ticker)
+
+	async def m_get_title(self, ticker: str):
+		return await self.m_run(self.mb.m_get_title, ticker)
+
+	async def m_release_date(self, ticker: str, date_option: str, full_date_format_tf: bool = False) -> dt.datetime:
+		return await self.m_run(self.mb.m_release_date, ticker, date_option, full_date_format_tf)
+
+	async def m_release_dates(self, ticker_list: list, full_date_format_tf: bool = False) -> pd.DataFrame:
+		return await self.m_run(self.mb.m_release_dates, ticker_list, full_date_format_tf)
+
+	async def m_get_metadata(self, ticker: str, option: str):
+		return await self.m_run(self.mb.m_get_metadata, ticker, option)
@@ -0,0 +1,52 @@
+import threading
+
+
+def f_com_connection():
+	"""
+	Create a connection to the Macrobond database for the current thread
+	COM has to be initialized in every thread before it is used
+	"""
+	# Imported here so that everything else works without pywin32, e.g. against a stand-in database
+	import pythoncom
+	import win32com.client
+
+	pythoncom.CoInitialize()
+
+	# Initiate win32com connection to macrobond
+	c = win32com.client.Dispatch('Macrobond.Connection')
+
+	# Create connection to the database
+	return c.Database
+
+
+class ConnectionPool:
+	"""
+	Keeps one database connection per thread
+
+	connection_factory is called without arguments the first time a thread asks for a connection. By default a
+	COM connection is created, but any object with the same methods as the Macrobond database can be used.
+	"""
+
+	def __init__(self, connection_factory=None):
+		if connection_factory is None:
+			connection_factory = f_com_connection
+
+		self.connection_factory = connection_factory
+		self.local = threading.local()
+		self.lock = threading.Lock()
+		self.connection_count = 0
+
+	def m_get(self):
+		"""
+		Return the connection of the current thread, create it if needed
+		"""
+		db = getattr(self.local, 'db', None)
+
+		if db is None:
+			db = self.connection_factory()
+			self.local.db = db
+
+			with self.lock:
+				self.connection_count += 1
+
+		return db
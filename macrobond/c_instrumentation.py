@@ -0,0 +1,290 @@
+from __future__ import annotations
+import time
+import threading
+import functools
+import contextlib
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+
+
+class CallRecorder:
+	"""
+	Counts and times every call into the database and every instrumented public method
+
+	For every database call an event is created: {'Type': 'com', 'Name', 'Tickers', 'Observations', 'Seconds'}.
+	For every public method: {'Type': 'method', 'Name', 'Seconds', 'ComSeconds', 'ConversionSeconds'}, where
+	ComSeconds is the wall-clock time during which at least one database call made by the method was running, also
+	from worker threads. Calls that overlap on several workers are counted once, so ConversionSeconds is not negative.
+	Events are passed to every hook, e.g. to export them to a metrics pipeline.
+	"""
+
+	def __init__(self):
+		# name -> [calls, seconds, tickers, observations]
+		self.com_stats = dict()
+
+		# name -> [calls, seconds, com seconds]
+		self.method_stats = dict()
+
+		self.hooks = list()
+		self.lock = threading.Lock()
+
+		# Methods that are running in this thread, innermost last
+		self.local = threading.local()
+
+		# Event lists of active m_profile() blocks
+		self.event_lists = list()
+
+	def m_add_hook(self, hook):
+		"""
+		Add a callable that gets every event dictionary
+		"""
+		self.hooks.append(hook)
+
+	def m_remove_hook(self, hook):
+		self.hooks.remove(hook)
+
+	def m_stack(self) -> list:
+		stack = getattr(self.local, 'stack', None)
+
+		if stack is None:
+			stack = list()
+			self.local.stack = stack
+
+		return stack
+
+	def m_record_com(self, name: str, tickers: int, observations: int, seconds: float, start: float = None):
+		"""
+		Record one database call and add its time to the methods that are running
+		:param start: time.perf_counter() at the start of the call, default seconds before now
+		"""
+		if start is None:
+			start = time.perf_counter() - seconds
+
+		event = {'Type': 'com', 'Name': name, 'Tickers': tickers, 'Observations': observations, 'Seconds': seconds}
+
+		with self.lock:
+			stats = self.com_stats.setdefault(name, [0, 0.0, 0, 0])
+			stats[0] += 1
+			stats[1] += seconds
+			stats[2] += tickers
+			stats[3] += observations
+
+			for frame in self.m_stack():
+				frame['Intervals'].append((start, start + seconds))
+
+		self.m_emit(event)
+
+	def m_emit(self, event: dict):
+		for event_list in self.event_lists:
+			event_list.append(event)
+
+		for hook in self.hooks:
+			hook(event)
+
+	@contextlib.contextmanager
+	def m_method(self, name: str):
+		"""
+		Time a public method, nested methods are timed as well
+		"""
+		frame = {'Name': name, 'Intervals': list()}
+		stack = self.m_stack()
+		stack.append(frame)
+
+		t0 = time.perf_counter()
+		try:
+			yield frame
+		finally:
+			seconds = time.perf_counter() - t0
+			stack.pop()
+
+			with self.lock:
+				com_seconds = self.f_union_seconds(frame['Intervals'])
+
+				stats = self.method_stats.setdefault(name, [0, 0.0, 0.0])
+				stats[0] += 1
+				stats[1] += seconds
+				stats[2] += com_seconds
+
+			self.m_emit({'Type': 'method', 'Name': name, 'Seconds': seconds, 'ComSeconds': com_seconds,
+						 'ConversionSeconds': max(seconds - com_seconds, 0.0)})
+
+	def m_wrap(self, func):
+		"""
+		Wrap a function that runs on a worker thread, so that its database time counts for the calling methods
+		"""
+		parent_stack = list(self.m_stack())
+
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			self.local.stack = list(parent_stack)
+			try:
+				return func(*args, **kwargs)
+			finally:
+				self.local.stack = list()
+
+		return wrapper
+
+	@property
+	def count_observations(self) -> bool:
+		"""
+		Observations are only counted while profiling, since reading Values is an extra COM transfer
+		"""
+		return len(self.event_lists) > 0
+
+	@contextlib.contextmanager
+	def m_profile(self, print_tf: bool = True):
+		"""
+		Collect all events within the block and print a per-call breakdown at the end
+
+		Example:
+		with mb.recorder.m_profile() as events:
+			df = mb.FetchSeries(ticker_list)
+		"""
+		events = list()
+		self.event_lists.append(events)
+		try:
+			yield events
+		finally:
+			self.event_lists.remove(events)
+
+			if print_tf:
+				print(self.f_breakdown(events))
+
+	def m_report(self) -> pd.DataFrame:
+		"""
+		Totals since start (or the last m_reset) of database calls and public methods
+		"""
+		with self.lock:
+			com = [{'Type': 'com', 'Name': name, 'Calls': s[0], 'Seconds': s[1], 'Tickers': s[2],
+					'Observations': s[3]} for name, s in self.com_stats.items()]
+			method = [{'Type': 'method', 'Name': name, 'Calls': s[0], 'Seconds': s[1], 'ComSeconds': s[2],
+					   'ConversionSeconds': max(s[1] - s[2], 0.0)} for name, s in self.method_stats.items()]
+
+		return pd.DataFrame(com + method)
+
+	def m_reset(self):
+		with self.lock:
+			self.com_stats.clear()
+			self.method_stats.clear()
+
+	@staticmethod
+	def f_union_seconds(interval_list: list) -> float:
+		"""
+		Length of the union of (start, end) intervals, overlapping calls are counted once
+		"""
+		total = 0.0
+		current_start, current_end = None, None
+
+		for start, end in sorted(interval_list):
+			if current_end is None or start > current_end:
+				if current_end is not None:
+					total += current_end - current_start
+				current_start, current_end = start, end
+			else:
+				current_end = max(current_end, end)
+
+		if current_end is not None:
+			total += current_end - current_start
+
+		return total
+
+	@staticmethod
+	def f_breakdown(events: list) -> str:
+		"""
+		Text table of events aggregated per type and name
+		"""
+		if not events:
+			return 'No calls recorded'
+
+		df = pd.DataFrame(events)
+		df['Calls'] = 1
+
+		columns = [c for c in ['Calls', 'Seconds', 'ComSeconds', 'ConversionSeconds', 'Tickers', 'Observations']
+				   if c in df.columns]
+		summary = df.groupby(['Type', 'Name'], sort=False)[columns].sum(min_count=1)
+
+		# Blank cells for columns that do not apply, e.g. Tickers of a method
+		text = pd.DataFrame(index=summary.index)
+		for column in columns:
+			fmt = '{:.4f}' if 'Seconds' in column else '{:.0f}'
+			text[column] = [fmt.format(x) if pd.notna(x) else '' for x in summary[column]]
+
+		return text.to_string()
+
+
+class InstrumentedDatabase:
+	"""
+	Proxy around a database connection that records every method call in a CallRecorder
+	Attributes that are not methods are passed through as they are
+	"""
+
+	def __init__(self, db, recorder: CallRecorder):
+		self.db = db
+		self.recorder = recorder
+
+	def __getattr__(self, name: str):
+		attr = getattr(self.db, name)
+
+		if not callable(attr):
+			return attr
+
+		recorder = self.recorder
+
+		def wrapper(*args, **kwargs):
+			t0 = time.perf_counter()
+			result = attr(*args, **kwargs)
+			seconds = time.perf_counter() - t0
+
+			recorder.m_record_com(name=name, tickers=f_count_tickers(args, result),
+								  observations=f_count_observations(result) if recorder.count_observations else 0,
+								  seconds=seconds, start=t0)
+
+			return result
+
+		return wrapper
+
+
+def f_count_tickers(args: tuple, result) -> int:
+	"""
+	Number of tickers in a call: one name, a list of names, or the number of series a request returned
+	"""
+	if not args:
+		return 0
+
+	arg = args[0]
+	if isinstance(arg, str):
+		return 1
+	if isinstance(arg, (list, tuple)):
+		return len(arg)
+	if isinstance(result, (list, tuple)):
+		return len(result)
+
+	return 0
+
+
+def f_count_observations(result) -> int:
+	"""
+	Number of values in the series of a result, 0 for anything else
+	"""
+	series = result if isinstance(result, (list, tuple)) else [result]
+
+	count = 0
+	for s in series:
+		values = getattr(s, 'Values', None)
+		if values is not None:
+			count += len(values)
+
+	return count
+
+
+def f_instrumented(method):
+	"""
+	Decorator for public methods of Macrobond, times the method through self.recorder
+	"""
+
+	@functools.wraps(method)
+	def wrapper(self, *args, **kwargs):
+		with self.recorder.m_method(method.__name__):
+			return method(self, *args, **kwargs)
+
+	return wrapper
@@ -1,10 +1,25 @@
-import pandas as pd
-import pytz
+from __future__ import annotations
 import datetime as dt
-import numpy as np
-import win32com.client
+import threading
 import macrobond_api_constants.SeriesFrequency
+import macrobond_api_constants.CalendarMergeMode
+import macrobond_api_constants.SeriesMissingValueMethod
+import macrobond_api_constants.SeriesPartialPeriodsMethod
 from typing import Tuple
+from macrobond.c_connection_pool import ConnectionPool, f_com_connection
+from macrobond.c_instrumentation import CallRecorder, InstrumentedDatabase, f_instrumented
+from macrobond.c_series_cache import SeriesCache
+from macrobond.c_object_cache import ObjectCache
+from macrobond.c_single_flight import SingleFlight
+from macrobond.c_vintage_history import VintageHistory, VintagePanel
+from macrobond.c_unified_request import UnifiedRequestBuilder
+from macrobond import ingest
+from macrobond import align
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+pytz = f_lazy_import('pytz')
+np = f_lazy_import('numpy')
+futures = f_lazy_import('concurrent.futures')
 
 '''
 All the different macrobond constants that exist
@@ -20,27 +35,165 @@ import macrobond_api_constants.SeriesWeekdays
 '''
 
 
+# Regions with code and description, see Macrobond.f_region_map
+REGION_MAP = {'asia': 'Asia',
+			  'asiapjp': 'Asia + Japan',
+			  'asiaxjp': 'Asia ex Japan',
+			  'asxmc': 'Asia ex Mainland China',
+			  'apac': 'Asia Pacific',
+			  'apacxjp': 'Asia Pacific ex Japan',
+			  'au': 'Australia',
+			  'br': 'Brazil',
+			  'ca': 'Canada',
+			  'cn': 'China',
+			  'dk': 'Denmark',
+			  'devasia': 'Developing Asia',
+			  'dvmkts': 'Developed Markets',
+			  'emkts': 'Emerging Markets',
+			  'eueu': 'EU',
+			  'eu': 'Euro Area',
+			  'europe': 'Europe',
+			  'fi': 'Finland',
+			  'fr': 'France',
+			  'de': 'Germany',
+			  'hk': 'Hong Kong',
+			  'in': 'India',
+			  'it': 'Italy',
+			  'jp': 'Japan',
+			  'latam': 'Latin America',
+			  'mfivasia': 'Major Five Asia',
+			  'nordic': 'Nordic Countries',
+			  'noram': 'North America',
+			  'no': 'Norway',
+			  'opec': 'OPEC Members',
+			  'sg': 'Singapore',
+			  'za': 'South Africa',
+			  'kr': 'South Korea',
+			  'es': 'Spain',
+			  'se': 'Sweden',
+			  'tw': 'Taiwan',
+			  'gb': 'United Kingdom',
+			  'us': 'United States'}
+
+# We may invert the dictionary since entries are unique
+REGION_MAP_INVERSE = {v: k for k, v in REGION_MAP.items()}
+
+# Frequencies used to split a truncated search, values of the Frequency attribute
+SEARCH_FREQUENCY_LIST = ['daily', 'weekly', 'monthly', 'bimonthly', 'quarterly', 'quadmonthly', 'semiannual', 'annual']
+
+# How truncated searches are split: (attribute, values), None means the values of the filter of the query
+SEARCH_PARTITION_LEVELS = [('Region', None), ('Frequency', SEARCH_FREQUENCY_LIST)]
+
+
 class Macrobond:
-	def __init__(self):
-		# Initiate win32com connection to macrobond
-		c = win32com.client.Dispatch('Macrobond.Connection')
+	def __init__(self, cache_dir: str = None, cache_max_bytes: int = 2 * 1024 ** 3, cache_format: str = 'parquet',
+				 object_cache_size: int = 0, object_cache_ttl: float = 300.0, search_cache_size: int = 100,
+				 search_cache_ttl: float = 3600.0, release_cache_ttl: float = 3600.0, connection_factory=None):
+		"""
+		Set cache_dir to keep fetched series on disk. Cached series are only used as long as their
+		LastModifiedTimeStamp in the database is unchanged.
+
+		Set object_cache_size > 0 to keep series and entity objects used by the m_* helpers in memory for
+		object_cache_ttl seconds. Off by default, so every call goes to the database. COM objects belong to the
+		apartment of the thread that fetched them, so they are cached per connection and never used by another thread.
+
+		Tickers found by CreateSearchQuery are kept per query for search_cache_ttl seconds.
+		Set search_cache_size to 0 to always search again.
+
+		Release of every ticker and next and previous event of every release are kept for release_cache_ttl seconds,
+		as plain values shared by all threads. Set release_cache_ttl to 0 to always look them up again.
+
+		An instance can be shared between threads. Concurrent FetchSeries, FetchOneSeries and CreateUnifiedSeriesRequst
+		of the same tickers, and the same search, wait for the call already in flight instead of making their own, see
+		self.single_flight. Only unpacked values are shared this way, COM objects are never handed to another thread.
 
-		# Create connection to the database
-		db = c.Database
+		Every thread gets its own database connection from connection_factory, a callable without arguments.
+		By default this is a COM connection to Macrobond.
+
+		Every database call and public method is counted and timed in self.recorder, see m_profile().
+		"""
+		# Counts and times of database calls and public methods
+		self.recorder = CallRecorder()
+
+		# One connection per thread, created on first use of self.mbdb in that thread
+		if connection_factory is None:
+			connection_factory = f_com_connection
+
+		self.connection_pool = ConnectionPool(
+			connection_factory=lambda: InstrumentedDatabase(connection_factory(), self.recorder))
+
+		# Worker threads used for parallel fetching: max_workers -> ThreadPoolExecutor
+		self.executors = dict()
+		self.executor_lock = threading.Lock()
 
 		# Create default attribute with all regions
-		region_map, region_map_inverse = self.f_region_map()
-		region_list = list(region_map.keys())
+		self.region_list_all = list(REGION_MAP.keys())
+
+		# Optional on-disk series cache
+		if cache_dir is not None:
+			self.series_cache = SeriesCache(cache_dir=cache_dir, max_size_bytes=cache_max_bytes,
+											file_format=cache_format)
+		else:
+			self.series_cache = None
 
-		# Save MacrobondDatabase attribute
-		self.mbdb = db
-		self.region_list_all = region_list
+		# In-memory cache of series and entity objects shared by the m_* helpers
+		self.object_cache = ObjectCache(max_size=object_cache_size, ttl=object_cache_ttl)
 
+		# Tickers found per normalized search query
+		self.search_cache = ObjectCache(max_size=search_cache_size, ttl=search_cache_ttl)
+
+		# Release of a ticker: ('ticker', ticker) -> (release,), event times of a release: ('release', release) -> (next,
+		# last). Plain values, independent of the object cache
+		self.release_cache = ObjectCache(max_size=100000 if release_cache_ttl > 0 else 0, ttl=release_cache_ttl)
+
+		# Concurrent requests for the same tickers or search share one database call
+		self.single_flight = SingleFlight()
+
+		# Metadata information objects do not change during a session: (connection, name) -> IMetadataInformation
+		self.metadata_information = dict()
+		self.metadata_information_lock = threading.Lock()
+
+	@property
+	def mbdb(self):
+		"""
+		Macrobond database connection of the current thread
+		"""
+		return self.connection_pool.m_get()
+
+	def m_profile(self, print_tf: bool = True):
+		"""
+		Context manager that prints the number of calls, tickers, observations and the time of every database call
+		and public method made within the block. Time of a method is split in database (COM) time and conversion time
+
+		Example:
+		with mb.m_profile():
+			df = mb.FetchSeries(ticker_list)
+		"""
+		return self.recorder.m_profile(print_tf=print_tf)
+
+	@f_instrumented
 	def FetchOneSeries(self, ticker: str) -> pd.DataFrame:
 		"""
 		Fetch One timeseries from Macrobond
 		In this method we gather a few examples of attributes that could be extracted
 		"""
+		# The same ticker from several threads at once is only fetched once, the frame is a plain value
+		df = self.single_flight.m_do(('one', ticker.lower()), lambda: self.m_fetch_one_frame(ticker))
+
+		return df.copy()
+
+	def m_fetch_one_frame(self, ticker: str) -> pd.DataFrame:
+		"""
+		FetchOneSeries without coalescing
+		"""
+		# Serve from the on-disk cache if the series is unchanged since it was stored
+		if self.series_cache is not None:
+			last_modified = self.m_last_modified([ticker])[0]
+			cached_df = self.series_cache.m_get(ticker, last_modified)
+
+			if cached_df is not None:
+				return cached_df
+
 		series = self.mbdb.FetchOneSeries(ticker)
 
 		# Assert all is well
@@ -64,8 +217,8 @@ class Macrobond:
 		freq: macrobond_api_constants.SeriesFrequency = series.Frequency
 
 		# Convert some dates
-		p_start_dates = pd.to_datetime([date.strftime('%Y-%m-%d') for date in series.DatesAtStartOfPeriod])
-		p_end_dates = pd.to_datetime([date.strftime('%Y-%m-%d') for date in series.DatesAtEndOfPeriod])
+		p_start_dates = pd.DatetimeIndex(ingest.f_dates_to_datetime64(series.DatesAtStartOfPeriod))
+		p_end_dates = pd.DatetimeIndex(ingest.f_dates_to_datetime64(series.DatesAtEndOfPeriod))
 
 		# Extract start and end date
 		start_date = series.StartDate.date()
@@ -78,14 +231,24 @@ class Macrobond:
 		end_date_tz_info = series.EndDate.tzinfo
 
 		# Generate pd.DataFrame that we return
-		df = pd.DataFrame(series.Values, index=p_end_dates)
-		df.columns = [series.Name]
+		df = pd.DataFrame({series.Name: ingest.f_values_to_float64(series.Values)}, index=p_end_dates)
+
+		if self.series_cache is not None:
+			self.series_cache.m_put(ticker, df, series.Metadata.GetFirstValue('LastModifiedTimeStamp'))
 
 		return df
 
-	def FetchSeries(self, ticker_list: [str]) -> pd.DataFrame:
+	@f_instrumented
+	def FetchSeries(self, ticker_list: [str], chunk_size: int = None, max_workers: int = 1, output_format: str = 'wide',
+					date_type: str = 'datetime64', value_dtype: str = 'float64') -> pd.DataFrame:
 		"""
 		Fetch several series and return a dataframe
+		:param chunk_size: number of tickers per request to the database. Default: all tickers in one request
+		:param max_workers: number of threads that fetch chunks in parallel, each with its own connection
+		:param output_format: 'wide' (one column per ticker) or 'long' (Ticker, Date, Value), see align.f_long_panel.
+		Long is much smaller for universes that mix frequencies
+		:param date_type: dates of the long format, 'datetime64' or 'int32' (days since 1970-01-01)
+		:param value_dtype: values of the long format, 'float64' or 'float32'
 		"""
 
 		# Assert type
@@ -95,14 +258,281 @@ class Macrobond:
 			print(f'Input must be a list')
 			raise ae
 
-		# Fetch all the series
+		unpacked = self.m_fetch_arrays(ticker_list=ticker_list, chunk_size=chunk_size, max_workers=max_workers)
+
+		# Dates are aligned on the union of all the dates, or every observation is a row in the long format
+		df = align.f_format_panel(ticker_list=ticker_list,
+								  dates_list=[unpacked[ticker][0] for ticker in ticker_list],
+								  values_list=[unpacked[ticker][1] for ticker in ticker_list],
+								  output_format=output_format, date_type=date_type, value_dtype=value_dtype)
+
+		return df
+
+	def m_iter_series(self, ticker_list: list, chunk_size: int = 500, as_frame: bool = True):
+		"""
+		Generator that fetches ticker_list in chunks, so that only one chunk is held in memory at a time
+		Yields one aligned pd.DataFrame per chunk, or (ticker, pd.Series) pairs if as_frame is False
+
+		Example:
+		for df in mb.m_iter_series(ticker_list=ticker_list, chunk_size=1000):
+			writer.write(df)
+		"""
+		for i in range(0, len(ticker_list), chunk_size):
+			chunk = ticker_list[i:i + chunk_size]
+			unpacked = self.m_fetch_arrays(ticker_list=chunk)
+
+			if as_frame:
+				yield align.f_align_panel(ticker_list=chunk,
+										  dates_list=[unpacked[ticker][0] for ticker in chunk],
+										  values_list=[unpacked[ticker][1] for ticker in chunk])
+			else:
+				for ticker in chunk:
+					yield ticker, ingest.f_arrays_to_series(*unpacked[ticker], name=ticker)
+
+			# Release the chunk before the next one is fetched
+			del unpacked
+
+	def m_fetch_arrays(self, ticker_list: list, chunk_size: int = None, max_workers: int = 1) -> dict:
+		"""
+		Fetch several series as unpacked arrays: ticker -> (dates, values)
+		If the on-disk cache is used, unchanged series are read from it and only stale or missing tickers are fetched
+		"""
+		unpacked = dict()
+
+		if self.series_cache is not None:
+			last_modified_list = self.m_last_modified(ticker_list)
+
+			# Split tickers in cached and missing ones
+			missing_list = list()
+			for ticker, last_modified in zip(ticker_list, last_modified_list):
+				cached_df = self.series_cache.m_get(ticker, last_modified)
+
+				if cached_df is None:
+					missing_list.append(ticker)
+				else:
+					unpacked[ticker] = (cached_df.index.values, cached_df.iloc[:, 0].to_numpy(dtype=np.float64))
+		else:
+			missing_list = ticker_list
+
+		if not missing_list:
+			return unpacked
+
+		def fetch(fetch_list: list) -> list:
+			fetched = self.m_fetch_chunks(ticker_list=fetch_list, chunk_size=chunk_size, max_workers=max_workers)
+
+			if self.series_cache is not None:
+				for ticker, (dates, values, name, last_modified) in zip(fetch_list, fetched):
+					if name is not None:
+						df = ingest.f_arrays_to_series(dates, values).to_frame(name)
+						self.series_cache.m_put(ticker, df, last_modified, flush=False)
+
+				# Write the index once for the whole batch
+				self.series_cache.m_flush()
+
+			return fetched
+
+		# Tickers that another thread is already fetching are not fetched again
+		fetched = self.single_flight.m_do_many(missing_list, fetch, key=lambda tick: ('arrays', tick.lower()))
+
+		for ticker, (dates, values, name, last_modified) in zip(missing_list, fetched):
+			unpacked[ticker] = (dates, values)
+
+		return unpacked
+
+	def m_fetch_chunks(self, ticker_list: list, chunk_size: int = None, max_workers: int = 1) -> list:
+		"""
+		Split ticker_list in chunks and fetch them, in parallel if max_workers > 1
+		Returns one (dates, values, name, last_modified) tuple per ticker, name is None for series with errors
+		"""
+		if chunk_size is None:
+			chunk_size = max(-(-len(ticker_list) // max(max_workers, 1)), 1)
+
+		chunk_list = [ticker_list[i:i + chunk_size] for i in range(0, len(ticker_list), chunk_size)]
+
+		if max_workers <= 1 or len(chunk_list) <= 1:
+			result_list = [self.m_fetch_chunk(chunk) for chunk in chunk_list]
+		else:
+			executor = self.m_get_executor(max_workers=max_workers)
+			result_list = list(executor.map(self.recorder.m_wrap(self.m_fetch_chunk), chunk_list))
+
+		return [x for result in result_list for x in result]
+
+	def m_fetch_chunk(self, ticker_list: list) -> list:
+		"""
+		Fetch one chunk on the connection of the current thread and unpack it to arrays
+		"""
 		series = self.mbdb.FetchSeries(ticker_list)
 
-		# Convert it to a pd.DataFrame
-		df = self.m_series_tuple_to_df(ticker_list=ticker_list, series=series)
+		result = list()
+		for s in series:
+			dates, values = ingest.f_unpack_arrays(s)
+
+			if s.IsError:
+				result.append((dates, values, None, None))
+			else:
+				# The timestamp is only needed when the series is stored on disk
+				if self.series_cache is not None:
+					last_modified = s.Metadata.GetFirstValue('LastModifiedTimeStamp')
+				else:
+					last_modified = None
+
+				result.append((dates, values, s.Name, last_modified))
+
+		return result
+
+	def m_get_executor(self, max_workers: int) -> futures.ThreadPoolExecutor:
+		"""
+		Thread pool with max_workers threads. The pool is kept so that the connections of its threads are reused
+		"""
+		with self.executor_lock:
+			if max_workers not in self.executors:
+				self.executors[max_workers] = futures.ThreadPoolExecutor(max_workers=max_workers,
+																 thread_name_prefix='macrobond')
+
+			return self.executors[max_workers]
+
+	@f_instrumented
+	def m_sync_series(self, ticker_list: list, batch_size: int = 500, overlap: int = 10) -> pd.DataFrame:
+		"""
+		Incrementally update the series kept in the on-disk cache (requires Macrobond(cache_dir=...))
+
+		For every batch, LastModifiedTimeStamp is fetched in one request. Unchanged tickers cost nothing more.
+		For changed tickers only the tail, starting overlap observations before the stored end, is fetched with a
+		unified series request. New observations are appended and, if the overlap was revised, the tail is
+		rewritten from the first revised observation. If the revision goes further back than the overlap the
+		full series is fetched again.
+
+		Returns a pd.DataFrame with Status and number of Changed observations per ticker.
+		Status is one of: Unchanged, Appended, TailRewritten, Full, New, Error
+		:param overlap: stored observations fetched again to detect revisions, at least 1
+		"""
+		try:
+			assert self.series_cache is not None
+		except AssertionError as ae:
+			print(f'm_sync_series requires the on-disk cache: Macrobond(cache_dir=...)')
+			raise ae
+
+		try:
+			assert overlap >= 1
+		except AssertionError as ae:
+			print(f'overlap must be at least 1, got {overlap}')
+			raise ae
+
+		status = dict()
+		n_changed = dict()
+
+		for i in range(0, len(ticker_list), batch_size):
+			batch = ticker_list[i:i + batch_size]
+
+			# One cheap metadata round-trip for the whole batch
+			entities = self.mbdb.FetchEntities(batch)
+
+			last_modified = dict()
+			full_list = list()
+			tail_groups = dict()
+			stored = dict()
+			for ticker, entity in zip(batch, entities):
+				if entity.IsError:
+					status[ticker] = 'Error'
+					n_changed[ticker] = 0
+					continue
+
+				last_modified[ticker] = entity.Metadata.GetFirstValue('LastModifiedTimeStamp')
+
+				if self.series_cache.m_is_current(ticker, last_modified[ticker]):
+					status[ticker] = 'Unchanged'
+					n_changed[ticker] = 0
+					continue
+
+				stored_df = self.series_cache.m_read(ticker)
+				if stored_df is None or len(stored_df) == 0:
+					status[ticker] = 'New'
+					full_list.append(ticker)
+					continue
+
+				stored[ticker] = stored_df
+
+				# Tickers with the same frequency and tail start share one request
+				start_date = stored_df.index[max(len(stored_df) - overlap, 0)].date()
+				key = (entity.Metadata.GetFirstValue('Frequency'), start_date)
+				tail_groups.setdefault(key, list()).append(ticker)
+
+			for (frequency, start_date), group in tail_groups.items():
+				tails = self.m_fetch_tail(ticker_list=group, start_date=start_date)
+
+				for ticker, (tail_dates, tail_values) in zip(group, tails):
+					stored_df = stored[ticker]
+					result = self.f_merge_tail(stored_dates=stored_df.index.values,
+											   stored_values=stored_df.iloc[:, 0].to_numpy(dtype=np.float64),
+											   tail_dates=tail_dates, tail_values=tail_values)
+
+					if result is None:
+						# Revised further back than the overlap
+						status[ticker] = 'Full'
+						full_list.append(ticker)
+						continue
+
+					status[ticker], dates, values, n_changed[ticker] = result
+					df = ingest.f_arrays_to_series(dates, values).to_frame(stored_df.columns[0])
+					self.series_cache.m_put(ticker, df, last_modified[ticker], flush=False)
+
+			if full_list:
+				for ticker, (dates, values, name, _) in zip(full_list, self.m_fetch_chunk(full_list)):
+					if name is None:
+						status[ticker] = 'Error'
+						n_changed[ticker] = 0
+						continue
+
+					n_changed[ticker] = len(values)
+					df = ingest.f_arrays_to_series(dates, values).to_frame(name)
+					self.series_cache.m_put(ticker, df, last_modified[ticker], flush=False)
+
+			# Write the index once per batch
+			self.series_cache.m_flush()
+
+		df = pd.DataFrame({'Status': [status[ticker] for ticker in ticker_list],
+						   'Changed': [n_changed[ticker] for ticker in ticker_list]},
+						  index=pd.Index(ticker_list, name='Ticker'))
 
 		return df
 
+	def m_fetch_tail(self, ticker_list: list, start_date: dt.date) -> list:
+		"""
+		Fetch observations from start_date and onwards with a unified series request
+		Series are neither filled nor converted, so dates and values are the same as in the original series
+		Returns one (dates, values) tuple per ticker, missing values are dropped
+		"""
+		# Keep every date of every series
+		builder = UnifiedRequestBuilder(MissingValueMethod=macrobond_api_constants.SeriesMissingValueMethod.NONE,
+										PartialPeriodsMethod=macrobond_api_constants.SeriesPartialPeriodsMethod.NONE,
+										CalendarMergeMode=macrobond_api_constants.CalendarMergeMode.AVAILABLE_IN_ANY,
+										StartDate=start_date)
+		builder.m_add_series_list(ticker_list)
+
+		result = list()
+		for s in self.mbdb.FetchSeries(builder.m_build(self.mbdb)):
+			dates, values = ingest.f_unpack_arrays(s)
+			keep = ~np.isnan(values)
+			result.append((dates[keep], values[keep]))
+
+		return result
+
+	def m_last_modified(self, ticker_list: list) -> list:
+		"""
+		Get LastModifiedTimeStamp for several tickers in one request. Entities are fetched without any values
+		"""
+		entities = self.mbdb.FetchEntities(ticker_list)
+
+		last_modified_list = list()
+		for entity in entities:
+			if entity.IsError:
+				last_modified_list.append(None)
+			else:
+				last_modified_list.append(entity.Metadata.GetFirstValue('LastModifiedTimeStamp'))
+
+		return last_modified_list
+
+	@f_instrumented
 	def FetchOneSeriesWithRevisions(self, ticker: str) -> pd.DataFrame:
 		"""
 		We only care about the original series & first revision in this function
@@ -153,7 +583,7 @@ class Macrobond:
 		# Check how many revisions we have (not used at the moment)
 		n = 0
 		while True:
-			x = pd.Series(series.GetNthRelease(n).Values)
+			x = ingest.f_values_to_float64(series.GetNthRelease(n).Values)
 
 			# If all in the series is nan then we assume we should break
 			if np.all(np.isnan(x)):
@@ -171,42 +601,93 @@ class Macrobond:
 
 		return df
 
+	@f_instrumented
+	def m_get_vintage_history(self, ticker: str) -> VintageHistory:
+		"""
+		Get every vintage of a series in a compact diff-based layout, see VintageHistory
+		Returns None if the series could not be fetched
+
+		Example:
+		vh = mb.m_get_vintage_history(ticker='usnaac0057')
+		df = vh.m_to_frame()  # VintageTime, Date, Value of every change
+		s = vh.m_as_of('2020-06-30')
+		"""
+		series = self.mbdb.FetchOneSeriesWithRevisions(ticker)
+
+		# Assert all is well
+		try:
+			assert series.IsError is False
+		except AssertionError:
+			print(f'Error: {series.ErrorMessage}')
+			return None
+
+		return VintageHistory.f_from_com(series)
+
+	@f_instrumented
+	def m_get_vintage_panel(self, ticker_list: list, chunk_size: int = 100) -> VintagePanel:
+		"""
+		Get every vintage of many series, indexed for point in time queries of the whole panel, see VintagePanel
+		Histories are fetched chunk_size tickers per request, tickers that could not be fetched are left out
+
+		Example:
+		vp = mb.m_get_vintage_panel(ticker_list=['usnaac0057', 'senaac0067'])
+		df = vp.m_as_of('2020-06-30')  # one column per ticker
+		df_long = vp.m_as_of_many(pd.date_range('2015-01-01', '2020-12-31', freq='B'))  # AsOf, Ticker, Date, Value
+		"""
+		# Every ticker once, in the order given
+		unique = dict()
+		for ticker in ticker_list:
+			unique.setdefault(ticker.lower(), ticker)
+		ticker_list = list(unique.values())
+
+		history_list = list()
+		for i in range(0, len(ticker_list), chunk_size):
+			for series in self.mbdb.FetchSeriesWithRevisions(ticker_list[i:i + chunk_size]):
+				if series.IsError:
+					print(f'Error: {series.ErrorMessage}')
+					continue
+
+				history_list.append(VintageHistory.f_from_com(series))
+
+		return VintagePanel(history_list)
+
+	@f_instrumented
 	def CreateUnifiedSeriesRequst(self, ticker_list: list, **kwargs) -> pd.DataFrame:
 		"""
-		Function that e.g. can extract several series in one currency
-		This can be expanded at time where we limit series to start date and end date etc
+		Function that e.g. can extract several series in one currency, date range or frequency
 		https://help.macrobond.com/technical-information/the-macrobond-api-for-python/#iseriesrequest
+
+		Conversion is done in the database, so only the requested observations are transferred. kwargs keys:
+		StartDate, EndDate, Currency, Frequency, Weekdays, CalendarMergeMode, ToHigherFrequencyMethod,
+		ToLowerFrequencyMethod, MissingValueMethod and PartialPeriodsMethod, see UnifiedRequestBuilder.
+		Constants can be given by name, e.g. Frequency='monthly', ToLowerFrequencyMethod='average'
 		"""
 
 		# Define currency for the request
 		# Currency codes that is used in Macrobond: https://www.macrobond.com/currency-list/
-		currency = 'USD'
+		builder = UnifiedRequestBuilder(Currency='USD')
 
-		# Extract kwargs
-		for key, val in kwargs.items():
-			if key.lower() == 'currency':
-				currency = kwargs.get('Currency')
-			else:
-				raise KeyError(f'Kwargs key: {key} not defined')
-
-		# Create the request
-		req = self.mbdb.CreateUnifiedSeriesRequest()
+		# Extract kwargs, raises KeyError for unknown keys or values
+		builder.m_set(**kwargs)
 
 		# Add all tickers to the request
-		for tick in ticker_list:
-			req.AddSeries(tick)
+		builder.m_add_series_list(ticker_list)
 
-		# Add currency for the request
-		req.Currency = currency
+		def fetch() -> pd.DataFrame:
+			# Finally fetch the data
+			series = self.mbdb.FetchSeries(builder.m_build(self.mbdb))
 
-		# Finally fetch the data
-		series = self.mbdb.FetchSeries(req)
+			# Convert it to pd.DataFrame
+			return self.m_series_tuple_to_df(ticker_list=ticker_list, series=series)
 
-		# Convert it to pd.DataFrame
-		df = self.m_series_tuple_to_df(ticker_list=ticker_list, series=series)
+		# The same request from several threads at once is only made once, the frame is a plain value
+		key = ('unified', tuple(ticker.lower() for ticker in ticker_list),
+			   tuple(sorted(builder.request_options.items())), tuple(sorted(builder.series_options.items())))
+		df = self.single_flight.m_do(key, fetch)
 
-		return df
+		return df.copy()
 
+	@f_instrumented
 	def CreateSearchQuery(self, concept_filter: str = 'gdp_total', entity_type_filter: str = 'TimeSeries',
 						  **kwargs) -> list:
 		"""
@@ -214,6 +695,25 @@ class Macrobond:
 
 		Details on how to create narrow search queries:
 		https://help.macrobond.com/tutorials-training/2-finding-data/finding-data-in-search/search-terms-for-more-accurate-results/
+
+		Searches are truncated by Macrobond. With AutoPartition=True a truncated search is split in one search per
+		region, and a truncated region in one search per frequency, until no search is truncated. Partitions are
+		run on MaxWorkers threads and the tickers are merged without duplicates. Other attributes can be used with
+		PartitionBy, a list of (attribute, values), e.g. [('Region', None), ('Source', ['bea', 'bls'])].
+		None means the values of the filter of the query.
+
+		Tickers are cached per query for search_cache_ttl seconds.
+		"""
+		tickers = list()
+		for names in self.m_iter_search(concept_filter=concept_filter, entity_type_filter=entity_type_filter, **kwargs):
+			tickers.extend(names)
+
+		return tickers
+
+	def m_iter_search(self, concept_filter: str = 'gdp_total', entity_type_filter: str = 'TimeSeries', **kwargs):
+		"""
+		Generator version of CreateSearchQuery, same arguments
+		Yields lists of new tickers as (partitions of) the search complete, duplicates are only yielded once
 		"""
 
 		# Region list, kwargs key: RegionList
@@ -234,143 +734,312 @@ class Macrobond:
 		free_text_search_tf = False
 		free_text_query = ''
 
+		# Split truncated searches, kwargs keys: AutoPartition, PartitionBy, MaxWorkers
+		auto_partition_tf = False
+		partition_levels = SEARCH_PARTITION_LEVELS
+		max_workers = 4
+
 		# Extract kwargs
 		for key, val in kwargs.items():
 			if key.lower() == 'regionlist':
-				region_list: list = kwargs.get('RegionList')
+				region_list: list = val
 			elif key.lower() == 'frequency':
-				frequency: str = kwargs.get('Frequency')
+				frequency: str = val
 				frequency_tf = True
 			elif key.lower() == 'seasonadj':
-				season_adj_tf: bool = kwargs.get('SeasonAdj')
+				season_adj_tf: bool = val
 			elif key.lower() == 'includediscontinued':
-				include_discontinued_tf: bool = kwargs.get('IncludeDiscontinued')
+				include_discontinued_tf: bool = val
 			elif key.lower() == 'freetext':
 				free_text_search_tf = True
-				free_text_query: str = kwargs.get('FreeText')
+				free_text_query: str = val
+			elif key.lower() == 'autopartition':
+				auto_partition_tf: bool = val
+			elif key.lower() == 'partitionby':
+				partition_levels: list = val
+			elif key.lower() == 'maxworkers':
+				max_workers: int = val
 			else:
 				raise KeyError(f'Kwargs key: {key} not defined')
 
-		# Define a search query
-		query = self.mbdb.CreateSearchQuery()
-
 		'''
 		Entity Type Filter:
 		A single string or a vector of strings identifying what type of entities to search for.
 		The options are TimeSeries, Release, Source, Index, Security, Region, RegionKey, Exchange and Issuer.
 
 		Typically you want to set this to TimeSeries. If not specified, the search will be made for several entity types.
-		'''
-		query.SetEntityTypeFilter(entity_type_filter)
 
-		'''
 		The RegionKey defines a "concept" (see "Concept & Category" database view in the Macrobond application)
 		Example of concepts: gdp_total_sa, markit_prev_manu_pmi, markit_prev_serv_pmi
+
+		Region filter to only include time series with region chosen
+		Example regions in: self.f_region_map()
 		'''
+		search = {'EntityType': entity_type_filter,
+				  'Text': free_text_query if free_text_search_tf else '',
+				  'Filters': {'Region': list(region_list)},
+				  'AttributeFilters': ['SeasonAdj'] if season_adj_tf else [],
+				  'IncludeDiscontinued': include_discontinued_tf}
 
 		# Either free text search or concept search
-		if free_text_search_tf:
-			query.Text = free_text_query
+		if not free_text_search_tf:
+			search['Filters']['RegionKey'] = concept_filter
+
+		if frequency_tf:
+			search['Filters']['Frequency'] = frequency
+
+		cache_key = self.f_search_key(search, partition_levels if auto_partition_tf else None)
+		tickers = self.search_cache.m_get(cache_key)
+
+		if tickers is not None:
+			yield list(tickers)
+			return
+
+		if auto_partition_tf:
+			tickers = list()
+			found = set()
+			complete_tf = True
+			for partition, names, truncated_tf in self.m_iter_search_partitions(
+					search, partition_levels=partition_levels, max_workers=max_workers):
+				complete_tf = complete_tf and not truncated_tf
+				new_names = list()
+				for name in names:
+					if name.lower() not in found:
+						found.add(name.lower())
+						new_names.append(name)
+
+				tickers.extend(new_names)
+				yield new_names
+
+			# Only a complete search is cached, so that a truncated one is searched (and warned about) again
+			if complete_tf:
+				self.search_cache.m_put(cache_key, tuple(tickers))
 		else:
-			query.AddAttributeValueFilter("RegionKey", concept_filter)
+			tickers, truncated_tf = self.m_search(search)
 
-		'''
-        Region filter to only include time series with region chosen
-        Example regions in: self.f_region_map()
-        '''
+			# Check if result is truncated
+			if truncated_tf:
+				print(f'Search was truncated. Truncated at {len(tickers)} entries.')
+			else:
+				self.search_cache.m_put(cache_key, tuple(tickers))
 
-		# Region filter
-		query.AddAttributeValueFilter("Region", region_list)
+			yield tickers
 
-		# Frequency filter
-		if frequency_tf:
-			query.AddAttributeValueFilter("Frequency", frequency)
+	def m_search(self, search: dict) -> Tuple[list, bool]:
+		"""
+		Run one search, or wait for the same search if it is already running in another thread
+		:param search: dictionary built by CreateSearchQuery
+		:return: names found and whether the result was truncated
+		"""
+		# The same search from several threads at once is only run once
+		# Safe to share between threads, m_run_search returns plain Python values and no COM objects
+		return self.single_flight.m_do(('search', self.f_search_key(search)), lambda: self.m_run_search(search))
+
+	def m_run_search(self, search: dict) -> Tuple[list, bool]:
+		# Define a search query
+		query = self.mbdb.CreateSearchQuery()
+		query.SetEntityTypeFilter(search['EntityType'])
+
+		if search['Text']:
+			query.Text = search['Text']
 
-		# Optionally set seasonlity filter
-		if season_adj_tf:
-			query.AddAttributeFilter("SeasonAdj")
+		for attribute, value in search['Filters'].items():
+			query.AddAttributeValueFilter(attribute, value)
+
+		for attribute in search['AttributeFilters']:
+			query.AddAttributeFilter(attribute)
 
 		# Include discontinued series or not
-		query.IncludeDiscontinued = include_discontinued_tf
+		query.IncludeDiscontinued = search['IncludeDiscontinued']
 
 		# Do the search
 		search_result = self.mbdb.Search(query)
 
-		# Extract any entities we found
-		result = search_result.Entities
+		# Extract the tickers (names) of any entities we found
+		names = [s.Name for s in search_result.Entities]
+
+		return names, bool(search_result.isTruncated)
 
-		# Check if result is truncated
-		if search_result.isTruncated:
-			print(f'Search was truncated. Truncated at {len(result)} entries.')
+	def m_iter_search_partitions(self, search: dict, partition_levels: list = None, max_workers: int = 4):
+		"""
+		Generator that runs a search and splits it while it is truncated, see CreateSearchQuery
+		Partitions run in parallel on max_workers threads and are yielded as they complete: (filters, names, truncated)
+		Names of a truncated search are only yielded if it can not be split any further
+		"""
+		if partition_levels is None:
+			partition_levels = SEARCH_PARTITION_LEVELS
 
-		# Extract the tickers (names)
-		tickers = [s.Name for s in result]
+		executor = self.m_get_executor(max_workers=max(max_workers, 1))
+		search_function = self.recorder.m_wrap(self.m_search)
 
-		return tickers
+		pending = {executor.submit(search_function, search): (search, 0)}
+
+		while pending:
+			done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+
+			for future in done:
+				partition, level = pending.pop(future)
+				names, truncated_tf = future.result()
 
-	def m_series_tuple_to_df(self, ticker_list: list, series) -> pd.DataFrame:
+				if truncated_tf:
+					sub_partitions, next_level = self.f_split_search(partition, partition_levels, level)
+
+					if sub_partitions:
+						for sub_partition in sub_partitions:
+							pending[executor.submit(search_function, sub_partition)] = (sub_partition, next_level)
+						continue
+
+					print(f'Search was truncated at {len(names)} entries and can not be partitioned further: '
+						  f'{partition["Filters"]}')
+
+				yield partition['Filters'], names, truncated_tf
+
+	@f_instrumented
+	def m_series_tuple_to_df(self, ticker_list: list, series, output_format: str = 'wide',
+							 date_type: str = 'datetime64', value_dtype: str = 'float64', frequency=None,
+							 **kwargs) -> pd.DataFrame:
 		"""
 		Method just to convert series request to a pd.DataFrame
 		:param ticker_list: list
 		:param series:  (<COMObject FetchSeries>, ..., <COMObject FetchSeries>)
+		:param output_format: 'wide' or 'long', see FetchSeries
+		:param frequency: if given, series are converted to this frequency and aligned on its periods, see
+		align.f_resample_panel for the conversion methods in kwargs. The long output has one row per converted period
 		"""
-
-		# First create a series with ALL dates
-		date_list = list()
+		# Conversion methods only apply to a resample
+		if frequency is None and kwargs:
+			raise KeyError(f'Kwargs keys: {list(kwargs)} not defined without a frequency')
+
+		if frequency is not None:
+			# Series with errors are left empty
+			dates_list = list()
+			values_list = list()
+			frequency_list = list()
+			for s in series:
+				if s.IsError:
+					dates_list.append(np.empty(0, dtype='datetime64[ns]'))
+					values_list.append(np.empty(0, dtype=np.float64))
+					frequency_list.append(frequency)
+				else:
+					dates, values = ingest.f_unpack_arrays(s, start_of_period=True)
+					dates_list.append(dates)
+					values_list.append(values)
+					frequency_list.append(s.Frequency)
+
+			df = align.f_resample_panel(ticker_list=ticker_list, dates_list=dates_list, values_list=values_list,
+										frequency_list=frequency_list, frequency=frequency, **kwargs)
+
+			if output_format.lower() == 'wide':
+				return df
+
+			# Long table of the observed periods of every series
+			block = df.to_numpy()
+			dates = df.index.values
+			dates_list = list()
+			values_list = list()
+			for j in range(block.shape[1]):
+				keep = ~np.isnan(block[:, j])
+				dates_list.append(dates[keep])
+				values_list.append(block[keep, j])
+
+			return align.f_format_panel(ticker_list=ticker_list, dates_list=dates_list, values_list=values_list,
+										output_format=output_format, date_type=date_type, value_dtype=value_dtype)
+
+		dates_list = list()
+		values_list = list()
 		for i, ticker in enumerate(ticker_list):
-			dates = series[i].DatesAtEndOfPeriod
-
-			# Convert all dates to ordinal
-			date_list.extend([dt.datetime.toordinal(date) for date in dates])
+			dates, values = ingest.f_unpack_arrays(series[i])
+			dates_list.append(dates)
+			values_list.append(values)
 
-		# Get unique dates and sort them
-		date_list_unique = list(set(date_list))
-		date_list_unique.sort(reverse=False)
+		# Align all series on the union of dates in one pass, or build the long table directly
+		df = align.f_format_panel(ticker_list=ticker_list, dates_list=dates_list, values_list=values_list,
+								  output_format=output_format, date_type=date_type, value_dtype=value_dtype)
 
-		# Generate dates from ordinal format to pd.DatetimeIndex
-		p_dates = pd.to_datetime([dt.date.fromordinal(date) for date in date_list_unique])
+		return df
 
-		# Pre-allocate DataFrame
-		df = pd.DataFrame(index=p_dates, columns=ticker_list)
+	@f_instrumented
+	def m_fetch_resampled(self, ticker_list: list, frequency='monthly', ticker_options: dict = None,
+						  **kwargs) -> pd.DataFrame:
+		"""
+		Fetch series of mixed frequencies and convert them to one frequency locally, without a unified request
+		The panel is built on the periods of the target frequency, the union of all dates is never formed
 
-		for i, ticker in enumerate(ticker_list):
-			unpacked_series = self.f_unpack_series(series[i])
+		Example:
+		df = mb.m_fetch_resampled(ticker_list, frequency='monthly', ToLowerFrequencyMethod='average',
+								  ticker_options={'usnaac0057': {'ToHigherFrequencyMethod': 'linear_interpolation'}})
 
-			df[ticker] = unpacked_series
+		:param frequency: target frequency, e.g. 'daily' (Monday to Friday), 'weekly', 'monthly' or 'quarterly'
+		:param ticker_options: ticker -> kwargs for that ticker only
+		kwargs: ToLowerFrequencyMethod, ToHigherFrequencyMethod and MissingValueMethod, see align.f_resample_panel
+		"""
+		series = self.m_fetch_series_objects(ticker_list)
 
-		return df
+		return self.m_series_tuple_to_df(ticker_list, series, frequency=frequency, ticker_options=ticker_options,
+										 **kwargs)
 
-	def m_get_full_info(self, ticker_list: list) -> pd.DataFrame:
+	@f_instrumented
+	def m_get_full_info(self, ticker_list: list, metadata_list: list = None, series: list = None) -> pd.DataFrame:
 		"""
 		Method to gather some data of a list of tickers in a pd.DataFrame
+		All series are fetched in one request and every distinct release entity only once
+		:param metadata_list: optional extra metadata columns, e.g. ['DisplayUnit', 'EntityState']
+		:param series: already fetched series objects for ticker_list, if any
 		"""
+		if metadata_list is None:
+			metadata_list = []
+
+		if series is None:
+			series = self.m_fetch_series_objects(ticker_list)
+
+		# Metadata of series with errors is left empty
+		metadata = [None if s.IsError else s.Metadata for s in series]
 
-		next_rel = [self.m_release_date(ticker=tick, date_option='next') for tick in ticker_list]
-		prev_rel = [self.m_release_date(ticker=tick, date_option='previous') for tick in ticker_list]
-		freq = [self.m_get_frequency(ticker=tick) for tick in ticker_list]
-		title = [self.m_get_title(ticker=tick) for tick in ticker_list]
-		concept = [self.m_series_concept(ticker=tick) for tick in ticker_list]
-		region_short = [self.m_get_metadata(ticker=tick, option='Region') for tick in ticker_list]
+		def get_first_value(option: str) -> list:
+			return [None if m is None else m.GetFirstValue(option) for m in metadata]
+
+		freq = get_first_value('Frequency')
+		title = [None if s.IsError else s.Title for s in series]
+		region_short = get_first_value('Region')
 		region_full = [self.m_get_region(reg) for reg in region_short]
-		currency = [self.m_get_metadata(ticker=tick, option='Currency') for tick in ticker_list]
-		database = [self.m_get_metadata(ticker=tick, option='Database') for tick in ticker_list]
-		release = [self.m_get_metadata(ticker=tick, option='Release') for tick in ticker_list]
+		currency = get_first_value('Currency')
+		database = get_first_value('Database')
+		release = get_first_value('Release')
+
+		# Concept: the presentation texts come from one metadata information object
+		region_key = get_first_value('RegionKey')
+		concept = list()
+		for key in region_key:
+			if key is None:
+				concept.append(('', ''))
+			else:
+				concept.append((key, self.m_get_metadata_information('RegionKey').GetValuePresentationText(key)))
+
+		# Every distinct release is only fetched once
+		release_dates = self.m_release_dates(ticker_list=ticker_list, series=series)
+		next_rel = release_dates['NextRelease'].tolist()
+		prev_rel = release_dates['PreviousRelease'].tolist()
 
 		# Define dictionary then convert it to a dataframe
 		d = {'Description': title, 'NextRelease': next_rel, 'PreviousRelease': prev_rel, 'Frequency': freq,
 			 'RegionLong': region_full, 'RegionShort': region_short, 'Currency': currency, 'Ticker': ticker_list,
 			 'Source': database, 'Release': release, 'Concept': concept}
+
+		for option in metadata_list:
+			d[option] = get_first_value(option)
+
 		df = pd.DataFrame(d)
 
 		return df
 
+	@f_instrumented
 	def m_series_concept(self, ticker: str) -> Tuple[str, str]:
 		"""
 		Method to find the concept of a given series
 		"""
 
 		# Get series of the ticker
-		s = self.mbdb.FetchOneSeries(ticker)
+		s = self.m_fetch_one_series(ticker)
 
 		# Get the "concept" this series is associated with
 		region_key = s.Metadata.GetFirstValue("RegionKey")
@@ -379,19 +1048,20 @@ class Macrobond:
 			long_concept = ''
 		else:
 			# Also get some information about this metadata value
-			keyMetaInfo = self.mbdb.GetMetadataInformation("RegionKey")
+			keyMetaInfo = self.m_get_metadata_information("RegionKey")
 			long_concept = keyMetaInfo.GetValuePresentationText(region_key)
 			short_concept = region_key
 
 		return short_concept, long_concept
 
+	@f_instrumented
 	def m_discontinued(self, ticker: str):
 		"""
 		Method with the sole purpose to check if a series has been discontinued or not
 		"""
 
 		# Get the series
-		series = self.mbdb.FetchOneSeries(ticker)
+		series = self.m_fetch_one_series(ticker)
 
 		# Get the state
 		series_state = series.Metadata.GetFirstValue('EntityState')
@@ -405,12 +1075,13 @@ class Macrobond:
 
 		return discontinued_tf
 
+	@f_instrumented
 	def m_get_replacement_ticker(self, ticker: str) -> str:
 		"""
 		Method that returns a replacement ticker for a discontinued series if it exists
 		"""
 		# Get the series of the old ticker
-		series = self.mbdb.FetchOneSeries(ticker)
+		series = self.m_fetch_one_series(ticker)
 
 		# Get replacement comment and ticker
 		replacement_comment = series.Metadata.GetFirstValue('EntityDiscontinuedComment')
@@ -427,12 +1098,120 @@ class Macrobond:
 
 		return replacement_ticker
 
+	@f_instrumented
+	def m_resolve_replacements(self, ticker_list: list, max_depth: int = 20, chunk_size: int = 5000) -> pd.DataFrame:
+		"""
+		Discontinued state and final replacement of many tickers, following chains of replacements
+		Entities are fetched without values, one request per chunk and level of the chains, and every ticker only
+		once. Returns one row per ticker of ticker_list (index Ticker) with the columns:
+		EntityState, Discontinued, Comment, Replacements (direct ones), Chain (tickers from the first replacement
+		to the final one), FinalTickers (end of every branch), Replacement (final ticker if there is exactly one,
+		else '') and Status: active, replaced, no replacement, ambiguous, cycle, missing or max depth
+		"""
+		# ticker (lower case) -> (error, state, comment, replacements)
+		nodes = dict()
+		depth = dict()
+
+		frontier = list(dict.fromkeys(ticker.lower() for ticker in ticker_list))
+		for ticker in frontier:
+			depth[ticker] = 0
+
+		# Breadth-first, one level at a time
+		while frontier:
+			for i in range(0, len(frontier), chunk_size):
+				chunk = frontier[i:i + chunk_size]
+				for ticker, entity in zip(chunk, self.m_fetch_entities(chunk)):
+					if entity.IsError:
+						nodes[ticker] = (True, None, None, ())
+					else:
+						m = entity.Metadata
+						nodes[ticker] = (False, m.GetFirstValue('EntityState'),
+										 m.GetFirstValue('EntityDiscontinuedComment'),
+										 tuple(m.GetValues('EntityDiscontinuedReplacements')))
+
+			next_frontier = list()
+			for ticker in frontier:
+				if depth[ticker] >= max_depth:
+					continue
+
+				for replacement in nodes[ticker][3]:
+					if replacement.lower() not in depth:
+						depth[replacement.lower()] = depth[ticker] + 1
+						next_frontier.append(replacement.lower())
+
+			frontier = next_frontier
+
+		# ticker -> (status, chain, final tickers), memoized over all chains
+		resolved = dict()
+
+		def resolve(ticker: str, path: tuple):
+			if ticker in resolved:
+				return resolved[ticker]
+
+			if ticker in path:
+				return 'cycle', (), ()
+
+			if ticker not in nodes:
+				return 'max depth', (), ()
+
+			error, state, comment, replacements = nodes[ticker]
+			if error:
+				result = 'missing', (), ()
+			elif not replacements:
+				result = ('active', (), (ticker,)) if state != 4 else ('no replacement', (), ())
+			else:
+				branches = [resolve(r.lower(), path + (ticker,)) for r in replacements]
+				final = tuple(dict.fromkeys(f for status, chain, final in branches for f in final))
+
+				status_list = [status for status, chain, final in branches]
+				if any(s in ['cycle', 'max depth'] for s in status_list):
+					status = 'cycle' if 'cycle' in status_list else 'max depth'
+				elif len(final) > 1:
+					status = 'ambiguous'
+				elif len(final) == 0:
+					status = 'no replacement'
+				else:
+					status = 'replaced'
+
+				chain = (replacements[0].lower(),) + branches[0][1] if len(replacements) == 1 else ()
+				result = status, chain, final
+
+			# Results inside a cycle depend on where the cycle was entered
+			if result[0] != 'cycle':
+				resolved[ticker] = result
+
+			return result
+
+		row_list = list()
+		for ticker in ticker_list:
+			error, state, comment, replacements = nodes[ticker.lower()]
+			status, chain, final = resolve(ticker.lower(), ())
+
+			# A ticker that is not discontinued is its own final ticker
+			if status == 'active':
+				final = ()
+
+			row_list.append({'EntityState': state,
+							 'Discontinued': None if error else state == 4,
+							 'Comment': comment,
+							 'Replacements': replacements,
+							 'Chain': chain,
+							 'FinalTickers': final,
+							 'Replacement': final[0] if len(final) == 1 and status == 'replaced' else '',
+							 'Status': status})
+
+		columns = ['EntityState', 'Discontinued', 'Comment', 'Replacements', 'Chain', 'FinalTickers', 'Replacement',
+				   'Status']
+
+		return pd.DataFrame(row_list, columns=columns, index=pd.Index(ticker_list, name='Ticker'))
+
+	@f_instrumented
 	def m_get_frequency(self, ticker: str) -> str:
 		"""
 		Method with the sole purpose of returning the frequency of a series
 		"""
 
-		series = self.mbdb.FetchOneSeries(ticker)
+		series = self.m_fetch_one_series(ticker)
 
 		# freq_int: macrobond_api_constants.SeriesFrequency = series.Frequency
 
@@ -440,6 +1219,7 @@ class Macrobond:
 
 		return freq_str
 
+	@f_instrumented
 	def m_get_title(self, ticker: str):
 		"""
 		Get title of a series if it exist
@@ -447,7 +1227,7 @@ class Macrobond:
 		:return:
 		"""
 
-		s = self.mbdb.FetchOneSeries(ticker)
+		s = self.m_fetch_one_series(ticker)
 
 		# Assert all is well
 		try:
@@ -458,6 +1238,7 @@ class Macrobond:
 
 		return s.Title
 
+	@f_instrumented
 	def m_release_date(self, ticker: str, date_option: str, full_date_format_tf: bool = False) -> dt.datetime:
 		"""
 		Enter Macrobond series name and get next or previous release date back, if it exists otherwise return 1900-01-01
@@ -472,34 +1253,94 @@ class Macrobond:
 		else:
 			mb_date_option = 'LastReleaseEventTime'
 
-		# Get the series & metadata
-		s = self.mbdb.FetchOneSeries(ticker)
-		m = s.Metadata.GetFirstValue('Release')
+		# Release of the ticker, looked up once per release_cache_ttl
+		cached = self.release_cache.m_get(('ticker', ticker.lower()))
 
-		if m is not None:
-			r = self.mbdb.FetchOneEntity(m)
-			date = r.MetaData.GetFirstValue(mb_date_option)
-
-			if date is not None:
-				if full_date_format_tf:
-					x = dt.datetime.combine(date=date.date(),
-											time=date.time(),
-											tzinfo=date.tzinfo)
-				else:
-					x = date.date()
-			else:
-				if full_date_format_tf:
-					x = dt.datetime(1900, 1, 1, 0, 0, 0, 0, pytz.UTC)
-				else:
-					x = dt.date.fromisoformat('1900-01-01')
+		if cached is None:
+			entity = self.m_fetch_one_entity(ticker)
+			release = None if entity.IsError else entity.Metadata.GetFirstValue('Release')
+
+			if not entity.IsError:
+				self.release_cache.m_put(('ticker', ticker.lower()), (release,))
 		else:
-			if full_date_format_tf:
-				x = dt.datetime(1900, 1, 1, 0, 0, 0, 0, pytz.UTC)
-			else:
-				x = dt.date.fromisoformat('1900-01-01')
+			release, = cached
 
-		return x
+		if release is not None:
+			next_time, last_time = self.m_release_times([release])[0]
+		else:
+			next_time, last_time = None, None
+
+		return self.f_release_time(next_time if mb_date_option == 'NextReleaseEventTime' else last_time,
+								   full_date_format_tf=full_date_format_tf)
+
+	@f_instrumented
+	def m_release_dates(self, ticker_list: list, full_date_format_tf: bool = False, series: list = None) -> pd.DataFrame:
+		"""
+		Next and previous release date for several tickers in one go
+		Series are fetched in one request and every distinct release entity only once
+		:param series: already fetched series objects for ticker_list, if any
+		"""
+		if series is None:
+			series = self.m_fetch_series_objects(ticker_list)
+
+		release = [None if s.IsError else s.Metadata.GetFirstValue('Release') for s in series]
+
+		# Fetch each distinct release once
+		release_unique = list(dict.fromkeys(rel for rel in release if rel is not None))
+		release_times = dict(zip(release_unique, self.m_release_times(release_unique)))
+
+		next_rel = [self.f_release_time(release_times.get(rel, (None, None))[0], full_date_format_tf)
+					for rel in release]
+		prev_rel = [self.f_release_time(release_times.get(rel, (None, None))[1], full_date_format_tf)
+					for rel in release]
+
+		df = pd.DataFrame({'Release': release, 'NextRelease': next_rel, 'PreviousRelease': prev_rel},
+						  index=pd.Index(ticker_list, name='Ticker'))
+
+		return df
+
+	def m_release_times(self, release_list: list) -> list:
+		"""
+		(NextReleaseEventTime, LastReleaseEventTime) of every release, None if not known
+		Releases not in the release cache are fetched in one request
+		"""
+		times = [self.release_cache.m_get(('release', release.lower())) for release in release_list]
+
+		missing_list = list(dict.fromkeys(release for release, t in zip(release_list, times) if t is None))
+		if missing_list:
+			fetched = dict()
+			for release, entity in zip(missing_list, self.m_fetch_entities(missing_list)):
+				if entity.IsError:
+					fetched[release] = (None, None)
+					continue
+
+				fetched[release] = (entity.Metadata.GetFirstValue('NextReleaseEventTime'),
+									entity.Metadata.GetFirstValue('LastReleaseEventTime'))
+				self.release_cache.m_put(('release', release.lower()), fetched[release])
+
+			times = [fetched[release] if t is None else t for release, t in zip(release_list, times)]
+
+		return times
+
+	def m_get_metadata_information(self, name: str):
+		"""
+		Get the metadata information object of a metadata name (e.g. RegionKey), fetched once per session
+		"""
+		# COM objects are kept per connection, i.e. per thread
+		key = (self.mbdb, name)
 
+		with self.metadata_information_lock:
+			info = self.metadata_information.get(key)
+
+		if info is None:
+			info = self.mbdb.GetMetadataInformation(name)
+
+			with self.metadata_information_lock:
+				self.metadata_information[key] = info
+
+		return info
+
+	@f_instrumented
 	def m_get_metadata(self, ticker: str, option: str):
 		"""
 		Enter macrobond series & option and get some metadata back
@@ -544,7 +1385,7 @@ class Macrobond:
 		'''
 
 		# Get the series
-		s = self.mbdb.FetchOneSeries(ticker)
+		s = self.m_fetch_one_series(ticker)
 
 		# Then get the metadata option that we want to look at
 		m = s.Metadata.GetFirstValue(option)
@@ -555,6 +1396,90 @@ class Macrobond:
 		else:
 			return None
 
+	def m_fetch_one_series(self, ticker: str):
+		"""
+		Fetch a series object through the in-memory object cache
+		"""
+		key = self.m_object_key('series', ticker)
+		s = self.object_cache.m_get(key)
+
+		if s is None:
+			# Not through single_flight: COM objects can not be handed to another thread
+			s = self.mbdb.FetchOneSeries(ticker)
+
+			# Errors are never cached
+			if s.IsError is False:
+				self.object_cache.m_put(key, s)
+
+		return s
+
+	def m_fetch_series_objects(self, ticker_list: list) -> list:
+		"""
+		Fetch several series objects through the object cache. Missing ones are fetched in one request
+		"""
+		series = [self.object_cache.m_get(self.m_object_key('series', tick)) for tick in ticker_list]
+		missing_list = list(dict.fromkeys(tick for tick, s in zip(ticker_list, series) if s is None))
+
+		if missing_list:
+			# Not through single_flight: COM objects can not be handed to another thread
+			fetched = dict(zip(missing_list, self.mbdb.FetchSeries(missing_list)))
+
+			for i, tick in enumerate(ticker_list):
+				if series[i] is None:
+					series[i] = fetched[tick]
+
+					if series[i].IsError is False:
+						self.object_cache.m_put(self.m_object_key('series', tick), series[i])
+
+		return series
+
+	def m_fetch_one_entity(self, name: str):
+		"""
+		Fetch an entity object (e.g. a release) through the object cache
+		"""
+		return self.m_fetch_entities([name])[0]
+
+	def m_fetch_entities(self, name_list: list) -> list:
+		"""
+		Fetch several entity objects through the object cache. Missing ones are fetched in one request
+		"""
+		entities = [self.object_cache.m_get(self.m_object_key('entity', name)) for name in name_list]
+		missing_list = list(dict.fromkeys(name for name, e in zip(name_list, entities) if e is None))
+
+		if missing_list:
+			# Not through single_flight: COM objects can not be handed to another thread
+			fetched = dict(zip(missing_list, self.mbdb.FetchEntities(missing_list)))
+
+			for i, name in enumerate(name_list):
+				if entities[i] is None:
+					entities[i] = fetched[name]
+
+					if entities[i].IsError is False:
+						self.object_cache.m_put(self.m_object_key('entity', name), entities[i])
+
+		return entities
+
+	def m_invalidate(self, name_list: list = None):
+		"""
+		Drop series and entity objects, and release lookups of tickers and releases, from the in-memory caches, or
+		everything (also searches) if no list is given
+		"""
+		if name_list is None:
+			self.object_cache.m_invalidate()
+			self.search_cache.m_invalidate()
+			self.release_cache.m_invalidate()
+		else:
+			# Objects of every connection
+			name_set = {name.lower() for name in name_list}
+			self.object_cache.m_invalidate_where(lambda key: key[1] in name_set)
+			self.release_cache.m_invalidate_where(lambda key: key[1] in name_set)
+
+	def m_object_key(self, kind: str, name: str) -> tuple:
+		"""
+		Key of a series or entity object in the object cache, the connection of the current thread is part of it
+		"""
+		return kind, name.lower(), self.mbdb
+
 	def m_get_region(self, region: str, short_input: bool = True) -> str:
 		"""
 		Convert either short region name to long or otherwise
@@ -575,10 +1500,130 @@ class Macrobond:
 		"""
 		Function used to simply unpack timeseries
 		"""
-		# Convert dates
-		p_end_dates = pd.to_datetime([date.strftime('%Y-%m-%d') for date in series.DatesAtEndOfPeriod])
+		dates, values = ingest.f_unpack_arrays(series)
 
-		return pd.Series(series.Values, index=p_end_dates)
+		return ingest.f_arrays_to_series(dates, values)
+
+	@staticmethod
+	def f_merge_tail(stored_dates: np.ndarray, stored_values: np.ndarray, tail_dates: np.ndarray,
+					 tail_values: np.ndarray):
+		"""
+		Merge a freshly fetched tail into a stored series
+		Returns (status, dates, values, number of changed observations), or None if the tail does not overlap
+		the stored series unchanged at its first observation, i.e. the full series has to be fetched again
+		"""
+		stored_dates = stored_dates.astype('datetime64[ns]', copy=False)
+		tail_dates = tail_dates.astype('datetime64[ns]', copy=False)
+
+		if len(tail_dates) == 0:
+			return None
+
+		# Stored observations that are covered by the tail, missing values are not compared
+		head_n = np.searchsorted(stored_dates, tail_dates[0])
+		old_dates = stored_dates[head_n:]
+		old_values = stored_values[head_n:]
+		keep = ~np.isnan(old_values)
+		old_dates = old_dates[keep]
+		old_values = old_values[keep]
+
+		n = min(len(old_dates), len(tail_dates))
+		diff = (old_dates[:n] != tail_dates[:n]) | (old_values[:n] != tail_values[:n])
+
+		if diff.any():
+			first = int(np.argmax(diff))
+
+			# The revision may go further back than the tail
+			if first == 0:
+				return None
+
+			status = 'TailRewritten'
+		elif len(tail_dates) < len(old_dates):
+			# Observations at the end have been removed
+			first = n
+			status = 'TailRewritten'
+		elif len(tail_dates) > n:
+			return ('Appended', np.concatenate([stored_dates, tail_dates[n:]]),
+					np.concatenate([stored_values, tail_values[n:]]), len(tail_dates) - n)
+		else:
+			return 'Unchanged', stored_dates, stored_values, 0
+
+		dates = np.concatenate([stored_dates[:head_n], tail_dates])
+		values = np.concatenate([stored_values[:head_n], tail_values])
+
+		return status, dates, values, len(tail_dates) - first
+
+	@staticmethod
+	def f_split_search(search: dict, partition_levels: list, level: int) -> Tuple[list, int]:
+		"""
+		Split a search on the first partition level from level on that has more than one value
+		:return: list of searches, one per value, and the level to split them on if they are truncated as well
+		"""
+		for n in range(level, len(partition_levels)):
+			attribute, values = partition_levels[n]
+			current = search['Filters'].get(attribute)
+
+			# Use the values of the filter, a filter with a single value can not be split
+			if current is not None:
+				if isinstance(current, str) or len(current) <= 1:
+					continue
+				values = current
+
+			if not values:
+				continue
+
+			sub_searches = list()
+			for value in values:
+				sub_search = dict(search)
+				sub_search['Filters'] = dict(search['Filters'])
+				sub_search['Filters'][attribute] = [value] if attribute == 'Region' else value
+				sub_searches.append(sub_search)
+
+			return sub_searches, n + 1
+
+		return [], len(partition_levels)
+
+	@staticmethod
+	def f_search_key(search: dict, partition_levels: list = None) -> tuple:
+		"""
+		Cache key of a search that does not depend on case or the order of lists
+		"""
+
+		def normalize(value):
+			if isinstance(value, str):
+				return value.strip().lower()
+			if isinstance(value, (list, tuple)):
+				return tuple(sorted(normalize(v) for v in value))
+			return value
+
+		filters = tuple(sorted((attribute.lower(), normalize(value)) for attribute, value in search['Filters'].items()))
+
+		levels = None
+		if partition_levels is not None:
+			levels = tuple((attribute.lower(), normalize(values)) for attribute, values in partition_levels)
+
+		return (normalize(search['EntityType']), normalize(search['Text']), filters,
+				normalize(search['AttributeFilters']), bool(search['IncludeDiscontinued']), levels)
+
+	@staticmethod
+	def f_release_time(date, full_date_format_tf: bool = False) -> dt.datetime:
+		"""
+		Release event time as a date, or as a datetime if full_date_format_tf
+		Returns 1900-01-01 if the date does not exist
+		"""
+		if date is not None:
+			if full_date_format_tf:
+				x = dt.datetime.combine(date=date.date(),
+										time=date.time(),
+										tzinfo=date.tzinfo)
+			else:
+				x = date.date()
+		else:
+			if full_date_format_tf:
+				x = dt.datetime(1900, 1, 1, 0, 0, 0, 0, pytz.UTC)
+			else:
+				x = dt.date.fromisoformat('1900-01-01')
+
+		return x
 
 	@staticmethod
 	def f_create_bbg_ticker(bbg_ticker: [str], **kwargs) -> [str]:
@@ -640,47 +1685,7 @@ class Macrobond:
 		Region shortnames can be on link found below
 		https://www.macrobond.com/region-list/
 		Based on two leter ISO 3166 codes
+
+		The dictionaries are built once when the module is loaded and shared, do not modify them
 		"""
-		region_map = {'asia': 'Asia',
-					  'asiapjp': 'Asia + Japan',
-					  'asiaxjp': 'Asia ex Japan',
-					  'asxmc': 'Asia ex Mainland China',
-					  'apac': 'Asia Pacific',
-					  'apacxjp': 'Asia Pacific ex Japan',
-					  'au': 'Australia',
-					  'br': 'Brazil',
-					  'ca': 'Canada',
-					  'cn': 'China',
-					  'dk': 'Denmark',
-					  'devasia': 'Developing Asia',
-					  'dvmkts': 'Developed Markets',
-					  'emkts': 'Emerging Markets',
-					  'eueu': 'EU',
-					  'eu': 'Euro Area',
-					  'europe': 'Europe',
-					  'fi': 'Finland',
-					  'fr': 'France',
-					  'de': 'Germany',
-					  'hk': 'Hong Kong',
-					  'in': 'India',
-					  'it': 'Italy',
-					  'jp': 'Japan',
-					  'latam': 'Latin America',
-					  'mfivasia': 'Major Five Asia',
-					  'nordic': 'Nordic Countries',
-					  'noram': 'North America',
-					  'no': 'Norway',
-					  'opec': 'OPEC Members',
-					  'sg': 'Singapore',
-					  'za': 'South Africa',
-					  'kr': 'South Korea',
-					  'es': 'Spain',
-					  'se': 'Sweden',
-					  'tw': 'Taiwan',
-					  'gb': 'United Kingdom',
-					  'us': 'United States'}
-
-		# We may invert the dictionary since entries are unique
-		region_map_inverse = {v: k for k, v in region_map.items()}
-
-		return region_map, region_map_inverse
+		return REGION_MAP, REGION_MAP_INVERSE
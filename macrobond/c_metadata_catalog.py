@@ -0,0 +1,256 @@
+from __future__ import annotations
+import json
+import time
+import sqlite3
+import threading
+from macrobond.c_macrobond import Macrobond
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+
+# Metadata stored per series, all of them are indexed
+CATALOG_COLUMNS = ['RegionKey', 'Region', 'Frequency', 'Currency', 'Database', 'Release', 'EntityState']
+
+# kwargs keys of m_query -> column
+QUERY_KEYS = {'regionkey': 'RegionKey', 'concept': 'RegionKey', 'region': 'Region', 'regionlist': 'Region',
+			  'frequency': 'Frequency', 'currency': 'Currency', 'database': 'Database', 'source': 'Database',
+			  'release': 'Release', 'entitystate': 'EntityState'}
+
+
+class MetadataCatalog:
+	"""
+	Local SQLite catalog of series metadata for offline universe queries
+
+	The catalog is filled in bulk from searches or ticker lists. Entities are fetched without values, so only the
+	metadata crosses the COM boundary. m_refresh updates series whose LastModifiedTimeStamp changed.
+	m_query filters on indexed columns in milliseconds and only searches live when the catalog has no match.
+
+	Example:
+	catalog = MetadataCatalog(mb, path='C:/temp/mb_catalog.sqlite')
+	catalog.m_populate_search(concept_filter='gdp_total', AutoPartition=True)
+	df = catalog.m_query(Region='se', Frequency='daily', TitleLike='%yield%')
+	"""
+
+	def __init__(self, mb: Macrobond = None, path: str = ':memory:', chunk_size: int = 1000,
+				 search_ttl: float = 24 * 3600.0, clock=time.time):
+		"""
+		:param mb: Macrobond instance used for live requests, a new one is created if not given
+		:param path: SQLite file, default in memory
+		:param chunk_size: tickers per request to the database
+		:param search_ttl: seconds before the same live search is run again on a miss
+		"""
+		self.mb = mb if mb is not None else Macrobond()
+		self.path = path
+		self.chunk_size = chunk_size
+		self.search_ttl = search_ttl
+		self.clock = clock
+
+		# One connection shared by all threads, serialized by the lock
+		self.lock = threading.RLock()
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+
+		with self.lock, self.connection:
+			self.connection.execute(f'''
+				CREATE TABLE IF NOT EXISTS series (
+					Ticker TEXT PRIMARY KEY COLLATE NOCASE,
+					Title TEXT,
+					{', '.join(f'{column} TEXT COLLATE NOCASE' for column in CATALOG_COLUMNS)},
+					LastModified TEXT,
+					Refreshed REAL)''')
+
+			for column in CATALOG_COLUMNS:
+				self.connection.execute(f'CREATE INDEX IF NOT EXISTS ix_series_{column} ON series ({column})')
+
+			# Live searches that were run: normalized query -> time
+			self.connection.execute('CREATE TABLE IF NOT EXISTS searches (QueryKey TEXT PRIMARY KEY, Searched REAL)')
+
+	def m_close(self):
+		with self.lock:
+			self.connection.close()
+
+	def m_populate(self, ticker_list: list) -> int:
+		"""
+		Fetch the metadata of tickers in bulk and store it, returns the number of series stored
+		"""
+		n = 0
+		for i in range(0, len(ticker_list), self.chunk_size):
+			chunk = ticker_list[i:i + self.chunk_size]
+			now = self.clock()
+			rows = [row for row in (self.f_entity_row(entity, now) for entity in self.mb.m_fetch_entities(chunk))
+					if row is not None]
+
+			with self.lock, self.connection:
+				self.connection.executemany(f'INSERT OR REPLACE INTO series VALUES ({", ".join(["?"] * 11)})', rows)
+
+			n += len(rows)
+
+		return n
+
+	def m_populate_search(self, concept_filter: str = 'gdp_total', **kwargs) -> list:
+		"""
+		Run a live search (same arguments as Macrobond.CreateSearchQuery) and store the metadata of all tickers
+		"""
+		ticker_list = self.mb.CreateSearchQuery(concept_filter=concept_filter, **kwargs)
+		self.m_populate(ticker_list)
+
+		with self.lock, self.connection:
+			self.connection.execute('INSERT OR REPLACE INTO searches VALUES (?, ?)',
+									(self.f_query_key(concept_filter, kwargs), self.clock()))
+
+		return ticker_list
+
+	def m_refresh(self, max_age: float = None) -> dict:
+		"""
+		Update series whose LastModifiedTimeStamp changed, series that no longer exist are removed
+		:param max_age: only check series refreshed more than max_age seconds ago, default all
+		"""
+		now = self.clock()
+
+		with self.lock:
+			if max_age is None:
+				stored = self.connection.execute('SELECT Ticker, LastModified FROM series').fetchall()
+			else:
+				stored = self.connection.execute('SELECT Ticker, LastModified FROM series WHERE Refreshed < ?',
+												 (now - max_age,)).fetchall()
+
+		changed_rows = list()
+		checked_list = list()
+		removed_list = list()
+		for i in range(0, len(stored), self.chunk_size):
+			chunk = stored[i:i + self.chunk_size]
+
+			# Not through the object cache, which may hold the old entities
+			entities = self.mb.mbdb.FetchEntities([ticker for ticker, last_modified in chunk])
+
+			for (ticker, last_modified), entity in zip(chunk, entities):
+				row = self.f_entity_row(entity, now)
+
+				if row is None:
+					removed_list.append((ticker,))
+				elif row[9] != last_modified:
+					changed_rows.append(row)
+				else:
+					checked_list.append((now, ticker))
+
+		with self.lock, self.connection:
+			self.connection.executemany(f'INSERT OR REPLACE INTO series VALUES ({", ".join(["?"] * 11)})',
+										changed_rows)
+			self.connection.executemany('UPDATE series SET Refreshed = ? WHERE Ticker = ?', checked_list)
+			self.connection.executemany('DELETE FROM series WHERE Ticker = ?', removed_list)
+
+		return {'Checked': len(stored), 'Changed': len(changed_rows), 'Removed': len(removed_list)}
+
+	def m_query(self, live_fallback: bool = True, **kwargs) -> pd.DataFrame:
+		"""
+		Series in the catalog that match all filters, one row per series
+		kwargs keys (not case sensitive): RegionKey (or Concept), Region (or RegionList), Frequency, Currency,
+		Database (or Source), Release, EntityState and TitleLike (SQL LIKE pattern, e.g. '%yield%').
+		Values are strings or lists of strings.
+
+		If nothing matches and a concept (or TitleLike) is given, a live search is run, stored and the query repeated.
+		The same live search is not repeated within search_ttl seconds.
+		"""
+		where = list()
+		params = list()
+		filters = dict()
+
+		for key, val in kwargs.items():
+			if key.lower() == 'titlelike':
+				where.append('Title LIKE ?')
+				params.append(val)
+				filters['TitleLike'] = val
+			elif key.lower() in QUERY_KEYS:
+				column = QUERY_KEYS[key.lower()]
+				val_list = [val] if isinstance(val, (str, int)) else list(val)
+				where.append(f'{column} IN ({", ".join(["?"] * len(val_list))})')
+				params.extend(str(v) for v in val_list)
+				filters[column] = val_list
+			else:
+				raise KeyError(f'Kwargs key: {key} not defined')
+
+		sql = 'SELECT * FROM series'
+		if where:
+			sql += ' WHERE ' + ' AND '.join(where)
+		sql += ' ORDER BY Ticker'
+
+		with self.lock:
+			df = pd.read_sql_query(sql, self.connection, params=params)
+
+		if df.empty and live_fallback and self.m_live_search(filters):
+			return self.m_query(live_fallback=False, **kwargs)
+
+		return df
+
+	def m_tickers(self, live_fallback: bool = True, **kwargs) -> list:
+		"""
+		Tickers in the catalog that match all filters, see m_query
+		"""
+		return self.m_query(live_fallback=live_fallback, **kwargs)['Ticker'].tolist()
+
+	def m_live_search(self, filters: dict) -> bool:
+		"""
+		Search live for the filters of a query that had no match, False if there is nothing to search for
+		or the same search was run within search_ttl
+		"""
+		search_kwargs = {'AutoPartition': True}
+		if 'Region' in filters:
+			search_kwargs['RegionList'] = filters['Region']
+		if 'Frequency' in filters and len(filters['Frequency']) == 1:
+			search_kwargs['Frequency'] = filters['Frequency'][0]
+
+		if 'RegionKey' in filters and len(filters['RegionKey']) == 1:
+			concept_filter = filters['RegionKey'][0]
+		elif 'TitleLike' in filters:
+			concept_filter = ''
+			search_kwargs['FreeText'] = filters['TitleLike'].replace('%', ' ').replace('_', ' ').strip()
+		else:
+			return False
+
+		query_key = self.f_query_key(concept_filter, search_kwargs)
+		with self.lock:
+			searched = self.connection.execute('SELECT Searched FROM searches WHERE QueryKey = ?',
+											   (query_key,)).fetchone()
+
+		if searched is not None and self.clock() - searched[0] < self.search_ttl:
+			return False
+
+		self.m_populate_search(concept_filter=concept_filter, **search_kwargs)
+
+		return True
+
+	def m_stats(self) -> dict:
+		with self.lock:
+			n_series = self.connection.execute('SELECT COUNT(*) FROM series').fetchone()[0]
+			n_searches = self.connection.execute('SELECT COUNT(*) FROM searches').fetchone()[0]
+
+		return {'Series': n_series, 'Searches': n_searches}
+
+	@staticmethod
+	def f_entity_row(entity, refreshed: float):
+		"""
+		Row of the series table from an entity, None for errors
+		"""
+		if entity.IsError:
+			return None
+
+		metadata = entity.Metadata
+		values = [metadata.GetFirstValue(column) for column in CATALOG_COLUMNS]
+		last_modified = metadata.GetFirstValue('LastModifiedTimeStamp')
+
+		return tuple([entity.Name, entity.Title] + [None if v is None else str(v) for v in values] +
+					 [None if last_modified is None else last_modified.isoformat(), refreshed])
+
+	@staticmethod
+	def f_query_key(concept_filter: str, kwargs: dict) -> str:
+		"""
+		Search arguments as a string that does not depend on case or the order of lists
+		"""
+
+		def normalize(value):
+			if isinstance(value, str):
+				return value.strip().lower()
+			if isinstance(value, (list, tuple)):
+				return sorted(normalize(v) for v in value)
+			return value
+
+		return json.dumps([normalize(concept_filter), sorted((k.lower(), normalize(v)) for k, v in kwargs.items())],
+						  default=str)
@@ -0,0 +1,98 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class ObjectCache:
+	"""
+	In-memory LRU cache with a time to live, used for series and entity objects within a session
+
+	Entries older than ttl seconds are treated as missing. When more than max_size entries are stored
+	the least recently used one is dropped. Set max_size to 0 to disable the cache.
+	"""
+
+	def __init__(self, max_size: int = 1000, ttl: float = 300.0, clock=time.monotonic):
+		self.max_size = max_size
+		self.ttl = ttl
+		self.clock = clock
+
+		# key -> (time stored, object)
+		self.items = OrderedDict()
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.hits = 0
+		self.misses = 0
+		self.expirations = 0
+		self.evictions = 0
+
+	def m_get(self, key):
+		"""
+		Return the cached object or None if it is missing or expired
+		"""
+		with self.lock:
+			item = self.items.get(key)
+
+			if item is None:
+				self.misses += 1
+				return None
+
+			stored_time, value = item
+			if self.ttl is not None and self.clock() - stored_time > self.ttl:
+				del self.items[key]
+				self.misses += 1
+				self.expirations += 1
+				return None
+
+			# Mark as most recently used
+			self.items.move_to_end(key)
+			self.hits += 1
+
+			return value
+
+	def m_put(self, key, value):
+		"""
+		Store an object, evict the least recently used ones above max_size
+		"""
+		if self.max_size <= 0:
+			return
+
+		with self.lock:
+			self.items[key] = (self.clock(), value)
+			self.items.move_to_end(key)
+
+			while len(self.items) > self.max_size:
+				self.items.popitem(last=False)
+				self.evictions += 1
+
+	def m_invalidate(self, key_list: list = None):
+		"""
+		Remove some keys from the cache, or everything if no list is given
+		"""
+		with self.lock:
+			if key_list is None:
+				self.items.clear()
+			else:
+				for key in key_list:
+					self.items.pop(key, None)
+
+	def m_invalidate_where(self, predicate):
+		"""
+		Remove every key for which predicate(key) is true
+		"""
+		with self.lock:
+			for key in [key for key in self.items if predicate(key)]:
+				del self.items[key]
+
+	def m_stats(self) -> dict:
+		"""
+		Hit/miss statistics and the current number of entries
+		"""
+		requests = self.hits + self.misses
+
+		return {'Hits': self.hits,
+				'Misses': self.misses,
+				'Expirations': self.expirations,
+				'Evictions': self.evictions,
+				'HitRatio': self.hits / requests if requests > 0 else 0.0,
+				'Entries': len(self.items)}
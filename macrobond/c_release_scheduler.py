@@ -0,0 +1,262 @@
+from __future__ import annotations
+import time
+import heapq
+import queue
+import threading
+import datetime as dt
+from macrobond.c_macrobond import Macrobond
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+
+
+class ReleaseScheduler:
+	"""
+	Refetch watched series shortly after their release instead of polling all of them
+
+	Tickers are grouped by their Release entity, and every release is checked delay seconds after its
+	NextReleaseEventTime. A check asks for LastModifiedTimeStamp of the release's tickers (entities without values)
+	and only the tickers that changed are fetched. If nothing changed yet, the check is retried every retry_interval
+	seconds, at most max_retries times, before the release moves on to its next event. Releases without a known
+	next event are looked up again after calendar_interval seconds.
+
+	Fresh data is passed as (release, ticker_list, df) to the callback, if any, and put on the queue.
+	Tickers without a release are not scheduled and are listed in unscheduled.
+
+	Example:
+	scheduler = ReleaseScheduler(mb, callback=lambda release, ticker_list, df: print(release, df.tail(1)))
+	scheduler.m_watch(['usnaac0057', 'senaac0067'])
+	scheduler.m_start()
+	"""
+
+	def __init__(self, mb: Macrobond = None, delay: float = 30.0, retry_interval: float = 60.0,
+				 max_retries: int = 10, calendar_interval: float = 6 * 3600.0, callback=None, clock=time.time,
+				 max_wait: float = 60.0):
+		"""
+		:param mb: Macrobond instance to use, a new one is created if not given
+		:param delay: seconds after the release event before the first check
+		:param retry_interval: seconds between checks while the data of a release has not arrived
+		:param max_retries: checks after the first one before giving up on a release event
+		:param calendar_interval: seconds before a release without a next event is looked up again
+		:param callback: called with (release, ticker_list, df) for every refetch, on the scheduler thread
+		:param clock: function returning the current time in seconds since the epoch
+		:param max_wait: longest sleep of the scheduler thread, so that changes of the clock are noticed
+		"""
+		self.mb = mb if mb is not None else Macrobond()
+		self.delay = delay
+		self.retry_interval = retry_interval
+		self.max_retries = max_retries
+		self.calendar_interval = calendar_interval
+		self.callback = callback
+		self.clock = clock
+		self.max_wait = max_wait
+
+		# Results of all refetches: (release, ticker_list, df)
+		self.queue = queue.Queue()
+
+		# release -> set of tickers, ticker -> release, ticker -> LastModifiedTimeStamp
+		self.releases = dict()
+		self.ticker_release = dict()
+		self.last_modified = dict()
+		self.unscheduled = set()
+
+		# release -> next event time, time of the next check and checks made since the event
+		self.next_event = dict()
+		self.due = dict()
+		self.retries = dict()
+
+		# (due, release), entries whose due time no longer matches self.due are skipped
+		self.heap = list()
+
+		self.lock = threading.RLock()
+		self.wake = threading.Event()
+		self.stop = threading.Event()
+		self.thread = None
+
+	def m_watch(self, ticker_list: list):
+		"""
+		Start watching tickers, their release calendars are fetched at once
+		"""
+		entities = self.mb.m_fetch_entities(ticker_list)
+
+		new_release_list = list()
+		with self.lock:
+			for ticker, entity in zip(ticker_list, entities):
+				release = None if entity.IsError else entity.Metadata.GetFirstValue('Release')
+
+				if release is None:
+					self.unscheduled.add(ticker)
+					continue
+
+				self.ticker_release[ticker] = release
+				self.last_modified[ticker] = entity.Metadata.GetFirstValue('LastModifiedTimeStamp')
+
+				if release not in self.releases:
+					self.releases[release] = set()
+					new_release_list.append(release)
+				self.releases[release].add(ticker)
+
+		if new_release_list:
+			self.m_update_calendar(new_release_list)
+
+	def m_unwatch(self, ticker_list: list):
+		with self.lock:
+			for ticker in ticker_list:
+				self.unscheduled.discard(ticker)
+				self.last_modified.pop(ticker, None)
+				release = self.ticker_release.pop(ticker, None)
+
+				if release is not None:
+					self.releases[release].discard(ticker)
+
+					# Stale heap entries are skipped
+					if not self.releases[release]:
+						for d in [self.releases, self.next_event, self.due, self.retries]:
+							d.pop(release, None)
+
+	def m_update_calendar(self, release_list: list):
+		"""
+		Fetch the next event of releases and schedule their next check
+		"""
+		# Not through the object cache, the calendar moves on after every release
+		entities = self.mb.mbdb.FetchEntities(release_list)
+		now = self.clock()
+
+		with self.lock:
+			for release, entity in zip(release_list, entities):
+				if release not in self.releases:
+					continue
+
+				next_time = None if entity.IsError else entity.Metadata.GetFirstValue('NextReleaseEventTime')
+				next_time = None if next_time is None else next_time.timestamp()
+
+				# Without a new event, look again later
+				if next_time is None or next_time <= self.next_event.get(release, float('-inf')):
+					self.m_schedule_check(release, now + self.calendar_interval)
+				else:
+					self.next_event[release] = next_time
+					self.retries[release] = 0
+					self.m_schedule_check(release, next_time + self.delay)
+
+	def m_schedule_check(self, release: str, due: float):
+		with self.lock:
+			self.due[release] = due
+			heapq.heappush(self.heap, (due, release))
+
+		self.wake.set()
+
+	def m_run_pending(self) -> int:
+		"""
+		Check every release that is due, returns the number of releases checked
+		"""
+		now = self.clock()
+
+		due_list = list()
+		with self.lock:
+			while self.heap and self.heap[0][0] <= now:
+				due, release = heapq.heappop(self.heap)
+
+				if self.due.get(release) == due:
+					del self.due[release]
+					due_list.append(release)
+
+		for i, release in enumerate(due_list):
+			try:
+				self.m_check_release(release)
+			except Exception:
+				# Check this and the remaining releases again later
+				for r in due_list[i:]:
+					self.m_schedule_check(r, self.clock() + self.retry_interval)
+				raise
+
+		return len(due_list)
+
+	def m_check_release(self, release: str):
+		"""
+		Refetch the tickers of a release whose LastModifiedTimeStamp changed
+		"""
+		with self.lock:
+			ticker_list = sorted(self.releases.get(release, ()))
+
+		if not ticker_list:
+			return
+
+		last_modified_list = self.mb.m_last_modified(ticker_list)
+
+		with self.lock:
+			changed_list = [ticker for ticker, last_modified in zip(ticker_list, last_modified_list)
+							if last_modified is not None and last_modified != self.last_modified.get(ticker)]
+
+		if changed_list:
+			self.mb.m_invalidate(changed_list)
+			df = self.mb.FetchSeries(ticker_list=changed_list)
+
+			with self.lock:
+				for ticker, last_modified in zip(ticker_list, last_modified_list):
+					if ticker in changed_list:
+						self.last_modified[ticker] = last_modified
+
+			if self.callback is not None:
+				self.callback(release, changed_list, df)
+			self.queue.put((release, changed_list, df))
+
+		with self.lock:
+			if release not in self.releases:
+				return
+
+			if not changed_list and self.retries.get(release, 0) < self.max_retries:
+				self.retries[release] = self.retries.get(release, 0) + 1
+				self.m_schedule_check(release, self.clock() + self.retry_interval)
+				return
+
+		self.m_update_calendar([release])
+
+	def m_start(self):
+		"""
+		Run the checks on a background thread until m_stop
+		"""
+		if self.thread is not None and self.thread.is_alive():
+			return
+
+		self.stop.clear()
+		self.thread = threading.Thread(target=self.m_loop, name='ReleaseScheduler', daemon=True)
+		self.thread.start()
+
+	def m_stop(self, timeout: float = None):
+		self.stop.set()
+		self.wake.set()
+
+		if self.thread is not None:
+			self.thread.join(timeout)
+			self.thread = None
+
+	def m_loop(self):
+		while not self.stop.is_set():
+			try:
+				self.m_run_pending()
+			except Exception as e:
+				# Keep the scheduler alive, the failed release is checked again later
+				print(f'Release check failed: {e}')
+
+			with self.lock:
+				wait = self.heap[0][0] - self.clock() if self.heap else self.max_wait
+
+			self.wake.clear()
+			self.wake.wait(min(max(wait, 0.0), self.max_wait))
+
+	def m_schedule(self) -> pd.DataFrame:
+		"""
+		Watched releases with their next event, next check and number of tickers
+		"""
+		with self.lock:
+			release_list = sorted(self.releases)
+			df = pd.DataFrame({'NextRelease': [self.f_datetime(self.next_event.get(r)) for r in release_list],
+							   'NextCheck': [self.f_datetime(self.due.get(r)) for r in release_list],
+							   'Retries': [self.retries.get(r, 0) for r in release_list],
+							   'Tickers': [len(self.releases[r]) for r in release_list]},
+							  index=pd.Index(release_list, name='Release'))
+
+		return df
+
+	@staticmethod
+	def f_datetime(seconds: float):
+		return None if seconds is None else dt.datetime.fromtimestamp(seconds, tz=dt.timezone.utc)
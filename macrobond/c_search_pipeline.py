@@ -0,0 +1,155 @@
+from __future__ import annotations
+import queue
+import threading
+from macrobond.c_macrobond import Macrobond
+
+# Put on a queue when a stage has no more items
+STAGE_END = object()
+
+
+class SearchPipeline:
+	"""
+	Search, then fetch and full info of the found tickers, as overlapping stages
+
+	Every stage runs on its own threads (each with its own connection) and passes chunks of tickers to the next stage
+	through a bounded queue, so data and metadata of the first tickers are fetched while later search partitions
+	are still running. The series objects of a chunk are fetched once, and both the values and the full info are
+	read from them on the thread that fetched them. End-to-end time approaches that of the slowest stage instead of
+	the sum of both.
+
+	Example:
+	pipeline = SearchPipeline(mb, chunk_size=500)
+	for ticker_list, df, df_info in pipeline.m_run(concept_filter='cpi_total', AutoPartition=True):
+		...
+	"""
+
+	def __init__(self, mb: Macrobond = None, chunk_size: int = 500, queue_size: int = 4, fetch_max_workers: int = 1,
+				 metadata_list: list = None, poll_interval: float = 0.1):
+		"""
+		:param mb: Macrobond instance to use, a new one is created if not given
+		:param chunk_size: tickers per chunk passed between the stages
+		:param queue_size: chunks that can wait between two stages before the earlier stage blocks
+		:param fetch_max_workers: threads of the fetch stage, every thread fetches whole chunks
+		:param metadata_list: extra metadata columns of m_get_full_info
+		:param poll_interval: seconds between checks whether the pipeline was stopped
+		"""
+		self.mb = mb if mb is not None else Macrobond()
+		self.chunk_size = chunk_size
+		self.queue_size = queue_size
+		self.fetch_max_workers = fetch_max_workers
+		self.metadata_list = metadata_list
+		self.poll_interval = poll_interval
+
+	def m_run(self, concept_filter: str = 'gdp_total', entity_type_filter: str = 'TimeSeries', **kwargs):
+		"""
+		Generator that yields (ticker_list, df, df_info) for every chunk as soon as all stages are done with it
+		df is the FetchSeries frame and df_info the m_get_full_info frame of ticker_list
+		Arguments are passed to Macrobond.m_iter_search, errors of any stage are raised here
+		"""
+		search_queue = queue.Queue(maxsize=self.queue_size)
+		result_queue = queue.Queue(maxsize=self.queue_size)
+
+		stop = threading.Event()
+		errors = list()
+
+		def search_stage():
+			chunk = list()
+			for names in self.mb.m_iter_search(concept_filter=concept_filter, entity_type_filter=entity_type_filter,
+											   **kwargs):
+				chunk.extend(names)
+
+				while len(chunk) >= self.chunk_size:
+					if not self.f_put(search_queue, chunk[:self.chunk_size], stop, self.poll_interval):
+						return
+					chunk = chunk[self.chunk_size:]
+
+			if chunk:
+				self.f_put(search_queue, chunk, stop, self.poll_interval)
+
+		def fetch_stage():
+			for ticker_list in self.f_iter_queue(search_queue, stop, self.poll_interval):
+				# COM objects stay on this thread, values and metadata are both read from them here
+				series = self.mb.m_fetch_series_objects(ticker_list)
+				df = self.mb.m_series_tuple_to_df(ticker_list, series)
+				df_info = self.mb.m_get_full_info(ticker_list=ticker_list, metadata_list=self.metadata_list,
+												  series=series)
+
+				if not self.f_put(result_queue, (ticker_list, df, df_info), stop, self.poll_interval):
+					return
+
+		thread_list = (self.f_start_stage('search', search_stage, search_queue, stop, errors, self.poll_interval) +
+					   self.f_start_stage('fetch', fetch_stage, result_queue, stop, errors, self.poll_interval,
+										  n_threads=max(self.fetch_max_workers, 1)))
+
+		try:
+			for result in self.f_iter_queue(result_queue, stop, self.poll_interval):
+				yield result
+
+			if errors:
+				raise errors[0]
+		finally:
+			# Also stops the stages if the caller stops iterating
+			stop.set()
+			for thread in thread_list:
+				thread.join()
+
+	@staticmethod
+	def f_start_stage(name: str, target, output_queue: queue.Queue, stop: threading.Event, errors: list,
+					  poll_interval: float, n_threads: int = 1) -> list:
+		"""
+		Run target on n_threads new threads, the end of output_queue is marked when the last one returns or fails
+		"""
+		running = [n_threads]
+		lock = threading.Lock()
+
+		def run():
+			try:
+				target()
+			except BaseException as e:
+				errors.append(e)
+			finally:
+				with lock:
+					running[0] -= 1
+					last_tf = running[0] == 0
+
+				if last_tf:
+					SearchPipeline.f_put(output_queue, STAGE_END, stop, poll_interval)
+
+		thread_list = [threading.Thread(target=run, name=f'macrobond-pipeline-{name}-{i}', daemon=True)
+					   for i in range(n_threads)]
+		for thread in thread_list:
+			thread.start()
+
+		return thread_list
+
+	@staticmethod
+	def f_put(q: queue.Queue, item, stop: threading.Event, poll_interval: float) -> bool:
+		"""
+		Put an item on a bounded queue, False if the pipeline was stopped while waiting
+		"""
+		while not stop.is_set():
+			try:
+				q.put(item, timeout=poll_interval)
+				return True
+			except queue.Full:
+				continue
+
+		return False
+
+	@staticmethod
+	def f_iter_queue(q: queue.Queue, stop: threading.Event, poll_interval: float):
+		"""
+		Items of a queue until the end of the stage before, or until the pipeline is stopped
+		"""
+		while not stop.is_set():
+			try:
+				item = q.get(timeout=poll_interval)
+			except queue.Empty:
+				continue
+
+			if item is STAGE_END:
+				# Leave the end for the other threads reading the same queue
+				SearchPipeline.f_put(q, STAGE_END, stop, poll_interval)
+				return
+
+			yield item
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import os
+import json
+import time
+import threading
+import urllib.parse
+from macrobond.lazy_import import f_lazy_import
+pd = f_lazy_import('pandas')
+
+
+class SeriesCache:
+	"""
+	Persistent on-disk cache with one columnar file per ticker
+
+	Each entry is stored together with the LastModifiedTimeStamp of the series. An entry is only served if the
+	timestamp we get from the database is identical to the stored one, otherwise it is considered stale.
+	The total size of the cache directory is kept below max_size_bytes by evicting the least recently used entries.
+	"""
+
+	def __init__(self, cache_dir: str, max_size_bytes: int = 2 * 1024 ** 3, file_format: str = 'parquet'):
+		file_format_list = ['parquet', 'feather']
+
+		if file_format.lower() not in file_format_list:
+			raise KeyError(f'Invalid file format. Expected: {file_format_list}')
+
+		# Both formats are written through pyarrow
+		try:
+			import pyarrow
+		except ImportError as ie:
+			print(f'The series cache requires pyarrow: pip install pyarrow')
+			raise ie
+
+		os.makedirs(cache_dir, exist_ok=True)
+
+		self.cache_dir = cache_dir
+		self.max_size_bytes = max_size_bytes
+		self.file_format = file_format.lower()
+		self.index_path = os.path.join(cache_dir, 'index.json')
+		self.index = self.f_load_index(self.index_path)
+
+		# The cache may be used from several threads at once
+		self.lock = threading.RLock()
+
+		# Statistics for this session
+		self.hits = 0
+		self.misses = 0
+		self.stale = 0
+		self.evictions = 0
+
+	def m_get(self, ticker: str, last_modified) -> pd.DataFrame:
+		"""
+		Return the cached frame of a ticker if it exists and is up to date, otherwise None
+		"""
+		with self.lock:
+			key = ticker.lower()
+			entry = self.index.get(key)
+			stamp = self.f_timestamp_key(last_modified)
+
+			if entry is None:
+				self.misses += 1
+				return None
+
+			# A missing timestamp can never be validated, so it is treated as stale as well
+			if stamp is None or entry['last_modified'] != stamp:
+				self.misses += 1
+				self.stale += 1
+				return None
+
+			df = self.m_read(ticker)
+
+			if df is None:
+				# File has been removed or is corrupt, drop the entry
+				self.index.pop(key, None)
+				self.misses += 1
+				return None
+
+			entry['last_access'] = time.time()
+			self.hits += 1
+
+			return df
+
+	def m_is_current(self, ticker: str, last_modified) -> bool:
+		"""
+		True if the ticker is stored with this LastModifiedTimeStamp. Does not read the file
+		"""
+		stamp = self.f_timestamp_key(last_modified)
+		entry = self.index.get(ticker.lower())
+
+		return stamp is not None and entry is not None and entry['last_modified'] == stamp
+
+	def m_read(self, ticker: str) -> pd.DataFrame:
+		"""
+		Return the stored frame of a ticker without checking if it is up to date, None if it is not stored
+		"""
+		with self.lock:
+			entry = self.index.get(ticker.lower())
+
+			if entry is None:
+				return None
+
+			path = os.path.join(self.cache_dir, entry['file'])
+
+			try:
+				if self.file_format == 'parquet':
+					df = pd.read_parquet(path)
+				else:
+					df = pd.read_feather(path).set_index('index')
+			except (OSError, ValueError):
+				return None
+
+			df.index.name = None
+
+			return df
+
+	def m_put(self, ticker: str, df: pd.DataFrame, last_modified, flush: bool = True):
+		"""
+		Store a single-column frame (index: end of period dates) for a ticker
+		Set flush=False when storing many tickers and call m_flush() once afterwards
+		"""
+		with self.lock:
+			stamp = self.f_timestamp_key(last_modified)
+
+			# Without a timestamp we could never serve the entry
+			if stamp is None:
+				return
+
+			key = ticker.lower()
+			file_name = f"{urllib.parse.quote(key, safe='')}.{self.file_format}"
+			path = os.path.join(self.cache_dir, file_name)
+
+			if self.file_format == 'parquet':
+				df.to_parquet(path)
+			else:
+				df.rename_axis('index').reset_index().to_feather(path)
+
+			self.index[key] = {'file': file_name,
+							   'last_modified': stamp,
+							   'size': os.path.getsize(path),
+							   'last_access': time.time()}
+
+			if flush:
+				self.m_flush()
+
+	def m_flush(self):
+		"""
+		Evict entries above the size limit and write the index to disk
+		"""
+		with self.lock:
+			self.m_evict()
+
+			# Write to a temporary file first so that a crash never leaves a broken index behind
+			tmp_path = f'{self.index_path}.tmp'
+			with open(tmp_path, 'w') as f:
+				json.dump(self.index, f)
+			os.replace(tmp_path, self.index_path)
+
+	def m_evict(self):
+		"""
+		Remove least recently used entries until the cache fits within max_size_bytes
+		"""
+		total_size = sum(entry['size'] for entry in self.index.values())
+
+		if total_size <= self.max_size_bytes:
+			return
+
+		for key, entry in sorted(self.index.items(), key=lambda kv: kv[1]['last_access']):
+			try:
+				os.remove(os.path.join(self.cache_dir, entry['file']))
+			except OSError:
+				pass
+
+			del self.index[key]
+			self.evictions += 1
+			total_size -= entry['size']
+
+			if total_size <= self.max_size_bytes:
+				break
+
+	def m_invalidate(self, ticker_list: list = None):
+		"""
+		Remove some tickers from the cache, or everything if no list is given
+		"""
+		with self.lock:
+			keys = list(self.index.keys()) if ticker_list is None else [tick.lower() for tick in ticker_list]
+
+			for key in keys:
+				entry = self.index.pop(key, None)
+				if entry is not None:
+					try:
+						os.remove(os.path.join(self.cache_dir, entry['file']))
+					except OSError:
+						pass
+
+			self.m_flush()
+
+	def m_stats(self) -> dict:
+		"""
+		Hit/miss statistics for this session together with the current size of the cache
+		"""
+		requests = self.hits + self.misses
+
+		return {'Hits': self.hits,
+				'Misses': self.misses,
+				'Stale': self.stale,
+				'Evictions': self.evictions,
+				'HitRatio': self.hits / requests if requests > 0 else 0.0,
+				'Entries': len(self.index),
+				'SizeBytes': sum(entry['size'] for entry in self.index.values())}
+
+	@staticmethod
+	def f_load_index(index_path: str) -> dict:
+		"""
+		Load the index of the cache, start over with an empty one if it cannot be read
+		"""
+		try:
+			with open(index_path, 'r') as f:
+				return json.load(f)
+		except (OSError, ValueError):
+			return dict()
+
+	@staticmethod
+	def f_timestamp_key(last_modified):
+		"""
+		Convert LastModifiedTimeStamp to a string that can be compared and stored in json
+		"""
+		if last_modified is None:
+			return None
+
+		if hasattr(last_modified, 'isoformat'):
+			return last_modified.isoformat()
+
+		return str(last_modified)
@@ -0,0 +1,104 @@
+import threading
+
+
+class Flight:
+	"""
+	One call in progress, the callers waiting for it get its result or error
+	"""
+	__slots__ = ('event', 'result', 'error')
+
+	def __init__(self):
+		self.event = threading.Event()
+		self.result = None
+		self.error = None
+
+
+class SingleFlight:
+	"""
+	Coalesces concurrent requests for the same key, so that only one call is made and every caller shares the
+	result. Lists of items are split: only items that are not already in flight are fetched by the caller.
+
+	Results are not kept once the call is done, that is what the caches are for.
+	"""
+
+	def __init__(self):
+		# key -> Flight
+		self.flights = dict()
+		self.lock = threading.Lock()
+
+		# Statistics
+		self.calls = 0
+		self.coalesced = 0
+
+	def m_do(self, key, func):
+		"""
+		Return func(), or the result of the call with the same key that is already in flight
+		"""
+		return self.m_do_many([key], lambda key_list: [func()])[0]
+
+	def m_do_many(self, item_list: list, func, key=None) -> list:
+		"""
+		Return one result per item of item_list
+		:param func: called with the items that are not in flight (without duplicates), returns one result per item
+		:param key: function from item to key, default the item itself
+		"""
+		if key is None:
+			key = lambda item: item
+
+		# key -> (item, flight) of the items this caller fetches, key -> flight of the ones it waits for
+		own = dict()
+		wait = dict()
+
+		with self.lock:
+			for item in item_list:
+				k = key(item)
+				if k in own or k in wait:
+					continue
+
+				flight = self.flights.get(k)
+				if flight is None:
+					flight = Flight()
+					self.flights[k] = flight
+					own[k] = (item, flight)
+				else:
+					wait[k] = flight
+					self.coalesced += 1
+
+			if own:
+				self.calls += 1
+
+		if own:
+			try:
+				result_list = func([item for item, flight in own.values()])
+
+				for (item, flight), result in zip(own.values(), result_list):
+					flight.result = result
+			except BaseException as e:
+				for item, flight in own.values():
+					flight.error = e
+				raise
+			finally:
+				with self.lock:
+					for k in own:
+						del self.flights[k]
+
+				for item, flight in own.values():
+					flight.event.set()
+
+		for flight in wait.values():
+			flight.event.wait()
+
+			if flight.error is not None:
+				raise flight.error
+
+		result_map = {k: flight.result for k, (item, flight) in own.items()}
+		result_map.update({k: flight.result for k, flight in wait.items()})
+
+		return [result_map[key(item)] for item in item_list]
+
+	def m_stats(self) -> dict:
+		"""
+		Calls made and number of items that were served by another caller's call
+		"""
+		with self.lock:
+			return {'Calls': self.calls, 'Coalesced': self.coalesced, 'InFlight': len(self.flights)}
@@ -0,0 +1,146 @@
+from __future__ import annotations
+import datetime as dt
+import macrobond_api_constants.CalendarMergeMode
+import macrobond_api_constants.SeriesFrequency
+import macrobond_api_constants.SeriesMissingValueMethod
+import macrobond_api_constants.SeriesPartialPeriodsMethod
+import macrobond_api_constants.SeriesToHigherFrequencyMethod
+import macrobond_api_constants.SeriesToLowerFrequencyMethod
+import macrobond_api_constants.SeriesWeekdays
+
+'''
+Options of a unified series request
+https://help.macrobond.com/technical-information/the-macrobond-api-for-python/#iseriesrequest
+
+Options set on the request apply to all series, options set on a series expression only to that series.
+Values are either the constant of macrobond_api_constants or its name, e.g. 'monthly', 'linear_interpolation'.
+'''
+REQUEST_OPTIONS = {'startdate': ('StartDate', None),
+				   'enddate': ('EndDate', None),
+				   'currency': ('Currency', None),
+				   'frequency': ('Frequency', macrobond_api_constants.SeriesFrequency),
+				   'weekdays': ('Weekdays', macrobond_api_constants.SeriesWeekdays),
+				   'calendarmergemode': ('CalendarMergeMode', macrobond_api_constants.CalendarMergeMode)}
+
+SERIES_OPTIONS = {'tohigherfrequencymethod': ('ToHigherFrequencyMethod',
+											  macrobond_api_constants.SeriesToHigherFrequencyMethod),
+				  'tolowerfrequencymethod': ('ToLowerFrequencyMethod',
+											 macrobond_api_constants.SeriesToLowerFrequencyMethod),
+				  'missingvaluemethod': ('MissingValueMethod', macrobond_api_constants.SeriesMissingValueMethod),
+				  'partialperiodsmethod': ('PartialPeriodsMethod', macrobond_api_constants.SeriesPartialPeriodsMethod)}
+
+
+class UnifiedRequestBuilder:
+	"""
+	Builds a unified series request, so that date range, frequency conversion, calendar and missing values are
+	handled in the database and only the needed observations are transferred
+
+	Example:
+	builder = UnifiedRequestBuilder(StartDate='2010-01-01', Frequency='monthly', ToLowerFrequencyMethod='average')
+	builder.m_add_series('usnaac0057', ToHigherFrequencyMethod='linear_interpolation')
+	series = mbdb.FetchSeries(builder.m_build(mbdb))
+
+	Option keys are not case sensitive.
+	"""
+
+	def __init__(self, **kwargs):
+		# Attribute name -> value, for the request and for every series
+		self.request_options = dict()
+		self.series_options = dict()
+
+		# (ticker, options of that series only)
+		self.series_list = list()
+
+		self.m_set(**kwargs)
+
+	def m_set(self, **kwargs) -> 'UnifiedRequestBuilder':
+		"""
+		Set request options, and series options that apply to every series
+		"""
+		for key, val in kwargs.items():
+			if key.lower() in REQUEST_OPTIONS:
+				attribute, constants = REQUEST_OPTIONS[key.lower()]
+				self.request_options[attribute] = self.f_option_value(attribute, constants, val)
+			elif key.lower() in SERIES_OPTIONS:
+				attribute, constants = SERIES_OPTIONS[key.lower()]
+				self.series_options[attribute] = self.f_option_value(attribute, constants, val)
+			else:
+				raise KeyError(f'Kwargs key: {key} not defined')
+
+		return self
+
+	def m_add_series(self, ticker: str, **kwargs) -> 'UnifiedRequestBuilder':
+		"""
+		Add one series, kwargs are series options of this series only
+		"""
+		options = dict()
+		for key, val in kwargs.items():
+			if key.lower() not in SERIES_OPTIONS:
+				raise KeyError(f'Kwargs key: {key} not defined for a series')
+
+			attribute, constants = SERIES_OPTIONS[key.lower()]
+			options[attribute] = self.f_option_value(attribute, constants, val)
+
+		self.series_list.append((ticker, options))
+
+		return self
+
+	def m_add_series_list(self, ticker_list: list) -> 'UnifiedRequestBuilder':
+		for ticker in ticker_list:
+			self.m_add_series(ticker)
+
+		return self
+
+	@property
+	def ticker_list(self) -> list:
+		return [ticker for ticker, options in self.series_list]
+
+	def m_build(self, mbdb):
+		"""
+		Create the COM request on a database connection
+		"""
+		req = mbdb.CreateUnifiedSeriesRequest()
+
+		for ticker, options in self.series_list:
+			expression = req.AddSeries(ticker)
+
+			for attribute, value in {**self.series_options, **options}.items():
+				setattr(expression, attribute, value)
+
+		for attribute, value in self.request_options.items():
+			setattr(req, attribute, value)
+
+		return req
+
+	@staticmethod
+	def f_option_value(attribute: str, constants, value):
+		"""
+		Value of an option as the request expects it: a constant, a date string or a currency code
+		"""
+		if constants is None:
+			# Dates are passed as strings, other strings (e.g. '-5y') are passed as they are
+			if isinstance(value, dt.datetime):
+				value = value.date()
+			if isinstance(value, dt.date):
+				return value.isoformat()
+			return value
+
+		return UnifiedRequestBuilder.f_constant(constants, value)
+
+	@staticmethod
+	def f_constant(constants, value) -> int:
+		"""
+		Look up a constant by value or by name, names ignore case, spaces, hyphens and underscores
+		E.g. 'semi annual', 'SEMI_ANNUAL' and 'semiannual' are all SeriesFrequency.SEMI_ANNUAL
+		"""
+		valid = {name: getattr(constants, name) for name in dir(constants) if name.isupper()}
+
+		if isinstance(value, str):
+			key = value.replace(' ', '').replace('-', '').replace('_', '').upper()
+			for name, constant in valid.items():
+				if name.replace('_', '') == key:
+					return constant
+		elif value in valid.values():
+			return value
+
+		raise KeyError(f'{value} is not one of {constants.__name__}: {", ".join(valid)}')
@@ -0,0 +1,320 @@
+from __future__ import annotations
+from macrobond import ingest
+from macrobond import align
+from macrobond.lazy_import import f_lazy_import
+np = f_lazy_import('numpy')
+pd = f_lazy_import('pandas')
+
+# Vintages without a revision time stamp are treated as the oldest ones, same default date as for releases
+# Kept as a string so that numpy is not loaded on import, it is assigned into datetime64[ns] arrays
+NO_REVISION_TIME = '1900-01-01'
+
+
+class VintageHistory:
+	"""
+	Complete revision history of one series in a compact diff-based layout
+
+	Only observations that are new or changed compared to the previous vintage are stored, as three arrays:
+	vintage index (int32), date (datetime64[ns]) and value (float64). Observations that disappear in a vintage
+	are stored as nan. Memory therefore grows with the number of changed observations and not with
+	vintages x length of the series.
+	"""
+
+	def __init__(self, name: str, vintage_times: np.ndarray, dates_list: list, values_list: list):
+		"""
+		:param name: name of the series
+		:param vintage_times: datetime64 time of every vintage, oldest first
+		:param dates_list: one datetime64 array of end of period dates per vintage
+		:param values_list: one float64 array per vintage
+		"""
+		self.name = name
+		self.vintage_times = np.asarray(vintage_times, dtype='datetime64[ns]')
+
+		vintage_changes = list()
+		date_changes = list()
+		value_changes = list()
+
+		prev_dates = np.empty(0, dtype='datetime64[ns]')
+		prev_values = np.empty(0, dtype=np.float64)
+
+		for n, (dates, values) in enumerate(zip(dates_list, values_list)):
+			dates = np.asarray(dates, dtype='datetime64[ns]')
+			values = np.asarray(values, dtype=np.float64)
+
+			# Find every date of this vintage in the previous one
+			idx = np.minimum(np.searchsorted(prev_dates, dates), max(len(prev_dates) - 1, 0))
+			if len(prev_dates) > 0:
+				found = prev_dates[idx] == dates
+				old_values = prev_values[idx]
+			else:
+				found = np.zeros(len(dates), dtype=bool)
+				old_values = np.full(len(dates), np.nan)
+
+			same = found & ((old_values == values) | (np.isnan(old_values) & np.isnan(values)))
+			changed = ~same
+
+			# Observations that existed before but are gone in this vintage
+			removed = ~np.isin(prev_dates, dates) & ~np.isnan(prev_values)
+
+			vintage_changes.append(np.full(changed.sum() + removed.sum(), n, dtype=np.int32))
+			date_changes.append(np.concatenate([dates[changed], prev_dates[removed]]))
+			value_changes.append(np.concatenate([values[changed], np.full(removed.sum(), np.nan)]))
+
+			prev_dates = dates
+			prev_values = values
+
+		if vintage_changes:
+			self.vintage_index = np.concatenate(vintage_changes)
+			self.dates = np.concatenate(date_changes)
+			self.values = np.concatenate(value_changes)
+		else:
+			self.vintage_index = np.empty(0, dtype=np.int32)
+			self.dates = np.empty(0, dtype='datetime64[ns]')
+			self.values = np.empty(0, dtype=np.float64)
+
+		# Changes sorted by date and then vintage, used for point in time lookups
+		self.order = np.lexsort((self.vintage_index, self.dates))
+
+	@property
+	def n_vintages(self) -> int:
+		return len(self.vintage_times)
+
+	@property
+	def n_changes(self) -> int:
+		return len(self.values)
+
+	def m_to_frame(self) -> pd.DataFrame:
+		"""
+		Long table of all changes: VintageTime, Date, Value
+		"""
+		return pd.DataFrame({'VintageTime': self.vintage_times[self.vintage_index],
+							 'Date': self.dates,
+							 'Value': self.values})
+
+	def m_vintage(self, n: int) -> pd.Series:
+		"""
+		The series as it looked in vintage number n (0 is the first vintage, -1 the latest)
+		"""
+		if n < 0:
+			n += self.n_vintages
+
+		# Sorted by date and vintage: the last change of every date up to vintage n is what was known
+		mask = self.vintage_index[self.order] <= n
+		dates = self.dates[self.order][mask]
+		values = self.values[self.order][mask]
+
+		last = np.ones(len(dates), dtype=bool)
+		last[:-1] = dates[1:] != dates[:-1]
+		dates = dates[last]
+		values = values[last]
+
+		# Observations that were removed are stored as nan
+		keep = ~np.isnan(values)
+
+		return ingest.f_arrays_to_series(dates[keep], values[keep], name=self.name)
+
+	def m_as_of(self, time) -> pd.Series:
+		"""
+		The series as it looked at a point in time. Empty if time is before the first vintage
+		"""
+		n = np.searchsorted(self.vintage_times, self.f_to_datetime64(time), side='right') - 1
+
+		if n < 0:
+			return ingest.f_arrays_to_series(np.empty(0, dtype='datetime64[ns]'), np.empty(0), name=self.name)
+
+		return self.m_vintage(n)
+
+	@staticmethod
+	def f_from_com(series) -> 'VintageHistory':
+		"""
+		Build the history from a COM series with revisions, using GetCompleteHistory()
+		"""
+		history = series.GetCompleteHistory()
+
+		vintage_times = ingest.f_timestamps_to_datetime64([s.Metadata.GetFirstValue('RevisionTimeStamp')
+														   for s in history])
+		vintage_times[np.isnat(vintage_times)] = NO_REVISION_TIME
+
+		dates_list = list()
+		values_list = list()
+		for s in history:
+			dates, values = ingest.f_unpack_arrays(s)
+			dates_list.append(dates)
+			values_list.append(values)
+
+		return VintageHistory(name=history[-1].Name, vintage_times=vintage_times, dates_list=dates_list,
+							  values_list=values_list)
+
+	@staticmethod
+	def f_to_datetime64(time) -> np.datetime64:
+		"""
+		Convert a date or timestamp to datetime64[ns] in UTC, naive timestamps are assumed to be in UTC
+		"""
+		ts = pd.Timestamp(time)
+
+		if ts.tzinfo is not None:
+			ts = ts.tz_convert('UTC').tz_localize(None)
+
+		return np.datetime64(ts.value, 'ns')
+
+
+class VintagePanel:
+	"""
+	Revision histories of many series indexed for point in time (as-of) queries
+
+	The changes of all VintageHistory objects are stored in one array sorted by (ticker, date, vintage time), with
+	a composite int64 key per change. The value of every (ticker, date) cell as of a time is then found with a
+	single vectorized searchsorted, for one or for thousands of as-of times at once, without rebuilding any series.
+	"""
+
+	def __init__(self, history_list: list):
+		"""
+		:param history_list: one VintageHistory per ticker, only the first one of a ticker is used
+		"""
+		# Tickers are not case sensitive
+		unique = dict()
+		for h in history_list:
+			unique.setdefault(h.name.lower(), h)
+		history_list = list(unique.values())
+
+		self.ticker_list = [h.name for h in history_list]
+		self.history_list = history_list
+
+		if history_list:
+			times = np.concatenate([h.vintage_times[h.vintage_index] for h in history_list])
+			dates = np.concatenate([h.dates for h in history_list])
+			values = np.concatenate([h.values for h in history_list])
+			ticker_pos = np.repeat(np.arange(len(history_list), dtype=np.int64), [h.n_changes for h in history_list])
+		else:
+			times = np.empty(0, dtype='datetime64[ns]')
+			dates = np.empty(0, dtype='datetime64[ns]')
+			values = np.empty(0, dtype=np.float64)
+			ticker_pos = np.empty(0, dtype=np.int64)
+
+		# Sorted union of observation dates and of vintage times
+		self.dates, date_pos = np.unique(dates, return_inverse=True)
+		self.vintage_times, time_rank = np.unique(times, return_inverse=True)
+
+		# Composite key: cell (ticker, date) and rank of the vintage time
+		# Changes of one series in the same vintage time keep their order, so the latest vintage wins
+		self.n_times = len(self.vintage_times)
+		cell = ticker_pos * len(self.dates) + date_pos.ravel()
+		key = cell * self.n_times + time_rank.ravel()
+
+		order = np.argsort(key, kind='stable')
+		self.key = key[order]
+		self.values = values[order]
+
+		# Every cell with at least one change
+		self.cells = np.unique(cell)
+		self.cell_ticker = self.cells // max(len(self.dates), 1)
+		self.cell_date = self.cells % max(len(self.dates), 1)
+
+	@property
+	def n_changes(self) -> int:
+		return len(self.values)
+
+	def m_lookup(self, as_of_times) -> np.ndarray:
+		"""
+		Value of every cell as of every time: float64 array (as-of time, cell), nan if not known at that time
+		"""
+		as_of_times = np.asarray([VintageHistory.f_to_datetime64(t) for t in as_of_times], dtype='datetime64[ns]')
+
+		if len(self.values) == 0:
+			return np.full((len(as_of_times), 0), np.nan)
+
+		# Rank of the last vintage time at or before every as-of time, -1 before the first one
+		rank = np.searchsorted(self.vintage_times, as_of_times, side='right') - 1
+
+		query = self.cells[np.newaxis, :] * self.n_times + rank[:, np.newaxis]
+		pos = np.searchsorted(self.key, query, side='right') - 1
+		pos_clipped = np.maximum(pos, 0)
+
+		# The change found must belong to the same cell
+		valid = (pos >= 0) & (self.key[pos_clipped] // self.n_times == self.cells[np.newaxis, :])
+
+		return np.where(valid, self.values[pos_clipped], np.nan)
+
+	def m_as_of(self, time) -> pd.DataFrame:
+		"""
+		The panel as it looked at a point in time, one column per ticker
+		"""
+		values = self.m_lookup([time])[0]
+		keep = ~np.isnan(values)
+
+		df = align.f_scatter(self.ticker_list, self.cell_ticker[keep], self.dates[self.cell_date[keep]], values[keep])
+
+		return df.reindex(columns=self.ticker_list)
+
+	def m_as_of_many(self, as_of_list: list, output_format: str = 'long', max_cells: int = 2 * 10 ** 6):
+		"""
+		The panel as of many times at once
+		output_format:
+		'long': AsOf, Ticker (categorical), Date, Value for every known observation
+		'wide': index (AsOf, Date), one column per ticker
+		'array': (float64 array [as-of, date, ticker], as-of DatetimeIndex, date DatetimeIndex, ticker_list)
+		:param max_cells: lookups (and for 'wide' block cells) per step, bounds the memory of the intermediate arrays.
+		'array' always allocates the whole as-of x date x ticker block
+		"""
+		output_format_list = ['long', 'wide', 'array']
+		if output_format.lower() not in output_format_list:
+			raise KeyError(f'Invalid output format. Expected: {output_format_list}')
+		output_format = output_format.lower()
+
+		as_of_index = pd.DatetimeIndex([VintageHistory.f_to_datetime64(t) for t in as_of_list])
+		step = max(max_cells // max(len(self.cells), 1), 1)
+
+		if output_format == 'long':
+			as_of_changes = [np.empty(0, dtype='datetime64[ns]')]
+			ticker_changes = [np.empty(0, dtype=np.int64)]
+			date_changes = [np.empty(0, dtype='datetime64[ns]')]
+			value_changes = [np.empty(0, dtype=np.float64)]
+
+			for i in range(0, len(as_of_index), step):
+				values = self.m_lookup(as_of_index[i:i + step])
+				as_of_pos, cell_pos = np.nonzero(~np.isnan(values))
+
+				as_of_changes.append(as_of_index.values[i + as_of_pos])
+				ticker_changes.append(self.cell_ticker[cell_pos])
+				date_changes.append(self.dates[self.cell_date[cell_pos]])
+				value_changes.append(values[as_of_pos, cell_pos])
+
+			# Smallest integer type for the ticker codes, as in align.f_long_panel
+			code_dtype = np.int16 if len(self.ticker_list) < 2 ** 15 else np.int32
+			codes = np.concatenate(ticker_changes).astype(code_dtype)
+
+			return pd.DataFrame({'AsOf': np.concatenate(as_of_changes),
+								 'Ticker': pd.Categorical.from_codes(codes, categories=pd.Index(self.ticker_list,
+																							   dtype=object)),
+								 'Date': np.concatenate(date_changes),
+								 'Value': np.concatenate(value_changes)})
+
+		if output_format == 'array':
+			# One block per as-of time, dates x tickers
+			block = np.full((len(as_of_index), len(self.dates), len(self.ticker_list)), np.nan, dtype=np.float64)
+			for i in range(0, len(as_of_index), step):
+				block[i:i + step, self.cell_date, self.cell_ticker] = self.m_lookup(as_of_index[i:i + step])
+
+			return block, as_of_index, pd.DatetimeIndex(self.dates), list(self.ticker_list)
+
+		# Blocks of a few as-of times at a time, only the dates known as of each time are kept
+		step = max(max_cells // max(len(self.dates) * len(self.ticker_list), 1), 1)
+		row_changes = [np.empty((0, len(self.ticker_list)), dtype=np.float64)]
+		as_of_changes = [np.empty(0, dtype='datetime64[ns]')]
+		date_changes = [np.empty(0, dtype='datetime64[ns]')]
+
+		for i in range(0, len(as_of_index), step):
+			as_of_step = as_of_index.values[i:i + step]
+			block = np.full((len(as_of_step), len(self.dates), len(self.ticker_list)), np.nan, dtype=np.float64)
+			block[:, self.cell_date, self.cell_ticker] = self.m_lookup(as_of_step)
+
+			flat = block.reshape(-1, len(self.ticker_list))
+			keep = ~np.isnan(flat).all(axis=1)
+			row_changes.append(flat[keep])
+			as_of_changes.append(np.repeat(as_of_step, len(self.dates))[keep])
+			date_changes.append(np.tile(self.dates, len(as_of_step))[keep])
+
+		index = pd.MultiIndex.from_arrays([np.concatenate(as_of_changes), np.concatenate(date_changes)],
+										  names=['AsOf', 'Date'])
+
+		return pd.DataFrame(np.concatenate(row_changes), index=index, columns=self.ticker_list)
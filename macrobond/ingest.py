@@ -0,0 +1,67 @@
+"""
+Conversion of COM series objects to NumPy arrays
+
+The Macrobond API returns dates as a tuple of datetime objects and values as a tuple of floats.
+All fetch methods go through the functions below so that the conversion is done in bulk without
+formatting every date as a string.
+"""
+from __future__ import annotations
+import datetime as dt
+from typing import Tuple
+from macrobond.lazy_import import f_lazy_import
+np = f_lazy_import('numpy')
+pd = f_lazy_import('pandas')
+
+# Ordinal of 1970-01-01, used to go from date.toordinal() to days since epoch
+EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+def f_dates_to_datetime64(dates) -> np.ndarray:
+	"""
+	Convert a tuple of COM dates to a datetime64[ns] array
+	Time of day and time zone are dropped, i.e. the same result as date.strftime('%Y-%m-%d')
+	"""
+	ordinals = np.fromiter(map(dt.date.toordinal, dates), dtype=np.int64, count=len(dates))
+
+	return (ordinals - EPOCH_ORDINAL).astype('datetime64[D]').astype('datetime64[ns]')
+
+
+def f_timestamps_to_datetime64(times) -> np.ndarray:
+	"""
+	Convert a tuple of COM timestamps to datetime64[ns] in UTC, keeping the time of day
+	Missing timestamps (None) become NaT
+	"""
+	seconds = np.fromiter((np.nan if t is None else t.timestamp() for t in times), dtype=np.float64,
+						  count=len(times))
+	result = np.full(len(seconds), np.datetime64('NaT'), dtype='datetime64[ns]')
+	valid = ~np.isnan(seconds)
+	result[valid] = np.round(seconds[valid] * 1e6).astype(np.int64).astype('datetime64[us]')
+
+	return result
+
+
+def f_values_to_float64(values) -> np.ndarray:
+	"""
+	Convert a tuple of COM values to a float64 array. Missing values (None) become nan
+	"""
+	return np.array(values, dtype=np.float64)
+
+
+def f_unpack_arrays(series, start_of_period: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+	"""
+	Unpack a COM series to (dates, values) arrays
+	Dates are the end of period dates unless start_of_period is True
+	"""
+	if start_of_period:
+		dates = series.DatesAtStartOfPeriod
+	else:
+		dates = series.DatesAtEndOfPeriod
+
+	return f_dates_to_datetime64(dates), f_values_to_float64(series.Values)
+
+
+def f_arrays_to_series(dates: np.ndarray, values: np.ndarray, name: str = None) -> pd.Series:
+	"""
+	Wrap unpacked arrays in a pd.Series without copying them
+	"""
+	return pd.Series(values, index=pd.DatetimeIndex(dates), name=name, copy=False)
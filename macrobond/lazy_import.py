@@ -0,0 +1,64 @@
+"""
+Lazy import of heavy modules
+
+pandas, numpy and friends take a large part of a second to import. Modules of this package import them with
+f_lazy_import, so that they are only loaded when first used, e.g. not by a script that only calls
+f_create_bbg_ticker. Modules using it need `from __future__ import annotations`, so that type annotations
+such as pd.DataFrame do not load the module when the function is defined.
+"""
+import sys
+import importlib
+import threading
+
+
+class LazyModule:
+	"""
+	Stand-in for a module that imports it on first attribute access
+	Attributes are copied to the stand-in once looked up, so later access costs the same as on the module
+	"""
+
+	def __init__(self, name: str):
+		self.__dict__['_lazy_name'] = name
+		self.__dict__['_lazy_module'] = None
+		self.__dict__['_lazy_lock'] = threading.Lock()
+
+	def __getattr__(self, attr: str):
+		module = self.__dict__['_lazy_module']
+
+		if module is None:
+			# Only one thread imports, the others wait for it
+			with self.__dict__['_lazy_lock']:
+				module = self.__dict__['_lazy_module']
+				if module is None:
+					module = importlib.import_module(self.__dict__['_lazy_name'])
+					self.__dict__['_lazy_module'] = module
+
+		value = getattr(module, attr)
+		self.__dict__[attr] = value
+
+		return value
+
+	def __setattr__(self, attr: str, value):
+		self.__getattr__('__name__')
+		setattr(self.__dict__['_lazy_module'], attr, value)
+		self.__dict__[attr] = value
+
+	def __dir__(self):
+		self.__getattr__('__name__')
+		return dir(self.__dict__['_lazy_module'])
+
+	def __repr__(self) -> str:
+		if self.__dict__['_lazy_module'] is None:
+			return f"<lazy module '{self.__dict__['_lazy_name']}' (not loaded)>"
+
+		return repr(self.__dict__['_lazy_module'])
+
+
+def f_lazy_import(name: str) -> LazyModule:
+	"""
+	Module name that is imported on first use. Already imported modules are returned as they are
+	"""
+	if name in sys.modules:
+		return sys.modules[name]
+
+	return LazyModule(name)
@@ -0,0 +1,360 @@
+"""
+In-process stand-in for the Macrobond database, so that Macrobond can be tested and benchmarked without COM
+
+Usage:
+mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, n_obs=2500, frequency='daily'))
+
+Series are generated deterministically from the ticker, so every connection returns the same data.
+Every call is recorded as (method, argument, thread id) in FakeDatabase.calls.
+"""
+import time
+import zlib
+import threading
+import functools
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+# Frequency name -> (pandas period frequency, macrobond_api_constants.SeriesFrequency)
+FREQUENCY_MAP = {'daily': ('B', 8),
+                 'weekly': ('W-FRI', 7),
+                 'monthly': ('M', 6),
+                 'quarterly': ('Q', 4),
+                 'annual': ('Y', 1)}
+
+# Last period of every generated series
+END_DATE = '2021-12-31'
+
+
+class FakeMetadata:
+    def __init__(self, values: dict):
+        self.values = values
+
+    def GetFirstValue(self, name: str):
+        value = self.values.get(name)
+        if isinstance(value, (list, tuple)):
+            return value[0] if value else None
+        return value
+
+    def GetValues(self, name: str) -> tuple:
+        value = self.values.get(name)
+        if value is None:
+            return ()
+        if isinstance(value, (list, tuple)):
+            return tuple(value)
+        return (value,)
+
+
+class FakeEntity:
+    """
+    Entity without values, e.g. what FetchEntities returns or a release
+    """
+
+    def __init__(self, name: str, metadata: dict = None, error: bool = False):
+        self.Name = name
+        self.Title = f'Title of {name}'
+        self.IsError = error
+        self.ErrorMessage = f'Entity {name} not found' if error else ''
+        self.Metadata = FakeMetadata(metadata if metadata is not None else dict())
+        self.MetaData = self.Metadata
+
+
+class FakeSeries(FakeEntity):
+    def __init__(self, name: str, start_dates: tuple = (), end_dates: tuple = (), values: tuple = (),
+                 frequency: str = 'monthly', metadata: dict = None, error: bool = False):
+        super().__init__(name=name, metadata=metadata, error=error)
+        self.DatesAtStartOfPeriod = start_dates
+        self.DatesAtEndOfPeriod = end_dates
+        self.Values = values
+        self.Frequency = FREQUENCY_MAP[frequency][1]
+        self.ForecastFlags = tuple(False for _ in values)
+        self.TypicalObservationCountPerYear = {'daily': 260, 'weekly': 52, 'monthly': 12, 'quarterly': 4,
+                                               'annual': 1}[frequency]
+        self.StartDate = start_dates[0] if start_dates else None
+        self.EndDate = end_dates[-1] if end_dates else None
+
+
+class FakeSeriesWithRevisions(FakeEntity):
+    """
+    Every vintage adds one observation and revises the previous ones, less for every vintage
+    """
+
+    def __init__(self, name: str, history: list, metadata: dict = None, error: bool = False):
+        super().__init__(name=name, metadata=metadata, error=error)
+        self.history = history
+        self.HasRevisions = len(history) > 1
+        self.StoresRevisions = True
+        self.TimeOfLastRevision = history[-1].Metadata.GetFirstValue('RevisionTimeStamp') if history else None
+
+    def GetCompleteHistory(self) -> tuple:
+        return tuple(self.history)
+
+    def GetNthRelease(self, n: int) -> FakeSeries:
+        """
+        Value of every observation in its n:th release, nan if it has not been revised that many times
+        """
+        latest = self.history[-1]
+        values = list()
+        for i in range(len(latest.Values)):
+            # Vintage where observation i was first published
+            first = max(len(self.history) - len(latest.Values) + i, 0)
+            vintage = first + n
+            values.append(self.history[vintage].Values[i] if vintage < len(self.history) else float('nan'))
+
+        return FakeSeries(name=self.Name, start_dates=latest.DatesAtStartOfPeriod,
+                          end_dates=latest.DatesAtEndOfPeriod, values=tuple(values), metadata=latest.Metadata.values)
+
+
+class FakeMetadataInformation:
+    def __init__(self, name: str):
+        self.name = name
+
+    def GetValuePresentationText(self, value: str) -> str:
+        return f'{self.name}: {value}'
+
+
+class FakeSearchQuery:
+    def __init__(self):
+        self.entity_type_filter = None
+        self.attribute_value_filters = dict()
+        self.attribute_filters = list()
+        self.Text = ''
+        self.IncludeDiscontinued = False
+
+    def SetEntityTypeFilter(self, entity_type):
+        self.entity_type_filter = entity_type
+
+    def AddAttributeValueFilter(self, attribute: str, value):
+        self.attribute_value_filters[attribute] = value
+
+    def AddAttributeFilter(self, attribute: str):
+        self.attribute_filters.append(attribute)
+
+
+class FakeSearchResult:
+    def __init__(self, entities: tuple, is_truncated: bool):
+        self.Entities = entities
+        self.isTruncated = is_truncated
+
+
+class FakeSeriesExpression:
+    def __init__(self, name: str):
+        self.Name = name
+        self.ToLowerFrequencyMethod = 0
+        self.ToHigherFrequencyMethod = 0
+        self.MissingValueMethod = 1
+        self.PartialPeriodsMethod = 1
+
+
+class FakeUnifiedSeriesRequest:
+    def __init__(self):
+        self.expressions = list()
+        self.Currency = ''
+        self.Frequency = 101
+        self.Weekdays = 62
+        self.CalendarMergeMode = 1
+        self.StartDate = ''
+        self.EndDate = ''
+
+    def AddSeries(self, name: str) -> FakeSeriesExpression:
+        expression = FakeSeriesExpression(name)
+        self.expressions.append(expression)
+        return expression
+
+
+class FakeDatabase:
+    """
+    Configurable stand-in for the Macrobond database (the Database attribute of Macrobond.Connection)
+
+    :param n_obs: number of observations of every series
+    :param frequency: daily, weekly, monthly, quarterly or annual
+    :param n_vintages: number of vintages of series fetched with revisions
+    :param latency: simulated seconds per call to the database
+    :param latency_per_series: simulated seconds per series or entity returned
+    :param missing: tickers that return errors
+    :param search_size: number of tickers found per region in a search
+    :param search_limit: searches with more results than this are truncated
+    :param search_frequencies: if given, search_size tickers are found per region and per each of these frequencies
+    :param replacements: ticker -> list of replacement tickers for discontinued series
+    :param last_modified: LastModifiedTimeStamp of every series
+    """
+    calls = []
+    lock = threading.Lock()
+
+    def __init__(self, n_obs: int = 24, frequency: str = 'monthly', n_vintages: int = 3, latency: float = 0.0,
+                 latency_per_series: float = 0.0, missing: tuple = (), search_size: int = 10,
+                 search_limit: int = 5000, search_frequencies: tuple = (), replacements: dict = None,
+                 last_modified: dt.datetime = dt.datetime(2021, 1, 1, tzinfo=dt.timezone.utc)):
+        self.n_obs = n_obs
+        self.frequency = frequency
+        self.n_vintages = n_vintages
+        self.latency = latency
+        self.latency_per_series = latency_per_series
+        self.missing = set(missing)
+        self.search_size = search_size
+        self.search_limit = search_limit
+        self.search_frequencies = tuple(search_frequencies)
+        self.replacements = replacements if replacements is not None else dict()
+        self.last_modified = last_modified
+
+    def m_record(self, method: str, argument, n_items: int = 1):
+        with self.lock:
+            self.calls.append((method, argument, threading.get_ident()))
+
+        if self.latency > 0 or self.latency_per_series > 0:
+            time.sleep(self.latency + self.latency_per_series * n_items)
+
+    def m_metadata(self, name: str) -> dict:
+        replacement_list = self.replacements.get(name, [])
+        metadata = {'LastModifiedTimeStamp': self.last_modified,
+                    'Frequency': self.frequency,
+                    'Region': name[:2],
+                    'Currency': 'usd',
+                    'Database': 'fake',
+                    'Release': f'rel_{name[:2]}',
+                    'RegionKey': 'gdp_total',
+                    'EntityState': 4 if replacement_list else 0,
+                    'DisplayUnit': 'Index',
+                    'FullDescription': f'Description of {name}'}
+
+        if replacement_list:
+            metadata['EntityDiscontinuedComment'] = f'{name} has been replaced'
+            metadata['EntityDiscontinuedReplacements'] = list(replacement_list)
+
+        # Releases carry the calendar
+        if name.startswith('rel_'):
+            metadata['NextReleaseEventTime'] = dt.datetime(2022, 1, 15, 8, 30, tzinfo=dt.timezone.utc)
+            metadata['LastReleaseEventTime'] = dt.datetime(2021, 12, 15, 8, 30, tzinfo=dt.timezone.utc)
+
+        return metadata
+
+    def m_series(self, name: str, vintage: int = None) -> FakeSeries:
+        if name in self.missing:
+            return FakeSeries(name=name, frequency=self.frequency, error=True)
+
+        start_dates, end_dates, values = f_generate(name, self.n_obs, self.frequency)
+        metadata = self.m_metadata(name)
+
+        if vintage is not None:
+            # Vintage v lacks the last n_vintages - 1 - v observations and revises its last three
+            n = self.n_obs - (self.n_vintages - 1 - vintage)
+            start_dates = start_dates[:n]
+            end_dates = end_dates[:n]
+            values = tuple(v + 0.1 * (vintage + 1) * (j >= n - 3) for j, v in enumerate(values[:n]))
+
+            # Published half a month after the last observation
+            metadata = dict(metadata)
+            metadata['RevisionTimeStamp'] = end_dates[-1] + dt.timedelta(days=15)
+
+        return FakeSeries(name=name, start_dates=start_dates, end_dates=end_dates, values=values,
+                          frequency=self.frequency, metadata=metadata)
+
+    def FetchOneSeries(self, name: str) -> FakeSeries:
+        self.m_record('FetchOneSeries', name)
+        return self.m_series(name)
+
+    def FetchSeries(self, request) -> tuple:
+        if isinstance(request, FakeUnifiedSeriesRequest):
+            self.m_record('FetchSeries', request, len(request.expressions))
+            return tuple(self.m_unified_series(expression.Name, request) for expression in request.expressions)
+
+        self.m_record('FetchSeries', list(request), len(request))
+        return tuple(self.m_series(name) for name in request)
+
+    def m_unified_series(self, name: str, request: FakeUnifiedSeriesRequest) -> FakeSeries:
+        """
+        Only the date range of a unified request is simulated, no frequency or currency conversion
+        """
+        s = self.m_series(name)
+        if s.IsError:
+            return s
+
+        keep = [i for i, date in enumerate(s.DatesAtEndOfPeriod)
+                if (not request.StartDate or date.date().isoformat() >= request.StartDate)
+                and (not request.EndDate or date.date().isoformat() <= request.EndDate)]
+
+        return FakeSeries(name=name, start_dates=tuple(s.DatesAtStartOfPeriod[i] for i in keep),
+                          end_dates=tuple(s.DatesAtEndOfPeriod[i] for i in keep),
+                          values=tuple(s.Values[i] for i in keep), frequency=self.frequency,
+                          metadata=s.Metadata.values)
+
+    def FetchOneSeriesWithRevisions(self, name: str) -> FakeSeriesWithRevisions:
+        self.m_record('FetchOneSeriesWithRevisions', name, self.n_vintages)
+        return self.m_series_with_revisions(name)
+
+    def FetchSeriesWithRevisions(self, name_list: list) -> tuple:
+        self.m_record('FetchSeriesWithRevisions', list(name_list), len(name_list) * self.n_vintages)
+        return tuple(self.m_series_with_revisions(name) for name in name_list)
+
+    def m_series_with_revisions(self, name: str) -> FakeSeriesWithRevisions:
+        if name in self.missing:
+            return FakeSeriesWithRevisions(name=name, history=[], error=True)
+
+        history = [self.m_series(name, vintage=v) for v in range(self.n_vintages)]
+
+        return FakeSeriesWithRevisions(name=name, history=history, metadata=self.m_metadata(name))
+
+    def FetchOneEntity(self, name: str) -> FakeEntity:
+        self.m_record('FetchOneEntity', name)
+        return FakeEntity(name=name, metadata=self.m_metadata(name), error=name in self.missing)
+
+    def FetchEntities(self, name_list: list) -> tuple:
+        self.m_record('FetchEntities', list(name_list), len(name_list))
+        return tuple(FakeEntity(name=name, metadata=self.m_metadata(name), error=name in self.missing)
+                     for name in name_list)
+
+    def GetMetadataInformation(self, name: str) -> FakeMetadataInformation:
+        self.m_record('GetMetadataInformation', name)
+        return FakeMetadataInformation(name)
+
+    def CreateUnifiedSeriesRequest(self) -> FakeUnifiedSeriesRequest:
+        return FakeUnifiedSeriesRequest()
+
+    def CreateSearchQuery(self) -> FakeSearchQuery:
+        return FakeSearchQuery()
+
+    def Search(self, query: FakeSearchQuery) -> FakeSearchResult:
+        """
+        Finds search_size tickers per region (and per frequency if filtered), truncated at search_limit
+        """
+        self.m_record('Search', query)
+
+        filters = query.attribute_value_filters
+        region_list = filters.get('Region', ['us'])
+        if isinstance(region_list, str):
+            region_list = [region_list]
+
+        concept = filters.get('RegionKey', query.Text.replace(' ', '_'))
+        frequency = filters.get('Frequency', '')
+
+        if self.search_frequencies:
+            frequency_list = [f for f in self.search_frequencies if not frequency or f == frequency]
+        else:
+            frequency_list = [frequency]
+
+        names = [f'{region}{concept}{f}{i}' for region in region_list for f in frequency_list
+                 for i in range(self.search_size)]
+        entities = tuple(FakeEntity(name=name, metadata=self.m_metadata(name))
+                         for name in names[:self.search_limit])
+
+        return FakeSearchResult(entities=entities, is_truncated=len(names) > self.search_limit)
+
+
+@functools.lru_cache(maxsize=20000)
+def f_generate(name: str, n_obs: int, frequency: str) -> tuple:
+    """
+    Dates and values of a series as COM returns them: tuples of timezone aware datetimes and floats
+    """
+    seed = zlib.crc32(name.encode())
+
+    # Series end at different periods so that the union of dates is larger than any single series
+    periods = pd.period_range(end=END_DATE, periods=n_obs + seed % 3, freq=FREQUENCY_MAP[frequency][0])[:n_obs]
+
+    start_dates = tuple(dt.datetime(p.year, p.month, p.day, tzinfo=dt.timezone.utc)
+                        for p in periods.start_time)
+    end_dates = tuple(dt.datetime(p.year, p.month, p.day, tzinfo=dt.timezone.utc)
+                      for p in periods.end_time)
+    values = tuple((100.0 + np.cumsum(np.random.default_rng(seed).standard_normal(n_obs))).tolist())
+
+    return start_dates, end_dates, values
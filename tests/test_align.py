@@ -0,0 +1,197 @@
+import functools
+import unittest
+import numpy as np
+import pandas as pd
+from macrobond import align
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class AlignTest(unittest.TestCase):
+    def test_align_panel(self):
+        """
+        Series are aligned on the sorted union of dates with nan where a series has no observation
+        """
+        dates_list = [np.array(['2020-01-31', '2020-03-31'], dtype='datetime64[ns]'),
+                      np.array(['2020-02-29', '2020-01-31', '2020-03-31'], dtype='datetime64[ns]')]
+        values_list = [np.array([1.0, 3.0]), np.array([20.0, 10.0, 30.0])]
+
+        df = align.f_align_panel(ticker_list=['a', 'b'], dates_list=dates_list, values_list=values_list)
+
+        self.assertEqual(list(df.dtypes), [np.float64, np.float64])
+        self.assertEqual([str(d.date()) for d in df.index], ['2020-01-31', '2020-02-29', '2020-03-31'])
+        np.testing.assert_array_equal(df['a'].values, [1.0, np.nan, 3.0])
+        np.testing.assert_array_equal(df['b'].values, [10.0, 20.0, 30.0])
+
+    def test_align_empty(self):
+        df = align.f_align_panel(ticker_list=[], dates_list=[], values_list=[])
+        self.assertEqual(df.shape, (0, 0))
+
+    def test_long_panel(self):
+        """
+        One row per observation with a categorical ticker, pivoted back to the same wide panel
+        """
+        dates_list = [np.array(['2020-01-31', '2020-03-31'], dtype='datetime64[ns]'),
+                      np.array(['2020-02-29', '2020-01-31', '2020-03-31'], dtype='datetime64[ns]')]
+        values_list = [np.array([1.0, 3.0]), np.array([20.0, 10.0, 30.0])]
+        wide = align.f_align_panel(ticker_list=['a', 'b'], dates_list=dates_list, values_list=values_list)
+
+        df = align.f_long_panel(ticker_list=['a', 'b'], dates_list=dates_list, values_list=values_list,
+                                date_type='int32', value_dtype='float32')
+
+        self.assertEqual(len(df), 5)
+        self.assertEqual(list(df['Ticker']), ['a', 'a', 'b', 'b', 'b'])
+        self.assertEqual(df['Date'].dtype, np.int32)
+        self.assertEqual(df['Value'].dtype, np.float32)
+        self.assertEqual(df['Date'].iloc[0], 18292)
+
+        pd.testing.assert_frame_equal(align.f_long_to_wide(df), wide)
+        pd.testing.assert_frame_equal(align.f_long_to_wide(df, ticker_list=['b']), wide[['b']])
+
+        with self.assertRaises(KeyError):
+            align.f_long_to_wide(df, ticker_list=['c'])
+        with self.assertRaises(KeyError):
+            align.f_format_panel(ticker_list=['a', 'b'], dates_list=dates_list, values_list=values_list,
+                                 output_format='tall')
+
+    def test_long_panel_duplicate_tickers(self):
+        """
+        A ticker given twice is one category
+        """
+        dates = np.array(['2020-01-31', '2020-02-29'], dtype='datetime64[ns]')
+        df = align.f_long_panel(ticker_list=['a', 'b', 'a'], dates_list=[dates, dates[:1], dates],
+                                values_list=[np.array([1.0, 2.0]), np.array([3.0]), np.array([1.0, 2.0])])
+
+        self.assertEqual(list(df['Ticker'].cat.categories), ['a', 'b'])
+        self.assertEqual(list(df['Ticker']), ['a', 'a', 'b', 'a', 'a'])
+
+
+class ResampleTest(unittest.TestCase):
+    def setUp(self):
+        # Start of period dates: monthly, quarterly and business days
+        self.dates_list = [np.array(['2021-01-01', '2021-02-01', '2021-03-01', '2021-04-01', '2021-05-01',
+                                     '2021-06-01'], dtype='datetime64[ns]'),
+                           np.array(['2021-01-01', '2021-04-01'], dtype='datetime64[ns]'),
+                           pd.bdate_range('2021-01-01', '2021-06-30').values]
+        self.values_list = [np.arange(1.0, 7.0), np.array([10.0, 20.0]), np.arange(len(self.dates_list[2]), dtype=float)]
+        self.ticker_list = ['m', 'q', 'd']
+        self.frequency_list = ['monthly', 4, 'daily']
+
+    def test_to_lower(self):
+        df = align.f_resample_panel(self.ticker_list, self.dates_list, self.values_list, self.frequency_list,
+                                    frequency='quarterly', tolowerfrequencymethod='average',
+                                    ticker_options={'m': {'ToLowerFrequencyMethod': 'flow'}})
+
+        self.assertEqual([str(d.date()) for d in df.index], ['2021-03-31', '2021-06-30'])
+        np.testing.assert_array_equal(df['m'].values, [6.0, 15.0])
+        np.testing.assert_array_equal(df['q'].values, [10.0, 20.0])
+
+        daily = pd.Series(self.values_list[2], index=self.dates_list[2])
+        np.testing.assert_array_equal(df['d'].values, daily.groupby(daily.index.quarter).mean().values)
+
+    def test_to_higher(self):
+        df = align.f_resample_panel(self.ticker_list[:2], self.dates_list[:2], self.values_list[:2],
+                                    self.frequency_list[:2], frequency='monthly',
+                                    ticker_options={'q': {'ToHigherFrequencyMethod': 'distribute'}})
+        np.testing.assert_array_equal(df['q'].values, [10 / 3] * 3 + [20 / 3] * 3)
+        np.testing.assert_array_equal(df['m'].values, self.values_list[0])
+
+        df = align.f_resample_panel(['q'], self.dates_list[1:2], self.values_list[1:2], [4], frequency='monthly',
+                                    ToHigherFrequencyMethod='linear_interpolation')
+        self.assertEqual(str(df.index[0].date()), '2021-03-31')
+        np.testing.assert_allclose(df['q'].values, [10.0, 10 + 10 / 3, 20 - 10 / 3, 20.0])
+
+    def test_to_daily_month_ending_on_weekend(self):
+        """
+        January 2021 ends on a Sunday, its values stop on Friday 2021-01-29
+        """
+        dates = np.array(['2021-01-01', '2021-02-01'], dtype='datetime64[ns]')
+        df = align.f_resample_panel(['m'], [dates], [np.array([21.0, 40.0])], ['monthly'], frequency='daily',
+                                    ToHigherFrequencyMethod='distribute')
+
+        january = df.loc['2021-01']
+        self.assertEqual(str(january.index[-1].date()), '2021-01-29')
+        self.assertAlmostEqual(january['m'].sum(), 21.0)
+        self.assertEqual(str(df.index[len(january)].date()), '2021-02-01')
+        self.assertAlmostEqual(df['m'].iloc[len(january)], 2.0)
+        self.assertAlmostEqual(df['m'].sum(), 61.0)
+
+    def test_to_weekly_totals_are_kept(self):
+        """
+        The week straddling the end of a month or quarter belongs to the next one only
+        """
+        months = np.array(['2021-01-01', '2021-02-01', '2021-03-01'], dtype='datetime64[ns]')
+        df = align.f_resample_panel(['m'], [months], [np.full(3, 60.0)], ['monthly'], frequency='weekly',
+                                    ToHigherFrequencyMethod='distribute')
+        self.assertAlmostEqual(df['m'].sum(), 180.0)
+        self.assertEqual(str(df.index[0].date()), '2021-01-01')
+        self.assertEqual(str(df.index[-1].date()), '2021-03-26')
+
+        # January ends on Sunday the 31st, the week ending Friday 5 February is February's
+        self.assertAlmostEqual(df.loc['2021-01-29', 'm'], 60.0 / 5)
+        self.assertAlmostEqual(df.loc['2021-02-05', 'm'], 60.0 / 4)
+
+        quarters = np.array(['2021-01-01', '2021-04-01'], dtype='datetime64[ns]')
+        df = align.f_resample_panel(['q'], [quarters], [np.full(2, 13.0)], ['quarterly'], frequency='weekly',
+                                    ToHigherFrequencyMethod='distribute')
+        self.assertAlmostEqual(df['q'].sum(), 26.0)
+
+    def test_missing_values(self):
+        values = np.array([1.0, np.nan, np.nan, 4.0, np.nan, 6.0])
+        for method, expected in [('none', [1.0, np.nan, np.nan, 4.0, np.nan, 6.0]),
+                                 ('previous', [1.0, 1.0, 1.0, 4.0, 4.0, 6.0]),
+                                 ('zero', [1.0, 0.0, 0.0, 4.0, 0.0, 6.0]),
+                                 ('linear_interpolation', [1.0, 2.0, 3.0, 4.0, 5.0, 6.0])]:
+            df = align.f_resample_panel(['m'], self.dates_list[:1], [values], ['monthly'], frequency='monthly',
+                                        MissingValueMethod=method)
+            np.testing.assert_allclose(df['m'].values, expected)
+
+        # Gaps are only filled between observations
+        df = align.f_resample_panel(['m', 'q'], self.dates_list[:2], self.values_list[:2], self.frequency_list[:2],
+                                    frequency='monthly', ToHigherFrequencyMethod='pulse', MissingValueMethod='previous')
+        np.testing.assert_array_equal(df['q'].values, [np.nan, np.nan, 10.0, 10.0, 10.0, 20.0])
+
+    def test_invalid_options(self):
+        with self.assertRaises(KeyError):
+            align.f_resample_panel(['m'], self.dates_list[:1], self.values_list[:1], ['monthly'], Currency='usd')
+        with self.assertRaises(KeyError):
+            align.f_resample_panel(['m'], self.dates_list[:1], self.values_list[:1], ['monthly'],
+                                   ToLowerFrequencyMethod='percentage_change')
+        with self.assertRaises(KeyError):
+            align.f_resample_panel(['m'], self.dates_list[:1], self.values_list[:1], ['monthly'], frequency='highest')
+
+    def test_fetch_resampled(self):
+        mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, n_obs=300, frequency='daily',
+                                                                        missing=('missing',)))
+        ticker_list = ['us1', 'se1', 'missing']
+
+        df = mb.m_fetch_resampled(ticker_list, frequency='monthly', ToLowerFrequencyMethod='average')
+        df_daily = mb.FetchSeries(ticker_list=ticker_list[:2])
+        expected = df_daily.groupby(df_daily.index.to_period('M')).mean()
+
+        self.assertEqual(list(df.columns), ticker_list)
+        self.assertTrue(df['missing'].isna().all())
+        np.testing.assert_allclose(df[ticker_list[:2]].values, expected.values)
+        self.assertEqual(list(df.index.to_period('M')), list(expected.index))
+
+        df_long = mb.m_series_tuple_to_df(ticker_list, mb.m_fetch_series_objects(ticker_list), output_format='long',
+                                          date_type='int32', value_dtype='float32', frequency='monthly',
+                                          ToLowerFrequencyMethod='average')
+        self.assertEqual(df_long['Value'].dtype, np.float32)
+        self.assertEqual(df_long['Date'].dtype, np.int32)
+        self.assertEqual(len(df_long), df[ticker_list[:2]].count().sum())
+        np.testing.assert_allclose(align.f_long_to_wide(df_long, ticker_list[:2]).values,
+                                   df[ticker_list[:2]].values, rtol=1e-6)
+
+        with self.assertRaises(KeyError):
+            mb.m_series_tuple_to_df(ticker_list, mb.m_fetch_series_objects(ticker_list), output_format='tall',
+                                    frequency='monthly')
+        with self.assertRaises(KeyError):
+            mb.m_series_tuple_to_df(ticker_list, mb.m_fetch_series_objects(ticker_list),
+                                    ToLowerFrequencyMethod='average')
+        with self.assertRaises(KeyError):
+            mb.m_series_tuple_to_df(ticker_list, mb.m_fetch_series_objects(ticker_list), ticker_options={})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from macrobond import arrow_io
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class ArrowIOTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        self.ticker_list = ['us1', 'se1', 'de1']
+        self.df = self.mb.FetchSeries(ticker_list=self.ticker_list)
+        self.df.iloc[2, 1] = np.nan
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip_without_copy(self):
+        path = os.path.join(self.tmp_dir, 'panel.arrow')
+        df_info = self.mb.m_get_full_info(ticker_list=self.ticker_list)
+        arrow_io.f_write_panel(path, self.df, ticker_metadata=df_info, revision='latest')
+
+        allocated = pa.total_allocated_bytes()
+        df = arrow_io.f_read_panel(path)
+
+        # Values are mapped from the file and not allocated
+        self.assertLess(pa.total_allocated_bytes() - allocated, self.df.values.nbytes)
+        pd.testing.assert_frame_equal(df, self.df)
+
+        ticker_metadata, revision = arrow_io.f_read_metadata(path)
+        self.assertEqual(revision, 'latest')
+        self.assertEqual(ticker_metadata['se1']['RegionLong'], 'Sweden')
+
+    def test_append_chunks_of_dates(self):
+        directory = os.path.join(self.tmp_dir, 'parts')
+        arrow_io.f_append_panel(directory, self.df.iloc[:10])
+        arrow_io.f_append_panel(directory, self.df.iloc[10:])
+
+        pd.testing.assert_frame_equal(arrow_io.f_read_panel(directory), self.df)
+        self.assertEqual(arrow_io.f_read_table(directory, columns=['se1']).num_rows, len(self.df))
+
+    def test_append_chunks_of_tickers(self):
+        directory = os.path.join(self.tmp_dir, 'parts')
+        for df in self.mb.m_iter_series(ticker_list=self.ticker_list, chunk_size=2):
+            arrow_io.f_append_panel(directory, df)
+
+        df = arrow_io.f_read_panel(directory)
+        pd.testing.assert_frame_equal(df, self.mb.FetchSeries(ticker_list=self.ticker_list), check_freq=False)
+
+    def test_revision_columns(self):
+        path = os.path.join(self.tmp_dir, 'revisions.arrow')
+        df = self.mb.FetchOneSeriesWithRevisions(ticker='us1')
+        arrow_io.f_write_panel(path, df, revision='first release')
+
+        pd.testing.assert_frame_equal(arrow_io.f_read_panel(path), df, check_names=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
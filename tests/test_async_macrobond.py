@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+import pandas as pd
+from macrobond import c_macrobond
+from macrobond.c_async_macrobond import AsyncMacrobond
+from fake_database import FakeDatabase
+
+
+class AsyncMacrobondTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+
+    def test_fetch(self):
+        """
+        Awaitable methods give the same result as the blocking ones
+        """
+        async def run():
+            async with AsyncMacrobond(mb=self.mb, max_workers=2) as amb:
+                return await amb.FetchSeries(ticker_list=['us1', 'se1'])
+
+        df = asyncio.run(run())
+        self.assertTrue(df.equals(self.mb.FetchSeries(ticker_list=['us1', 'se1'])))
+
+    def test_fetch_long(self):
+        async def run():
+            async with AsyncMacrobond(mb=self.mb) as amb:
+                return await amb.FetchSeries(ticker_list=['us1', 'se1'], output_format='long', date_type='int32',
+                                             value_dtype='float32')
+
+        df = asyncio.run(run())
+        pd.testing.assert_frame_equal(df, self.mb.FetchSeries(ticker_list=['us1', 'se1'], output_format='long',
+                                                              date_type='int32', value_dtype='float32'))
+
+    def test_gather(self):
+        """
+        Results of m_gather are returned in the order of the requests
+        """
+        async def run():
+            async with AsyncMacrobond(mb=self.mb, max_workers=3, max_concurrency=2) as amb:
+                return await amb.m_gather('m_get_title', [{'ticker': f'us{i}'} for i in range(6)])
+
+        titles = asyncio.run(run())
+        self.assertEqual(titles, [f'Title of us{i}' for i in range(6)])
+
+
+if __name__ == '__main__':
+    unittest.main()
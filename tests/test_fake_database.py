@@ -0,0 +1,36 @@
+import unittest
+import functools
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class FakeDatabaseTest(unittest.TestCase):
+    """
+    The stand-in database covers every path that the benchmark suite times
+    """
+
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, n_obs=30,
+                                                                             frequency='quarterly'))
+
+    def test_fetch(self):
+        df = self.mb.FetchSeries(ticker_list=['us1', 'se1'])
+        self.assertEqual(list(df.columns), ['us1', 'se1'])
+        self.assertEqual(df['us1'].count(), 30)
+        self.assertEqual(len(self.mb.FetchOneSeries(ticker='us1')), 30)
+
+    def test_revisions(self):
+        df = self.mb.FetchOneSeriesWithRevisions(ticker='us1')
+        self.assertEqual(list(df.columns.get_level_values(1)), ['Rev0', 'Rev1'])
+
+    def test_full_info_and_search(self):
+        df = self.mb.m_get_full_info(ticker_list=['us1', 'se1'])
+        self.assertEqual(list(df['RegionLong']), ['United States', 'Sweden'])
+
+        tickers = self.mb.CreateSearchQuery(concept_filter='gdp_total', RegionList=['us', 'se'])
+        self.assertEqual(len(tickers), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
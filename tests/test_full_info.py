@@ -0,0 +1,45 @@
+import unittest
+import datetime as dt
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class FullInfoTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=lambda: FakeDatabase(missing=('missing',)))
+        self.ticker_list = [f'{region}{i}' for region in ['us', 'se'] for i in range(5)] + ['missing']
+
+    def test_full_info(self):
+        """
+        One row per ticker, with the extra metadata columns, from one series request and one release request
+        """
+        df = self.mb.m_get_full_info(ticker_list=self.ticker_list, metadata_list=['DisplayUnit', 'EntityState'])
+
+        self.assertEqual(list(df.columns), ['Description', 'NextRelease', 'PreviousRelease', 'Frequency',
+                                            'RegionLong', 'RegionShort', 'Currency', 'Ticker', 'Source', 'Release',
+                                            'Concept', 'DisplayUnit', 'EntityState'])
+        self.assertEqual(list(df['Ticker']), self.ticker_list)
+
+        row = df.iloc[5]
+        self.assertEqual(row['Description'], 'Title of se0')
+        self.assertEqual(row['RegionShort'], 'se')
+        self.assertEqual(row['Release'], 'rel_se')
+        self.assertEqual(row['NextRelease'], dt.date(2022, 1, 15))
+        self.assertEqual(row['Concept'], ('gdp_total', 'RegionKey: gdp_total'))
+        self.assertEqual(row['DisplayUnit'], 'Index')
+        self.assertEqual(row['EntityState'], 0)
+
+        # Series with errors are left empty
+        row = df.iloc[-1]
+        self.assertEqual(row['Concept'], ('', ''))
+        self.assertEqual(row['NextRelease'], dt.date(1900, 1, 1))
+
+        calls = [(call[0], call[1]) for call in FakeDatabase.calls]
+        self.assertEqual(calls, [('FetchSeries', self.ticker_list),
+                                 ('GetMetadataInformation', 'RegionKey'),
+                                 ('FetchEntities', ['rel_us', 'rel_se'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
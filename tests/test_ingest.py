@@ -0,0 +1,25 @@
+import unittest
+import datetime as dt
+import numpy as np
+from macrobond import ingest
+
+
+class IngestTest(unittest.TestCase):
+    def test_dates_to_datetime64(self):
+        """
+        Time of day and time zone are dropped, same as the previous strftime conversion
+        """
+        dates = (dt.datetime(1969, 12, 31, 23, 59, tzinfo=dt.timezone.utc), dt.datetime(2020, 2, 29, 6, 0))
+        result = ingest.f_dates_to_datetime64(dates)
+        expected = np.array(['1969-12-31', '2020-02-29'], dtype='datetime64[ns]')
+        self.assertEqual(result.dtype, np.dtype('datetime64[ns]'))
+        np.testing.assert_array_equal(result, expected)
+
+    def test_values_to_float64(self):
+        result = ingest.f_values_to_float64((1.0, None, 3))
+        self.assertEqual(result.dtype, np.float64)
+        self.assertTrue(np.isnan(result[1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
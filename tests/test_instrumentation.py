@@ -0,0 +1,74 @@
+import io
+import unittest
+import contextlib
+from macrobond import c_macrobond
+from macrobond.c_instrumentation import CallRecorder
+from fake_database import FakeDatabase
+
+
+class InstrumentationTest(unittest.TestCase):
+    def setUp(self):
+        self.ticker_list = [f'us{i}' for i in range(10)]
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase, object_cache_size=0)
+
+    def test_com_calls_are_counted(self):
+        """
+        Every database call is counted with its number of tickers
+        """
+        self.mb.FetchSeries(ticker_list=self.ticker_list, chunk_size=3, max_workers=2)
+
+        report = self.mb.recorder.m_report().set_index(['Type', 'Name'])
+        self.assertEqual(report.loc[('com', 'FetchSeries'), 'Calls'], 4)
+        self.assertEqual(report.loc[('com', 'FetchSeries'), 'Tickers'], 10)
+        self.assertEqual(report.loc[('method', 'FetchSeries'), 'Calls'], 1)
+
+    def test_com_time_of_worker_threads(self):
+        """
+        Database time of worker threads counts for the method that started them, overlapping calls only once
+        """
+        mb = c_macrobond.Macrobond(connection_factory=lambda: FakeDatabase(latency=0.05))
+
+        with mb.m_profile(print_tf=False) as events:
+            mb.FetchSeries(ticker_list=self.ticker_list, chunk_size=2, max_workers=5)
+
+        method = [e for e in events if e['Type'] == 'method'][0]
+        com_total = sum(e['Seconds'] for e in events if e['Type'] == 'com')
+        self.assertGreaterEqual(method['ComSeconds'], 0.05)
+        self.assertLess(method['ComSeconds'], com_total)
+        self.assertLessEqual(method['ComSeconds'], method['Seconds'])
+        self.assertGreaterEqual(method['ConversionSeconds'], 0.0)
+        self.assertAlmostEqual(method['ConversionSeconds'], method['Seconds'] - method['ComSeconds'])
+
+    def test_union_seconds(self):
+        self.assertEqual(CallRecorder.f_union_seconds([]), 0.0)
+        self.assertAlmostEqual(CallRecorder.f_union_seconds([(0.0, 1.0), (0.5, 2.0), (3.0, 4.0), (3.2, 3.5)]), 3.0)
+
+    def test_profile_prints_breakdown(self):
+        """
+        m_profile prints one line per database call and method, observations are counted while profiling
+        """
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), self.mb.m_profile() as events:
+            self.mb.FetchSeries(ticker_list=self.ticker_list)
+
+        self.assertIn('FetchSeries', out.getvalue())
+        com = [e for e in events if e['Type'] == 'com']
+        self.assertEqual(com[0]['Observations'], 10 * 24)
+
+    def test_hooks(self):
+        recorder = CallRecorder()
+        events = []
+        recorder.m_add_hook(events.append)
+
+        with recorder.m_method('outer'):
+            recorder.m_record_com('FetchOneSeries', tickers=1, observations=0, seconds=0.5)
+
+        recorder.m_remove_hook(events.append)
+        recorder.m_record_com('FetchOneSeries', tickers=1, observations=0, seconds=0.5)
+
+        self.assertEqual([e['Type'] for e in events], ['com', 'method'])
+        self.assertEqual(events[1]['ComSeconds'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
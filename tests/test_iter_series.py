@@ -0,0 +1,31 @@
+import unittest
+import pandas as pd
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class IterSeriesTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        self.ticker_list = [f'us{i}' for i in range(5)]
+
+    def test_chunks(self):
+        """
+        One request and one frame per chunk, together equal to FetchSeries
+        """
+        df_list = list(self.mb.m_iter_series(ticker_list=self.ticker_list, chunk_size=2))
+        self.assertEqual([list(df.columns) for df in df_list], [['us0', 'us1'], ['us2', 'us3'], ['us4']])
+        self.assertEqual([len(call[1]) for call in FakeDatabase.calls if call[0] == 'FetchSeries'], [2, 2, 1])
+
+        df = self.mb.FetchSeries(ticker_list=self.ticker_list)
+        pd.testing.assert_frame_equal(pd.concat(df_list, axis=1, sort=True), df, check_freq=False)
+
+    def test_pairs(self):
+        pairs = list(self.mb.m_iter_series(ticker_list=self.ticker_list, chunk_size=2, as_frame=False))
+        self.assertEqual([ticker for ticker, _ in pairs], self.ticker_list)
+        self.assertTrue(all(isinstance(x, pd.Series) for _, x in pairs))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import datetime as dt
+import functools
+import unittest
+from macrobond import c_macrobond
+from macrobond.c_metadata_catalog import MetadataCatalog
+from fake_database import FakeDatabase
+
+
+class MetadataCatalogTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.now = [1000.0]
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase, search_cache_size=0)
+        self.catalog = MetadataCatalog(self.mb, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.catalog.m_close()
+
+    def test_offline_query(self):
+        ticker_list = self.catalog.m_populate_search(concept_filter='gdp_total', RegionList=['se', 'us'])
+        self.assertEqual(self.catalog.m_stats()['Series'], len(ticker_list))
+
+        FakeDatabase.calls = []
+        df = self.catalog.m_query(region='SE', Frequency='monthly', TitleLike='%gdp_total%')
+
+        self.assertEqual(len(df), 10)
+        self.assertTrue(all(df['Region'] == 'se'))
+        self.assertEqual(FakeDatabase.calls, [])
+
+        with self.assertRaises(KeyError):
+            self.catalog.m_query(NotAColumn='x')
+
+    def test_live_search_on_miss(self):
+        self.assertEqual(self.catalog.m_tickers(live_fallback=False, TitleLike='%cpi%', Region='de'), [])
+
+        ticker_list = self.catalog.m_tickers(TitleLike='%cpi%', Region='de')
+        self.assertEqual(len(ticker_list), 10)
+        self.assertTrue(all(ticker.startswith('decpi') for ticker in ticker_list))
+
+        # The same search is not repeated within search_ttl, even if the catalog has no match
+        FakeDatabase.calls = []
+        self.assertEqual(self.catalog.m_tickers(TitleLike='%cpi%', Region='de', Currency='sek'), [])
+        self.assertEqual(len([call for call in FakeDatabase.calls if call[0] == 'Search']), 0)
+
+        self.now[0] += self.catalog.search_ttl + 1
+        self.catalog.m_tickers(TitleLike='%cpi%', Region='de', Currency='sek')
+        self.assertEqual(len([call for call in FakeDatabase.calls if call[0] == 'Search']), 1)
+
+    def test_refresh(self):
+        self.catalog.m_populate(['us1', 'se1', 'de1'])
+
+        # de1 is removed and the others are updated
+        self.catalog.mb = c_macrobond.Macrobond(connection_factory=functools.partial(
+            FakeDatabase, missing=('de1',), last_modified=dt.datetime(2022, 1, 1, tzinfo=dt.timezone.utc)))
+
+        self.now[0] += 10
+        self.assertEqual(self.catalog.m_refresh(max_age=60), {'Checked': 0, 'Changed': 0, 'Removed': 0})
+        self.assertEqual(self.catalog.m_refresh(), {'Checked': 3, 'Changed': 2, 'Removed': 1})
+        self.assertEqual(self.catalog.m_tickers(live_fallback=False), ['se1', 'us1'])
+        self.assertEqual(self.catalog.m_query(live_fallback=False)['LastModified'].iloc[0][:4], '2022')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import threading
+import unittest
+from macrobond import c_macrobond
+from macrobond.c_object_cache import ObjectCache
+from fake_database import FakeDatabase
+
+
+class ObjectCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ObjectCache(max_size=2, ttl=10.0, clock=lambda: self.now)
+
+    def test_ttl(self):
+        """
+        Entries older than the ttl are treated as missing
+        """
+        self.cache.m_put('a', 1)
+        self.now = 5.0
+        self.assertEqual(self.cache.m_get('a'), 1)
+        self.now = 16.0
+        self.assertIsNone(self.cache.m_get('a'))
+
+        stats = self.cache.m_stats()
+        self.assertEqual((stats['Hits'], stats['Misses'], stats['Expirations']), (1, 1, 1))
+
+    def test_lru(self):
+        """
+        The least recently used entry is evicted first
+        """
+        self.cache.m_put('a', 1)
+        self.cache.m_put('b', 2)
+        self.cache.m_get('a')
+        self.cache.m_put('c', 3)
+
+        self.assertIsNone(self.cache.m_get('b'))
+        self.assertEqual(self.cache.m_get('a'), 1)
+        self.assertEqual(self.cache.m_stats()['Evictions'], 1)
+
+    def test_invalidate(self):
+        self.cache.m_put('a', 1)
+        self.cache.m_put('b', 2)
+        self.cache.m_invalidate(['a'])
+        self.assertIsNone(self.cache.m_get('a'))
+        self.assertEqual(self.cache.m_get('b'), 2)
+
+
+class MacrobondObjectCacheTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+
+    def f_calls(self, method: str) -> int:
+        return len([call for call in FakeDatabase.calls if call[0] == method])
+
+    def test_off_by_default(self):
+        mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        mb.m_get_title(ticker='us1')
+        mb.m_get_title(ticker='us1')
+        self.assertEqual(self.f_calls('FetchOneSeries'), 2)
+
+    def test_objects_are_not_shared_between_threads(self):
+        """
+        COM objects belong to the thread that fetched them, every connection has its own entries
+        """
+        mb = c_macrobond.Macrobond(connection_factory=FakeDatabase, object_cache_size=100)
+        mb.m_get_title(ticker='us1')
+        mb.m_get_frequency(ticker='us1')
+        mb.m_get_metadata_information('RegionKey')
+        mb.m_get_metadata_information('RegionKey')
+        self.assertEqual(self.f_calls('FetchOneSeries'), 1)
+        self.assertEqual(self.f_calls('GetMetadataInformation'), 1)
+
+        thread = threading.Thread(target=lambda: (mb.m_get_title(ticker='us1'),
+                                                  mb.m_get_metadata_information('RegionKey')))
+        thread.start()
+        thread.join()
+        self.assertEqual(self.f_calls('FetchOneSeries'), 2)
+        self.assertEqual(self.f_calls('GetMetadataInformation'), 2)
+
+        # Invalidation drops the objects of every connection
+        mb.m_invalidate(['US1'])
+        self.assertEqual(mb.object_cache.m_stats()['Entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
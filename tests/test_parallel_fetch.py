@@ -0,0 +1,48 @@
+import unittest
+import threading
+import pandas as pd
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class ParallelFetchTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.ticker_list = [f'us{i}' for i in range(10)]
+
+    def test_parallel_equals_serial(self):
+        """
+        Chunks fetched on worker threads are merged to the same frame as a single request
+        """
+        mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        df_serial = mb.FetchSeries(ticker_list=self.ticker_list)
+        df_parallel = mb.FetchSeries(ticker_list=self.ticker_list, chunk_size=3, max_workers=4)
+
+        pd.testing.assert_frame_equal(df_serial, df_parallel)
+        self.assertEqual(list(df_parallel.columns), self.ticker_list)
+
+        chunk_calls = [call for call in FakeDatabase.calls if call[0] == 'FetchSeries'][1:]
+        self.assertEqual([len(call[1]) for call in chunk_calls], [3, 3, 3, 1])
+
+    def test_connection_per_thread(self):
+        """
+        Every worker thread uses its own connection
+        """
+        # Latency keeps the first worker busy, so that both workers take chunks
+        mb = c_macrobond.Macrobond(connection_factory=lambda: FakeDatabase(latency=0.05))
+        mb.FetchSeries(ticker_list=self.ticker_list, chunk_size=1, max_workers=2)
+
+        chunk_calls = [call for call in FakeDatabase.calls if call[0] == 'FetchSeries']
+        self.assertEqual(len(chunk_calls), len(self.ticker_list))
+
+        # Chunks ran on both workers and not on the calling thread
+        thread_ids = {call[2] for call in chunk_calls}
+        self.assertEqual(len(thread_ids), 2)
+        self.assertNotIn(threading.get_ident(), thread_ids)
+
+        # Connections are created on first use, one per worker, the main thread never used one
+        self.assertEqual(mb.connection_pool.connection_count, len(thread_ids))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import unittest
+import functools
+import contextlib
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class PartitionedSearchTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+
+    def f_macrobond(self, **kwargs) -> c_macrobond.Macrobond:
+        return c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, **kwargs))
+
+    def test_truncated_search_is_split_by_region(self):
+        mb = self.f_macrobond(search_size=10, search_limit=25)
+        region_list = ['us', 'se', 'de']
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            truncated = mb.CreateSearchQuery(concept_filter='gdp', RegionList=region_list)
+        tickers = mb.CreateSearchQuery(concept_filter='gdp', RegionList=region_list, AutoPartition=True)
+
+        self.assertEqual(len(truncated), 25)
+        self.assertEqual(len(tickers), 30)
+        self.assertEqual(len(set(tickers)), 30)
+
+    def test_region_is_split_by_frequency(self):
+        mb = self.f_macrobond(search_size=10, search_limit=15, search_frequencies=('monthly', 'quarterly'))
+
+        tickers = mb.CreateSearchQuery(concept_filter='gdp', RegionList=['us', 'se'], AutoPartition=True,
+                                       MaxWorkers=2)
+
+        self.assertEqual(sorted(tickers), sorted(f'{region}gdp{frequency}{i}' for region in ['us', 'se']
+                                                 for frequency in ['monthly', 'quarterly'] for i in range(10)))
+
+    def test_search_is_cached_per_normalized_query(self):
+        mb = self.f_macrobond()
+
+        first = mb.CreateSearchQuery(concept_filter='gdp', RegionList=['us', 'se'])
+        second = mb.CreateSearchQuery(concept_filter='GDP', regionlist=['se', 'us'])
+
+        self.assertEqual(first, second)
+        self.assertEqual(len([call for call in FakeDatabase.calls if call[0] == 'Search']), 1)
+
+        mb.m_invalidate()
+        mb.CreateSearchQuery(concept_filter='gdp', RegionList=['us', 'se'])
+        self.assertEqual(len([call for call in FakeDatabase.calls if call[0] == 'Search']), 2)
+
+    def test_truncated_search_is_not_cached(self):
+        """
+        A truncated result is searched again and warned about on every call
+        """
+        mb = self.f_macrobond(search_size=10, search_limit=5)
+
+        for auto_partition_tf in [False, True]:
+            FakeDatabase.calls.clear()
+            for _ in range(2):
+                out = io.StringIO()
+                with contextlib.redirect_stdout(out):
+                    tickers = mb.CreateSearchQuery(concept_filter='gdp', RegionList=['us'],
+                                                   Frequency='monthly', AutoPartition=auto_partition_tf)
+                self.assertEqual(len(tickers), 5)
+                self.assertIn('truncated', out.getvalue())
+
+            self.assertEqual(len([call for call in FakeDatabase.calls if call[0] == 'Search']), 2)
+
+    def test_split_search(self):
+        search = {'Filters': {'Region': ['us', 'se'], 'RegionKey': 'gdp'}}
+        levels = c_macrobond.SEARCH_PARTITION_LEVELS
+
+        regions, level = c_macrobond.Macrobond.f_split_search(search, levels, 0)
+        self.assertEqual([s['Filters']['Region'] for s in regions], [['us'], ['se']])
+
+        frequencies, level = c_macrobond.Macrobond.f_split_search(regions[0], levels, level)
+        self.assertEqual(len(frequencies), len(c_macrobond.SEARCH_FREQUENCY_LIST))
+
+        self.assertEqual(c_macrobond.Macrobond.f_split_search(frequencies[0], levels, level), ([], len(levels)))
+
+
+if __name__ == '__main__':
+    unittest.main()
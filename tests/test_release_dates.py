@@ -0,0 +1,89 @@
+import unittest
+import datetime as dt
+import pandas as pd
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class ReleaseDatesTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=lambda: FakeDatabase(missing=('missing',)))
+
+        # 30 tickers sharing three releases: rel_us, rel_se and rel_de
+        self.ticker_list = [f'{region}{i}' for region in ['us', 'se', 'de'] for i in range(10)] + ['missing']
+
+    def m_calls(self, method: str) -> list:
+        return [call[1] for call in FakeDatabase.calls if call[0] == method]
+
+    def test_every_release_fetched_once(self):
+        """
+        All series in one request and each distinct release entity only once
+        """
+        df = self.mb.m_release_dates(ticker_list=self.ticker_list)
+
+        self.assertEqual(self.m_calls('FetchSeries'), [self.ticker_list])
+        self.assertEqual(self.m_calls('FetchEntities'), [['rel_us', 'rel_se', 'rel_de']])
+
+        self.assertEqual(list(df.index), self.ticker_list)
+        self.assertEqual(df.loc['se3', 'Release'], 'rel_se')
+        self.assertEqual(df.loc['se3', 'NextRelease'], dt.date(2022, 1, 15))
+        self.assertEqual(df.loc['se3', 'PreviousRelease'], dt.date(2021, 12, 15))
+
+        # Missing tickers get the default date
+        self.assertTrue(pd.isna(df.loc['missing', 'Release']))
+        self.assertEqual(df.loc['missing', 'NextRelease'], dt.date(1900, 1, 1))
+
+    def test_already_fetched_series(self):
+        series = self.mb.m_fetch_series_objects(self.ticker_list)
+        FakeDatabase.calls.clear()
+
+        self.mb.m_release_dates(ticker_list=self.ticker_list, series=series)
+        self.assertEqual(self.m_calls('FetchSeries'), [])
+        self.assertEqual(len(self.m_calls('FetchEntities')), 1)
+
+    def test_release_times_cached_per_name(self):
+        """
+        Every release is resolved once, by m_release_date and m_release_dates alike, until invalidated
+        """
+        for ticker in ['us1', 'us2', 'us1', 'se1']:
+            self.assertEqual(self.mb.m_release_date(ticker, 'Next'), dt.date(2022, 1, 15))
+            self.assertEqual(self.mb.m_release_date(ticker, 'Previous'), dt.date(2021, 12, 15))
+
+        self.assertEqual(self.m_calls('FetchOneSeries'), [])
+        self.assertEqual(self.m_calls('FetchEntities'), [['us1'], ['rel_us'], ['us2'], ['se1'], ['rel_se']])
+
+        FakeDatabase.calls.clear()
+        self.mb.m_release_dates(ticker_list=self.ticker_list)
+        self.assertEqual(self.m_calls('FetchEntities'), [['rel_de']])
+
+        self.assertEqual(self.mb.m_release_date('missing', 'Next'), dt.date(1900, 1, 1))
+
+        self.mb.m_invalidate(['rel_us'])
+        FakeDatabase.calls.clear()
+        self.mb.m_release_date('us1', 'Next')
+        self.assertEqual(self.m_calls('FetchEntities'), [['rel_us']])
+
+    def test_release_cache_off(self):
+        mb = c_macrobond.Macrobond(connection_factory=FakeDatabase, release_cache_ttl=0)
+        mb.m_release_date('us1', 'Next')
+        mb.m_release_date('us1', 'Next')
+        self.assertEqual(len(self.m_calls('FetchEntities')), 4)
+
+    def test_metadata_information_memoized(self):
+        """
+        GetMetadataInformation is called once per metadata name, however many tickers use it
+        """
+        for _ in range(3):
+            info = self.mb.m_get_metadata_information('RegionKey')
+            self.assertEqual(info.GetValuePresentationText('gdp_total'), 'RegionKey: gdp_total')
+        self.mb.m_get_metadata_information('Region')
+
+        self.assertEqual(self.m_calls('GetMetadataInformation'), ['RegionKey', 'Region'])
+
+        self.mb.m_get_full_info(ticker_list=self.ticker_list)
+        self.assertEqual(self.m_calls('GetMetadataInformation'), ['RegionKey', 'Region'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import datetime as dt
+import time
+import unittest
+from macrobond import c_macrobond
+from macrobond.c_release_scheduler import ReleaseScheduler
+from fake_database import FakeDatabase
+
+# NextReleaseEventTime of every release of FakeDatabase
+RELEASE_TIME = dt.datetime(2022, 1, 15, 8, 30, tzinfo=dt.timezone.utc).timestamp()
+
+
+class ReleaseSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.now = [RELEASE_TIME - 3600.0]
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        self.results = []
+        self.scheduler = ReleaseScheduler(self.mb, delay=30.0, retry_interval=60.0, max_retries=2,
+                                          callback=lambda *result: self.results.append(result),
+                                          clock=lambda: self.now[0])
+        self.scheduler.m_watch(['us1', 'us2', 'se1'])
+
+    def test_groups_by_release(self):
+        df = self.scheduler.m_schedule()
+
+        self.assertEqual(df.index.tolist(), ['rel_se', 'rel_us'])
+        self.assertEqual(df['Tickers'].tolist(), [1, 2])
+        self.assertEqual(df.loc['rel_us', 'NextCheck'].timestamp(), RELEASE_TIME + 30.0)
+
+        # Nothing is fetched before the release
+        FakeDatabase.calls = []
+        self.assertEqual(self.scheduler.m_run_pending(), 0)
+        self.assertEqual(FakeDatabase.calls, [])
+
+    def test_refetch_after_release(self):
+        db = self.mb.connection_pool.m_get().db
+        db.last_modified = dt.datetime(2022, 1, 15, 8, 30, tzinfo=dt.timezone.utc)
+        db.missing = {'se1'}
+        FakeDatabase.calls = []
+
+        self.now[0] = RELEASE_TIME + 31.0
+        self.assertEqual(self.scheduler.m_run_pending(), 2)
+
+        # Only the tickers that changed are fetched
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeries']
+        self.assertEqual(fetched, [['us1', 'us2']])
+
+        release, ticker_list, df = self.scheduler.queue.get_nowait()
+        self.assertEqual((release, ticker_list), ('rel_us', ['us1', 'us2']))
+        self.assertEqual(df.columns.tolist(), ['us1', 'us2'])
+        self.assertEqual(len(self.results), 1)
+
+        # rel_se had no new data and is retried, rel_us waits for its calendar
+        df = self.scheduler.m_schedule()
+        self.assertEqual(df.loc['rel_se', 'Retries'], 1)
+        self.assertEqual(df.loc['rel_se', 'NextCheck'].timestamp(), self.now[0] + 60.0)
+        self.assertEqual(df.loc['rel_us', 'NextCheck'].timestamp(), self.now[0] + self.scheduler.calendar_interval)
+
+        # Gives up after max_retries
+        for _ in range(2):
+            self.now[0] += 60.0
+            self.assertEqual(self.scheduler.m_run_pending(), 1)
+        self.assertEqual(self.scheduler.m_schedule().loc['rel_se', 'NextCheck'].timestamp(),
+                         self.now[0] + self.scheduler.calendar_interval)
+
+    def test_background_thread(self):
+        self.now[0] = RELEASE_TIME + 31.0
+
+        self.scheduler.m_unwatch(['se1'])
+        self.scheduler.m_start()
+        try:
+            # The scheduler thread has its own connection, where nothing changed
+            deadline = time.time() + 5
+            while self.scheduler.m_schedule().loc['rel_us', 'Retries'] == 0:
+                self.assertLess(time.time(), deadline)
+                time.sleep(0.01)
+        finally:
+            self.scheduler.m_stop(timeout=5)
+
+        self.assertEqual(self.scheduler.m_schedule().index.tolist(), ['rel_us'])
+        self.assertTrue(self.scheduler.queue.empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import functools
+import unittest
+from macrobond import c_macrobond
+from fake_database import FakeDatabase
+
+
+class ResolveReplacementsTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        replacements = {'old1': ['mid1'], 'mid1': ['new1'],
+                        'old2': ['new2a', 'new2b'],
+                        'cyc1': ['cyc2'], 'cyc2': ['cyc1']}
+        self.mb = c_macrobond.Macrobond(connection_factory=functools.partial(
+            FakeDatabase, replacements=replacements, missing=('bad1',)))
+
+    def test_chains(self):
+        ticker_list = ['old1', 'mid1', 'new1', 'old2', 'cyc1', 'bad1']
+        df = self.mb.m_resolve_replacements(ticker_list)
+
+        self.assertEqual(df.index.tolist(), ticker_list)
+        self.assertEqual(df['Status'].tolist(), ['replaced', 'replaced', 'active', 'ambiguous', 'cycle', 'missing'])
+        self.assertEqual(df['Replacement'].tolist(), ['new1', 'new1', '', '', '', ''])
+        self.assertEqual(df.loc['old1', 'Chain'], ('mid1', 'new1'))
+        self.assertEqual(df.loc['old2', 'FinalTickers'], ('new2a', 'new2b'))
+        self.assertEqual(df['Discontinued'].tolist(), [True, True, False, True, True, None])
+
+        # One request per level of the chains, every ticker fetched once
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchEntities']
+        self.assertEqual(fetched, [ticker_list, ['new2a', 'new2b', 'cyc2']])
+
+    def test_max_depth(self):
+        df = self.mb.m_resolve_replacements(['old1'], max_depth=1)
+
+        self.assertEqual(df.loc['old1', 'Status'], 'max depth')
+        self.assertEqual(df.loc['old1', 'Replacement'], '')
+
+    def test_empty(self):
+        df = self.mb.m_resolve_replacements([])
+
+        self.assertEqual(len(df), 0)
+        self.assertEqual(df.index.name, 'Ticker')
+        self.assertEqual(list(df.columns), ['EntityState', 'Discontinued', 'Comment', 'Replacements', 'Chain',
+                                            'FinalTickers', 'Replacement', 'Status'])
+        self.assertEqual([call for call in FakeDatabase.calls if call[0] == 'FetchEntities'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import functools
+from macrobond import c_macrobond
+from macrobond.c_search_pipeline import SearchPipeline
+from fake_database import FakeDatabase
+
+
+class SearchPipelineTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.region_list = ['us', 'se', 'de', 'fr']
+
+    def f_pipeline(self, fetch_max_workers: int = 1, **kwargs) -> SearchPipeline:
+        mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, search_size=10,
+                                                                        search_limit=15, **kwargs))
+        return SearchPipeline(mb, chunk_size=10, queue_size=2, fetch_max_workers=fetch_max_workers,
+                              poll_interval=0.01)
+
+    def test_results_cover_the_search(self):
+        for fetch_max_workers in [1, 3]:
+            FakeDatabase.calls.clear()
+            pipeline = self.f_pipeline(fetch_max_workers=fetch_max_workers)
+            results = list(pipeline.m_run(concept_filter='gdp', RegionList=self.region_list, AutoPartition=True,
+                                          MaxWorkers=1))
+
+            # Series of every chunk are only fetched once, for both the values and the full info
+            fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeries']
+            self.assertEqual(sorted(fetched), sorted(chunk for chunk, df, df_info in results))
+
+            ticker_list = [ticker for chunk, df, df_info in results for ticker in chunk]
+            self.assertEqual(sorted(ticker_list), sorted(pipeline.mb.CreateSearchQuery(
+                concept_filter='gdp', RegionList=self.region_list, AutoPartition=True)))
+
+            for chunk, df, df_info in results:
+                self.assertTrue(df.equals(pipeline.mb.FetchSeries(ticker_list=chunk)))
+                self.assertEqual(list(df_info['Ticker']), chunk)
+
+    def test_fetch_starts_before_search_ends(self):
+        """
+        The first chunk is fetched while later partitions are still searched
+        """
+        pipeline = self.f_pipeline(latency=0.02)
+        next(pipeline.m_run(concept_filter='gdp', RegionList=self.region_list, AutoPartition=True,
+                            MaxWorkers=1))
+
+        methods = [call[0] for call in FakeDatabase.calls]
+        last_search = max(i for i, method in enumerate(methods) if method == 'Search')
+        self.assertLess(methods.index('FetchSeries'), last_search)
+
+    def test_errors_are_raised(self):
+        pipeline = self.f_pipeline()
+
+        with self.assertRaises(KeyError):
+            list(pipeline.m_run(concept_filter='gdp', NotAnOption=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
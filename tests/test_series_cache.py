@@ -0,0 +1,54 @@
+import tempfile
+import unittest
+import datetime as dt
+import pandas as pd
+from macrobond.c_series_cache import SeriesCache
+
+
+class SeriesCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({'usgdp': [1.0, 2.0, 3.0]}, index=pd.to_datetime(['2020-03-31', '2020-06-30',
+                                                                                '2020-09-30']))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_hit_and_stale(self):
+        """
+        Entries are only served while LastModifiedTimeStamp is unchanged
+        """
+        stamp = dt.datetime(2021, 1, 1, 12, 0)
+        cache = SeriesCache(cache_dir=self.tmp_dir.name)
+        cache.m_put('usgdp', self.df, stamp)
+
+        # A new instance reads the index from disk
+        cache = SeriesCache(cache_dir=self.tmp_dir.name)
+        pd.testing.assert_frame_equal(cache.m_get('USGDP', stamp), self.df, check_freq=False)
+        self.assertIsNone(cache.m_get('usgdp', dt.datetime(2021, 1, 2)))
+        self.assertIsNone(cache.m_get('segdp', stamp))
+
+        stats = cache.m_stats()
+        self.assertEqual(stats['Hits'], 1)
+        self.assertEqual(stats['Misses'], 2)
+        self.assertEqual(stats['Stale'], 1)
+
+    def test_eviction(self):
+        """
+        The least recently used entry is removed when the size limit is exceeded
+        """
+        stamp = dt.datetime(2021, 1, 1)
+        cache = SeriesCache(cache_dir=self.tmp_dir.name, file_format='feather')
+        cache.m_put('a', self.df, stamp)
+        cache.m_put('b', self.df, stamp)
+
+        cache.max_size_bytes = cache.index['b']['size']
+        cache.m_flush()
+
+        self.assertEqual(list(cache.index.keys()), ['b'])
+        self.assertEqual(cache.m_stats()['Evictions'], 1)
+        pd.testing.assert_frame_equal(cache.m_get('b', stamp), self.df, check_freq=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import time
+import unittest
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from macrobond import c_macrobond
+from macrobond.c_single_flight import SingleFlight
+from fake_database import FakeDatabase
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+
+    def test_concurrent_callers_share_one_call(self):
+        single_flight = SingleFlight()
+        call_count = []
+        barrier = threading.Barrier(5)
+
+        def func():
+            call_count.append(1)
+            time.sleep(0.1)
+            return 'result'
+
+        def caller(_):
+            barrier.wait()
+            return single_flight.m_do('key', func)
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            results = list(executor.map(caller, range(5)))
+
+        self.assertEqual(results, ['result'] * 5)
+        self.assertEqual(len(call_count), 1)
+        self.assertEqual(single_flight.m_stats()['Coalesced'], 4)
+
+    def test_errors_are_shared(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+
+        def func(item_list):
+            started.set()
+            time.sleep(0.05)
+            raise KeyError('failed')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(single_flight.m_do_many, ['a'], func)
+            started.wait()
+            second = executor.submit(single_flight.m_do_many, ['a'], func)
+
+            self.assertRaises(KeyError, first.result)
+            self.assertRaises(KeyError, second.result)
+
+        self.assertEqual(single_flight.m_stats()['InFlight'], 0)
+
+    def test_overlapping_ticker_lists(self):
+        """
+        The second caller only fetches the tickers that are not in flight already
+        """
+        mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, latency=0.2))
+        ticker_list_1 = ['us1', 'us2', 'us3']
+        ticker_list_2 = ['us2', 'us3', 'us4']
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(mb.FetchSeries, ticker_list_1)
+            time.sleep(0.05)
+            second = executor.submit(mb.FetchSeries, ticker_list_2)
+            df_1, df_2 = first.result(), second.result()
+
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeries']
+        self.assertEqual(fetched, [ticker_list_1, ['us4']])
+        self.assertEqual(list(df_2.columns), ticker_list_2)
+        self.assertEqual(df_2['us2'].count(), df_1['us2'].count())
+
+
+    def test_same_single_series_and_unified_request(self):
+        """
+        FetchOneSeries and CreateUnifiedSeriesRequst of the same query are made once
+        """
+        mb = c_macrobond.Macrobond(connection_factory=functools.partial(FakeDatabase, latency=0.2))
+        barrier = threading.Barrier(4)
+
+        def caller(args):
+            method, kwargs = args
+            barrier.wait()
+            return method(**kwargs)
+
+        calls = [(mb.FetchOneSeries, {'ticker': 'us1'}), (mb.FetchOneSeries, {'ticker': 'US1'}),
+                 (mb.CreateUnifiedSeriesRequst, {'ticker_list': ['us1', 'se1'], 'StartDate': '2021-01-01'}),
+                 (mb.CreateUnifiedSeriesRequst, {'ticker_list': ['us1', 'se1'], 'startdate': '2021-01-01'})]
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            df_list = list(executor.map(caller, calls))
+
+        self.assertEqual([call[0] for call in FakeDatabase.calls].count('FetchOneSeries'), 1)
+        self.assertEqual([call[0] for call in FakeDatabase.calls].count('FetchSeries'), 1)
+        self.assertTrue(df_list[0].equals(df_list[1]))
+        self.assertIsNot(df_list[0], df_list[1])
+        self.assertTrue(df_list[2].equals(df_list[3]))
+
+
+if __name__ == '__main__':
+    unittest.main()
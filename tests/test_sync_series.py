@@ -0,0 +1,139 @@
+import tempfile
+import unittest
+import functools
+import datetime as dt
+import numpy as np
+from macrobond import c_macrobond
+from fake_database import FakeDatabase, FakeSeries
+
+
+class MergeTailTest(unittest.TestCase):
+    def setUp(self):
+        self.dates = np.array(['2020-01-31', '2020-02-29', '2020-03-31', '2020-04-30'], dtype='datetime64[ns]')
+        self.values = np.array([1.0, 2.0, 3.0, 4.0])
+        self.merge = c_macrobond.Macrobond.f_merge_tail
+
+    def test_appended(self):
+        tail_dates = np.array(['2020-03-31', '2020-04-30', '2020-05-31'], dtype='datetime64[ns]')
+        status, dates, values, n = self.merge(self.dates, self.values, tail_dates, np.array([3.0, 4.0, 5.0]))
+        self.assertEqual((status, n), ('Appended', 1))
+        self.assertEqual(list(values), [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_unchanged(self):
+        status, dates, values, n = self.merge(self.dates, self.values, self.dates[2:], self.values[2:])
+        self.assertEqual((status, n), ('Unchanged', 0))
+
+    def test_tail_rewritten(self):
+        """
+        Only the observations from the first revision are replaced
+        """
+        tail_dates = np.array(['2020-02-29', '2020-03-31', '2020-04-30', '2020-05-31'], dtype='datetime64[ns]')
+        status, dates, values, n = self.merge(self.dates, self.values, tail_dates, np.array([2.0, 3.0, 4.5, 5.0]))
+        self.assertEqual((status, n), ('TailRewritten', 2))
+        self.assertEqual(list(values), [1.0, 2.0, 3.0, 4.5, 5.0])
+        self.assertEqual(len(dates), 5)
+
+    def test_revised_before_tail(self):
+        """
+        If the first overlapping observation is revised the full series has to be fetched
+        """
+        self.assertIsNone(self.merge(self.dates, self.values, self.dates[2:], np.array([3.1, 4.0])))
+
+
+
+class RevisingDatabase(FakeDatabase):
+    """
+    Fake database whose series can be shortened, revised and marked as modified through a shared state:
+    hidden: ticker -> number of trailing observations not published yet
+    revised: ticker -> {observation: new value}
+    last_modified: ticker -> LastModifiedTimeStamp
+    """
+
+    def __init__(self, state: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.state = state
+
+    def m_metadata(self, name: str) -> dict:
+        metadata = super().m_metadata(name)
+        metadata['LastModifiedTimeStamp'] = self.state['last_modified'].get(name, self.last_modified)
+        return metadata
+
+    def m_series(self, name: str, vintage: int = None) -> FakeSeries:
+        s = super().m_series(name, vintage)
+        if s.IsError:
+            return s
+
+        n = len(s.Values) - self.state['hidden'].get(name, 0)
+        values = list(s.Values[:n])
+        for i, value in self.state['revised'].get(name, {}).items():
+            values[i] = value
+
+        return FakeSeries(name=name, start_dates=s.DatesAtStartOfPeriod[:n], end_dates=s.DatesAtEndOfPeriod[:n],
+                          values=tuple(values), frequency=self.frequency, metadata=s.Metadata.values)
+
+
+class SyncSeriesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.ticker_list = ['us1', 'se1', 'jp1', 'de1', 'missing']
+        self.state = {'hidden': {ticker: 2 for ticker in self.ticker_list}, 'revised': dict(),
+                      'last_modified': dict()}
+        self.mb = c_macrobond.Macrobond(cache_dir=self.tmp_dir.name, connection_factory=functools.partial(
+            RevisingDatabase, state=self.state, missing=('missing',)))
+        self.full = {ticker: FakeDatabase().m_series(ticker) for ticker in self.ticker_list}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_sync(self):
+        """
+        New observations are appended, revisions within the overlap rewrite the tail, older ones refetch the series
+        """
+        df = self.mb.m_sync_series(self.ticker_list, batch_size=3, overlap=5)
+        self.assertEqual(list(df['Status']), ['New'] * 4 + ['Error'])
+        self.assertEqual(list(df['Changed']), [22] * 4 + [0])
+
+        # Publish the last two observations, revise one within the overlap and a run reaching back past it
+        modified = dt.datetime(2022, 1, 1, tzinfo=dt.timezone.utc)
+        self.state['hidden'] = dict()
+        self.state['revised'] = {'se1': {20: 1000.0}, 'de1': {16: 1000.0, 17: 1000.0}}
+        self.state['last_modified'] = {ticker: modified for ticker in ['us1', 'se1', 'de1']}
+        FakeDatabase.calls.clear()
+
+        df = self.mb.m_sync_series(self.ticker_list, batch_size=3, overlap=5)
+        self.assertEqual(list(df['Status']), ['Appended', 'TailRewritten', 'Unchanged', 'Full', 'Error'])
+        self.assertEqual(list(df['Changed']), [2, 4, 0, 24, 0])
+
+        # Only the changed tickers are fetched
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeries']
+        self.assertNotIn('jp1', [e.Name for request in fetched if not isinstance(request, list)
+                                 for e in request.expressions])
+
+        for ticker in ['us1', 'se1', 'de1']:
+            expected = np.array(self.full[ticker].Values)
+            for i, value in self.state['revised'].get(ticker, {}).items():
+                expected[i] = value
+            np.testing.assert_array_equal(self.mb.series_cache.m_read(ticker).iloc[:, 0].values, expected)
+
+        # Unchanged ticker keeps the old length
+        self.assertEqual(len(self.mb.series_cache.m_read('jp1')), 22)
+
+        df = self.mb.m_sync_series(self.ticker_list, overlap=5)
+        self.assertEqual(list(df['Status']), ['Unchanged'] * 4 + ['Error'])
+
+    def test_fetch_tail(self):
+        start = self.full['us1'].DatesAtEndOfPeriod[-5]
+        (dates, values), = self.mb.m_fetch_tail(['us1'], start_date=start.date())
+        self.assertEqual(list(values), list(self.full['us1'].Values[-5:-2]))
+        self.assertEqual(len(dates), 3)
+
+    def test_overlap_at_least_one(self):
+        self.mb.m_sync_series(self.ticker_list[:1])
+        self.state['last_modified'] = {'us1': dt.datetime(2022, 1, 1, tzinfo=dt.timezone.utc)}
+
+        with self.assertRaises(AssertionError):
+            self.mb.m_sync_series(self.ticker_list[:1], overlap=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import datetime as dt
+import unittest
+import macrobond_api_constants.SeriesFrequency
+import macrobond_api_constants.SeriesToLowerFrequencyMethod
+from macrobond import c_macrobond
+from macrobond.c_unified_request import UnifiedRequestBuilder
+from fake_database import FakeDatabase
+
+
+class UnifiedRequestTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+
+    def test_names_and_constants(self):
+        builder = UnifiedRequestBuilder(frequency='Semi Annual', ToLowerFrequencyMethod=1,
+                                        StartDate=dt.datetime(2010, 1, 31, 12, 0))
+
+        self.assertEqual(builder.request_options['Frequency'], macrobond_api_constants.SeriesFrequency.SEMI_ANNUAL)
+        self.assertEqual(builder.request_options['StartDate'], '2010-01-31')
+        self.assertEqual(builder.series_options['ToLowerFrequencyMethod'],
+                         macrobond_api_constants.SeriesToLowerFrequencyMethod.LAST)
+
+        with self.assertRaises(KeyError):
+            UnifiedRequestBuilder(Frequency='fortnightly')
+        with self.assertRaises(KeyError):
+            UnifiedRequestBuilder(NotAnOption=1)
+
+    def test_build(self):
+        builder = UnifiedRequestBuilder(Frequency='monthly', MissingValueMethod='previous')
+        builder.m_add_series('us1')
+        builder.m_add_series('se1', MissingValueMethod='linear_interpolation')
+
+        req = builder.m_build(FakeDatabase())
+
+        self.assertEqual(req.Frequency, macrobond_api_constants.SeriesFrequency.MONTHLY)
+        self.assertEqual([e.Name for e in req.expressions], ['us1', 'se1'])
+        self.assertEqual([e.MissingValueMethod for e in req.expressions], [2, 4])
+
+    def test_date_range_is_fetched_in_the_database(self):
+        mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+
+        df = mb.CreateUnifiedSeriesRequst(ticker_list=['us1', 'se1'], startdate='2021-01-01', EndDate='2021-06-30',
+                                          currency='EUR', Frequency='monthly')
+
+        self.assertEqual(len(df), 6)
+        req = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeries'][0]
+        self.assertEqual(req.Currency, 'EUR')
+        self.assertEqual(req.StartDate, '2021-01-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
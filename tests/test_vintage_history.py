@@ -0,0 +1,101 @@
+import unittest
+import numpy as np
+import pandas as pd
+from macrobond import c_macrobond
+from macrobond.c_vintage_history import VintageHistory, VintagePanel
+from fake_database import FakeDatabase
+
+
+class VintageHistoryTest(unittest.TestCase):
+    def setUp(self):
+        d = np.array(['2020-01-31', '2020-02-29', '2020-03-31'], dtype='datetime64[ns]')
+        vintage_times = np.array(['2020-02-15T08:30', '2020-03-15T08:30', '2020-04-15T08:30'], dtype='datetime64[ns]')
+
+        # Second vintage adds February, third revises January and adds March
+        self.vh = VintageHistory(name='usgdp', vintage_times=vintage_times,
+                                 dates_list=[d[:1], d[:2], d],
+                                 values_list=[np.array([1.0]), np.array([1.0, 2.0]), np.array([1.5, 2.0, 3.0])])
+
+    def test_only_changes_are_stored(self):
+        self.assertEqual(self.vh.n_vintages, 3)
+        self.assertEqual(self.vh.n_changes, 4)
+        df = self.vh.m_to_frame()
+        self.assertEqual(list(df['Value']), [1.0, 2.0, 1.5, 3.0])
+
+    def test_as_of(self):
+        """
+        Reconstructed vintages are what was known at the given time
+        """
+        self.assertEqual(list(self.vh.m_as_of('2020-03-20').values), [1.0, 2.0])
+        self.assertEqual(list(self.vh.m_as_of('2020-05-01').values), [1.5, 2.0, 3.0])
+        self.assertEqual(len(self.vh.m_as_of('2020-01-01')), 0)
+        self.assertEqual(list(self.vh.m_vintage(0).values), [1.0])
+
+
+class VintagePanelTest(unittest.TestCase):
+    def setUp(self):
+        FakeDatabase.calls = []
+        self.mb = c_macrobond.Macrobond(connection_factory=FakeDatabase)
+        self.ticker_list = ['us1', 'se1', 'de1']
+        self.vp = self.mb.m_get_vintage_panel(ticker_list=self.ticker_list, chunk_size=2)
+        self.as_of_list = ['2020-01-01', '2021-11-20', '2021-12-20', '2022-01-20']
+
+    def test_fetched_in_batches(self):
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeriesWithRevisions']
+        self.assertEqual(fetched, [['us1', 'se1'], ['de1']])
+        self.assertEqual(self.vp.ticker_list, self.ticker_list)
+
+    def test_as_of_matches_every_history(self):
+        for as_of in self.as_of_list:
+            df = self.vp.m_as_of(as_of)
+
+            for h in self.vp.history_list:
+                expected = h.m_as_of(as_of)
+                pd.testing.assert_series_equal(df[h.name].dropna(), expected, check_names=False, check_freq=False)
+
+    def test_many_as_of_dates(self):
+        df_long = self.vp.m_as_of_many(self.as_of_list)
+        self.assertEqual(list(df_long.columns), ['AsOf', 'Ticker', 'Date', 'Value'])
+
+        df_wide = self.vp.m_as_of_many(self.as_of_list, output_format='wide')
+        block, as_of_index, dates, ticker_list = self.vp.m_as_of_many(self.as_of_list, output_format='array')
+        self.assertEqual(block.shape, (4, len(dates), 3))
+
+        for i, as_of in enumerate(self.as_of_list):
+            df = self.vp.m_as_of(as_of)
+            if df.empty:
+                self.assertNotIn(as_of_index[i], df_wide.index.get_level_values('AsOf'))
+            else:
+                pd.testing.assert_frame_equal(df_wide.xs(as_of_index[i], level='AsOf'), df, check_names=False,
+                                              check_freq=False)
+            self.assertEqual(np.count_nonzero(~np.isnan(block[i])), df.count().sum())
+            self.assertEqual((df_long['AsOf'] == as_of_index[i]).sum(), df.count().sum())
+
+        # Step through the as-of dates in small chunks
+        pd.testing.assert_frame_equal(self.vp.m_as_of_many(self.as_of_list, max_cells=1), df_long)
+        pd.testing.assert_frame_equal(self.vp.m_as_of_many(self.as_of_list, output_format='wide', max_cells=1),
+                                      df_wide)
+
+    def test_duplicate_tickers(self):
+        """
+        A ticker given twice is fetched and shown once
+        """
+        FakeDatabase.calls = []
+        vp = self.mb.m_get_vintage_panel(ticker_list=['us1', 'se1', 'US1'])
+        fetched = [call[1] for call in FakeDatabase.calls if call[0] == 'FetchSeriesWithRevisions']
+        self.assertEqual(fetched, [['us1', 'se1']])
+
+        vp = VintagePanel(self.vp.history_list + self.vp.history_list[:1])
+        self.assertEqual(vp.ticker_list, self.ticker_list)
+        df_long = vp.m_as_of_many(self.as_of_list)
+        self.assertEqual(list(df_long['Ticker'].cat.categories), self.ticker_list)
+        pd.testing.assert_frame_equal(df_long, self.vp.m_as_of_many(self.as_of_list))
+
+    def test_empty_panel(self):
+        vp = VintagePanel([])
+        self.assertEqual(vp.m_as_of('2020-01-01').shape, (0, 0))
+        self.assertEqual(len(vp.m_as_of_many(['2020-01-01'])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()